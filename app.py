@@ -3,25 +3,30 @@
 # --------------------------------------------------------------------------------------------
 # - RAG: ChromaDB (local, persistent) + OpenAI embeddings
 # - Chat: OpenAI Chat Completions (gpt-4o-mini)
-# - Tool: get_summary_by_title(title) — returns a full summary from a local dictionary
-# - Moderation: OpenAI Moderation API (omni-moderation-latest), Pydantic-safe parsing
+# - Tool: get_summary_by_title(title) — returns a full summary from the local summary store
+# - Moderation: local rules -> verdict cache -> OpenAI Moderation API (see moderation_ext.py)
 # - Follow-up: “yes / tell me more / vreau rezumat” triggers summary for last recommendation
-# - Voice Mode: English speech ONLY (typed input disabled while Voice mode is ON)
+# - Voice Mode: English speech ONLY (typed input disabled while Voice mode is ON); the transcript streams in
+#   and moderation + retrieval start on the partial text (see voice.py)
 
-import json
-import os
-import re
-import tempfile
-import unicodedata
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any
 
 import streamlit as st
 from dotenv import load_dotenv
-from openai import OpenAI
 from audio_recorder_streamlit import audio_recorder  # mic widget
 
-from rag import bootstrap_index, RAGEngine
-from tools import get_summary_by_title
+from resources import get_executor, get_title_index, ensure_index
+from recommender import (
+    retrieve, prepare_recommendation, stream_final_text, semantic_store, resolve_summary, precomputed_answer
+)
+from precomputed import EXAMPLE_QUERIES
+from conversation import Conversation
+from moderation_ext import check_with_openai_moderation
+from intent import is_followup_for_summary
+from voice import listen
+import config
+import tracing
 
 load_dotenv()
 
@@ -45,7 +50,8 @@ st.markdown("""
 
 st.title("📚 Smart Librarian DavaX")
 
-client = OpenAI()
+if config.METRICS_PORT:
+    tracing.serve_metrics(config.METRICS_PORT)  # no-op after the first rerun
 
 BLOCK_MESSAGE = (
     "Please keep the conversation respectful. I'm an AI chatbot that **recommends books** "
@@ -53,72 +59,24 @@ BLOCK_MESSAGE = (
     "Tell me what kind of book you're looking for."
 )
 
-def check_with_openai_moderation(text: str) -> Dict[str, Any]:
-    """
-    Returns: { 'blocked': bool, 'reasons': list[str], 'raw': dict }
-    Resilient to API hiccups: if moderation fails, we fall back to NOT blocked.
-    """
-    try:
-        resp = client.moderations.create(model="omni-moderation-latest", input=text)
-        result = resp.results[0]
-        cats = getattr(result, "categories", None)
-        try:
-            cats_dict = cats.model_dump() if cats else {}
-        except Exception:
-            cats_dict = {}
-        reasons = [k for k, v in cats_dict.items() if bool(v)]
-        flagged = bool(getattr(result, "flagged", False))
-        return {"blocked": flagged, "reasons": reasons, "raw": resp.model_dump()}
-    except Exception as e:
-        # Log-friendly fallback; do NOT block the convo on moderation outage
-        return {"blocked": False, "reasons": ["moderation_error"], "raw": {"error": str(e)}}
-
 # -------------------------
 # Bootstrap vector store
 # -------------------------
 with st.spinner("Initializing the book collection..."):
     try:
-        total = bootstrap_index()
+        total = ensure_index()
         st.caption(f"Vector store ready (collection: **book_summaries**, {total} books).")
     except Exception as e:
         st.error(f"Initialization error: {e}")
         st.stop()
 
-rag = RAGEngine()
-
-# -------------------------
-# Tool schema for function calling
-# -------------------------
-TOOL_SCHEMA = [{
-    "type": "function",
-    "function": {
-        "name": "get_summary_by_title",
-        "description": "Returns the full summary for an exact book title.",
-        "parameters": {
-            "type": "object",
-            "properties": {
-                "title": {"type": "string", "description": "The EXACT selected book title"}
-            },
-            "required": ["title"]
-        }
-    }
-}]
-
-SYSTEM_PROMPT = (
-    "You are Smart Librarian. You receive user reading preferences and a list of candidates "
-    "from a vector store. Your job: pick EXACTLY ONE book from the candidates that best matches "
-    "the user's request. After you choose, ALWAYS call `get_summary_by_title` with the EXACT title "
-    "and present the full summary in your final answer. Do NOT ask if the user wants a summary "
-    "before calling the tool. Do not invent titles not present in candidates. "
-    "STAY STRICTLY IN ROLE: you only recommend books. If asked for anything else, politely say you "
-    "can only recommend books and ask for reading preferences."
-)
-
 # -------------------------
 # Chat memory
 # -------------------------
-if "messages" not in st.session_state:
-    st.session_state.messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+# bounded: the last HISTORY_MAX_TURNS turns, titles already recommended and a rolling preference profile
+if "conversation" not in st.session_state:
+    st.session_state.conversation = Conversation(config.HISTORY_MAX_TURNS, decay=config.PROFILE_DECAY)
+conversation: Conversation = st.session_state.conversation
 if "last_reco_title" not in st.session_state:
     st.session_state.last_reco_title = None
 
@@ -139,260 +97,228 @@ with st.sidebar:
                "non-English speech will be rejected. While Voice mode is ON, typing is disabled.")
     st.divider()
     st.write("Try:")
-    st.code("I want a book about freedom and social control.", language="markdown")
-    st.code("What do you recommend if I love fantasy adventures?", language="markdown")
-    st.code("I want friendship and magic.", language="markdown")
-
-# -------------------------
-# Lightweight follow-up detector (EN + RO)
-# -------------------------
-_LEET_MAP = str.maketrans({"@":"a","$":"s","0":"o","1":"i","!":"i","3":"e","7":"t","4":"a","5":"s","8":"b"})
-def _strip_diacritics(text: str) -> str:
-    nfkd = unicodedata.normalize("NFKD", text)
-    return "".join(ch for ch in nfkd if not unicodedata.combining(ch))
-def _normalize(text: str) -> str:
-    t = text.lower()
-    t = _strip_diacritics(t)
-    t = t.translate(_LEET_MAP)
-    t = re.sub(r"\s+", " ", t).strip()
-    return t
-
-FOLLOWUP_PATTERNS = [
-    r"\byes\b", r"\bok\b", r"\byep\b", r"\byup\b",
-    r"\btell me more\b", r"\bmore\b", r"\bsummary\b", r"\bdetails?\b",
-    r"\bshow (me )?(more|the summary)\b",
-    r"\bda\b", r"\bas vrea sa stiu mai multe\b", r"\bmai multe\b", r"\bvreau rezumat\b",
-    r"\bvreau detalii\b", r"\bspune-mi mai multe\b", r"\bvreau sa stiu mai multe\b"
-]
-FOLLOWUP_REGEX = re.compile("|".join(FOLLOWUP_PATTERNS))
-def is_followup_for_summary(user_text: str) -> bool:
-    return bool(FOLLOWUP_REGEX.search(_normalize(user_text)))
-
-# -------------------------
-# English-only check for Voice mode transcripts
-# -------------------------
-def is_english_text(text: str, threshold: float = 0.9) -> bool:
-    """Heuristic: reject if Romanian diacritics present; else require >=90% A–Z letters among alphabetic chars."""
-    if any(ch in text for ch in "ăâîșțĂÂÎȘȚ"):
-        return False
-    letters = [c for c in text if c.isalpha()]
-    if not letters:
-        return False
-    ascii_letters = [c for c in letters if ("A" <= c <= "Z") or ("a" <= c <= "z")]
-    return (len(ascii_letters) / len(letters)) >= threshold
-
-# -------------------------
-# Voice transcription helper (OpenAI) — English only
-# -------------------------
-def transcribe_audio_bytes(audio_bytes: bytes, prefer_model: str = "gpt-4o-transcribe") -> str:
-    """
-    Saves the bytes to a temp WAV file and transcribes with OpenAI.
-    Prefers gpt-4o-transcribe; falls back to whisper-1. Language forced to English when possible.
-    """
-    if not audio_bytes:
-        return ""
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-        tmp.write(audio_bytes)
-        tmp_path = tmp.name
-    try:
-        with open(tmp_path, "rb") as f:
-            # Try preferred model WITH language hint
-            try:
-                r = client.audio.transcriptions.create(model=prefer_model, file=f, language="en")
-            except Exception:
-                try:
-                    # Retry preferred model WITHOUT language if param unsupported
-                    f.seek(0)
-                    r = client.audio.transcriptions.create(model=prefer_model, file=f)
-                except Exception:
-                    # Fall back to Whisper with language=en
-                    f.seek(0)
-                    try:
-                        r = client.audio.transcriptions.create(model="whisper-1", file=f, language="en")
-                    except Exception:
-                        f.seek(0)
-                        r = client.audio.transcriptions.create(model="whisper-1", file=f)
-        return (getattr(r, "text", "") or "").strip()
-    finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+    for example in EXAMPLE_QUERIES:  # answers precomputed by `python -m warmup`
+        st.code(example, language="markdown")
+
+def retrieve_in_context(text: str) -> Dict[str, Any]:
+    """retrieve() for this conversation: refinements carry the previous request, past picks are excluded."""
+    return retrieve(
+        conversation.search_query(text),
+        exclude=conversation.exclude_titles(),
+        themes=conversation.boost_themes(text),
+    )
 
 # -------------------------
 # Capture input: Voice ONLY when voice_mode is ON; otherwise text chat
 # -------------------------
 transcribed_msg = None
+turn_trace = None  # one trace per chat turn (see tracing.py)
+voice_futures: Dict[str, Any] = {}  # moderation/retrieval already started on the streamed transcript
 if voice_mode:
     audio_bytes = audio_recorder()  # click to start/stop; returns WAV bytes
     if audio_bytes:
+        turn_trace = tracing.begin("turn", input="voice")
+        partial_box = st.empty()
         with st.spinner("Transcribing (English only)..."):
-            transcribed_msg = transcribe_audio_bytes(audio_bytes)
-        if transcribed_msg:
-            if not is_english_text(transcribed_msg):
-                st.warning("Voice mode accepts **English speech only**. Please try again in English.")
-                transcribed_msg = None
-            else:
-                st.info(f"🎤 You said (EN): {transcribed_msg}")
+            try:
+                heard = listen(
+                    audio_bytes,
+                    {"moderation": check_with_openai_moderation, "retrieval": retrieve_in_context},
+                    get_executor(),
+                    on_partial=lambda text: partial_box.caption(f"🎤 {text}…"),
+                )
+            except Exception as e:
+                # e.g. a clip too short to transcribe: only this turn fails
+                heard = {"text": None, "rejected": False, "futures": {}, "speculation": {}, "error": e}
+        partial_box.empty()
+        if heard.get("error") is not None:
+            turn_trace.attrs["route"] = "transcription_error"
+            st.warning(f"Couldn't transcribe that recording ({type(heard['error']).__name__}). Please try again.")
+        elif heard["rejected"]:
+            turn_trace.attrs["route"] = "not_english"
+            st.warning("Voice mode accepts **English speech only**. Please try again in English.")
+        elif heard["text"]:
+            transcribed_msg = heard["text"]
+            voice_futures = heard["futures"]
+            turn_trace.attrs["speculation"] = heard["speculation"]
+            st.info(f"🎤 You said (EN): {transcribed_msg}")
 
 # While Voice mode is ON, disable typed input (voice only).
 typed_msg = None if voice_mode else st.chat_input("What would you like to read?")
 user_msg = transcribed_msg if transcribed_msg else typed_msg
 
+retrieval_future = None
+precomputed = None  # warm-up answer for this exact request (see precomputed.py)
 if user_msg:
-    # Always append the user message so it's visible in the transcript
-    st.session_state.messages.append({"role": "user", "content": user_msg})
-
-    # 1) External moderation: if blocked, DO NOT call RAG/LLM — reply politely
-    moderation = check_with_openai_moderation(user_msg)
+    if turn_trace is None:
+        turn_trace = tracing.begin("turn", input="text")
+    turn_trace.attrs["query"] = user_msg  # lets `python -m warmup --log` pick popular requests from TRACE_LOG
+    # Always append the user message so it's visible in the transcript (and jump back to the newest page)
+    conversation.add("user", user_msg)
+    st.session_state.history_page = 0
+
+    # Moderation and retrieval (query embedding + semantic cache + Chroma search) run concurrently;
+    # retrieval is skipped for summary follow-ups, which never need it, and for requests with a
+    # precomputed answer (served only once moderation has allowed the message).
+    wants_summary = is_followup_for_summary(user_msg) and st.session_state.last_reco_title
+    if not wants_summary and not conversation.is_refinement(user_msg):
+        precomputed = precomputed_answer(user_msg, exclude=conversation.exclude_titles())
+    moderation_future = voice_futures.get("moderation") or get_executor().submit(
+        tracing.bind_context(check_with_openai_moderation), user_msg
+    )
+    if not wants_summary and precomputed is None:
+        retrieval_future = voice_futures.get("retrieval") or get_executor().submit(
+            tracing.bind_context(retrieve_in_context), user_msg
+        )
+    elif "retrieval" in voice_futures:
+        voice_futures["retrieval"].cancel()
+    # 1) External moderation: if blocked, DO NOT call the LLM and throw the retrieval away — reply politely
+    moderation = moderation_future.result()
     if moderation["blocked"]:
+        if retrieval_future is not None:
+            retrieval_future.cancel()
+            retrieval_future = None
+        precomputed = None
+        turn_trace.attrs["route"] = "blocked"
         reasons = f" (content filter: {', '.join(moderation['reasons'])})" if moderation["reasons"] else ""
-        st.session_state.messages.append({"role": "assistant", "content": BLOCK_MESSAGE + reasons})
+        conversation.add("assistant", BLOCK_MESSAGE + reasons)
         st.session_state["skip_infer_once"] = True
     else:
+        conversation.record_query(user_msg)  # only allowed requests feed the reading profile
         # 2) Follow-up: if user asks for more/summary and we have a last recommendation,
         #    skip RAG/LLM and show the summary directly.
-        if is_followup_for_summary(user_msg) and st.session_state.last_reco_title:
-            title = st.session_state.last_reco_title
+        if wants_summary:
+            turn_trace.attrs["route"] = "summary_followup"
+            # "tell me more about Dune" names its book; otherwise use the last recommendation
+            title = get_title_index().find_in_text(user_msg) or st.session_state.last_reco_title
             try:
-                summary = get_summary_by_title(title)
+                title, summary = resolve_summary(title)
                 with st.chat_message("assistant"):
                     st.markdown('<div class="block-card">', unsafe_allow_html=True)
                     st.markdown('<div class="badge">Summary</div>', unsafe_allow_html=True)
                     st.markdown(f'<div class="reco-title">{title}</div>', unsafe_allow_html=True)
                     st.write(summary)
                     st.markdown('</div>', unsafe_allow_html=True)
-                st.session_state.messages.append({"role": "assistant", "content": summary})
+                conversation.add("assistant", summary, title=title)
                 st.session_state["skip_infer_once"] = True
             except Exception as e:
-                st.session_state.messages.append({"role": "assistant", "content": f"Sorry, couldn't fetch the summary: {e}"})
+                conversation.add("assistant", f"Sorry, couldn't fetch the summary: {e}")
                 st.session_state["skip_infer_once"] = True
 
 # -------------------------
-# Render existing history
-# -------------------------
-for m in st.session_state.messages:
-    if m["role"] == "user":
-        with st.chat_message("user"):
-            st.write(m["content"])
-    elif m["role"] == "assistant":
-        with st.chat_message("assistant"):
-            st.write(m["content"])
-
-# -------------------------
-# Core inference (RAG -> LLM choose -> Tool -> Final answer)
+# Render history: one page of HISTORY_PAGE_SIZE messages (newest page by default)
 # -------------------------
-def model_choose_and_call_tool(user_query: str) -> Dict[str, Any]:
-    """RAG -> GPT with tool schema (forced call) -> execute local tool -> final text + chosen title."""
-    # 1) Retrieve top candidates (semantic search)
-    candidates = rag.search(user_query, k=3)
-    candidates_json = json.dumps(candidates, ensure_ascii=False)
-
-    # 2) First call: FORCE the tool call so the model doesn't “ask first”
-    first_messages: List[Dict[str, str]] = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_query},
-        {"role": "system", "content": f"Candidates (JSON): {candidates_json}"}
-    ]
-
-    first = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=first_messages,
-        tools=TOOL_SCHEMA,
-        tool_choice={"type": "function", "function": {"name": "get_summary_by_title"}},  # force call
-        temperature=0.2
-    )
-
-    choice = first.choices[0].message
-    tool_calls = choice.tool_calls or []
-
-    # 3) Execute tool(s) locally and capture outputs
-    tool_messages: List[Dict[str, str]] = []
-    chosen_title = None
-    assistant_tool_calls_payload = []
-
-    for tc in tool_calls:
-        assistant_tool_calls_payload.append({
-            "id": getattr(tc, "id", getattr(tc, "tool_call_id", None)),
-            "type": "function",
-            "function": {
-                "name": getattr(tc.function, "name", None) if getattr(tc, "function", None) else None,
-                "arguments": getattr(tc.function, "arguments", None) if getattr(tc, "function", None) else None,
-            }
-        })
-
-        if getattr(tc, "type", "function") == "function" and getattr(tc, "function", None):
-            fn_name = getattr(tc.function, "name", "")
-            if fn_name == "get_summary_by_title":
-                args_raw = getattr(tc.function, "arguments", "{}") or "{}"
-                try:
-                    args = json.loads(args_raw)
-                except Exception:
-                    args = {}
-                title = (args.get("title") or "").strip()
-                if title:
-                    chosen_title = title
-                else:
-                    # Fallback: if the model forgot to pass a title, pick the top candidate
-                    if candidates:
-                        chosen_title = candidates[0]["title"]
-                        args["title"] = chosen_title
-
-                try:
-                    summary = get_summary_by_title(chosen_title)
-                    tool_messages.append({
-                        "role": "tool",
-                        "tool_call_id": assistant_tool_calls_payload[-1]["id"],
-                        "content": summary
-                    })
-                except Exception as e:
-                    tool_messages.append({
-                        "role": "tool",
-                        "tool_call_id": assistant_tool_calls_payload[-1]["id"],
-                        "content": f"Error: {e}"
-                    })
-
-    # 4) Second call: send back tool outputs so the model can compose the final answer
-    second_messages: List[Dict[str, Any]] = first_messages + [
-        {
-            "role": "assistant",
-            "content": choice.content or "",
-            "tool_calls": assistant_tool_calls_payload
-        },
-        *tool_messages
-    ]
-
-    second = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=second_messages,
-        temperature=0.2
-    )
-
-    final_text = second.choices[0].message.content or "I couldn't generate a final answer."
-    return {"final_text": final_text, "title": chosen_title}
+history_page = st.session_state.get("history_page", 0)
+shown, has_older = conversation.page(history_page, config.HISTORY_PAGE_SIZE)
+if has_older or history_page:
+    older_col, newer_col = st.columns(2)
+    older_col.button("⬆ Earlier messages", disabled=not has_older,
+                     on_click=lambda: st.session_state.update(history_page=history_page + 1))
+    newer_col.button("⬇ Newer messages", disabled=not history_page,
+                     on_click=lambda: st.session_state.update(history_page=history_page - 1))
+if not has_older and conversation.dropped():
+    st.caption(f"{conversation.dropped()} older messages are no longer kept.")
+for m in shown:
+    with st.chat_message(m["role"]):
+        st.write(m["content"])
 
 # Run inference only if the last message is a user message and we didn't block or handle follow-up locally
+last_message = conversation.last()
 if (
-    st.session_state.messages
-    and st.session_state.messages[-1]["role"] == "user"
+    last_message
+    and last_message["role"] == "user"
     and not st.session_state.get("skip_infer_once")
 ):
+    user_query = last_message["content"]
+    turn_query = conversation.search_query(user_query)  # includes the previous request for refinements
     with st.chat_message("assistant"):
-        with st.spinner("Searching the library…"):
-            result = model_choose_and_call_tool(st.session_state.messages[-1]["content"])
+        t0 = time.perf_counter()
+        if precomputed is not None:
+            hit, query_embedding, prepared = precomputed, None, precomputed
+        else:
+            with st.spinner("Searching the library…"):
+                retrieval = retrieval_future.result() if retrieval_future is not None else retrieve_in_context(user_query)
+                hit, query_embedding = retrieval["hit"], retrieval["embedding"]
+                prepared = hit or prepare_recommendation(turn_query, candidates=retrieval["candidates"])
         # Store last recommendation for follow-ups
-        if result.get("title"):
-            st.session_state.last_reco_title = result["title"]
+        if prepared.get("title"):
+            st.session_state.last_reco_title = prepared["title"]
 
+        # Title + badge render as soon as the tool call resolves; the answer streams in below
         st.markdown('<div class="block-card">', unsafe_allow_html=True)
-        if result.get("title"):
+        if prepared.get("title"):
             st.markdown('<div class="badge">My recommendation</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="reco-title">{result.get("title") or "Answer"}</div>', unsafe_allow_html=True)
-        st.write(result["final_text"])
+        st.markdown(f'<div class="reco-title">{prepared.get("title") or "Answer"}</div>', unsafe_allow_html=True)
+        first_token_at = []
+
+        def _timed_tokens():
+            for tok in stream_final_text(prepared):
+                if not first_token_at:
+                    first_token_at.append(time.perf_counter())
+                yield tok
+
+        final_text = st.write_stream(_timed_tokens())
         st.markdown('</div>', unsafe_allow_html=True)
+        done_at = time.perf_counter()
 
-    st.session_state.messages.append({"role": "assistant", "content": result["final_text"]})
+        turn = {
+            "ttft_ms": round(((first_token_at[0] if first_token_at else done_at) - t0) * 1000, 1),
+            "total_ms": round((done_at - t0) * 1000, 1),
+            "cached": hit is not None,
+            "trace_id": turn_trace.trace_id if turn_trace else None,
+        }
+        if turn_trace is not None:
+            turn_trace.attrs.update(route="precomputed" if precomputed is not None else "recommendation",
+                                    cached=hit is not None, ttft_ms=turn["ttft_ms"],
+                                    mode=prepared.get("mode"), title=prepared.get("title"))
+        st.session_state.setdefault("turn_metrics", []).append(turn)
+        del st.session_state.turn_metrics[:-50]
+        st.markdown(
+            f'<div class="small-muted">First token {turn["ttft_ms"]:.0f} ms · total {turn["total_ms"]:.0f} ms</div>',
+            unsafe_allow_html=True
+        )
+
+    if hit is None:
+        semantic_store(turn_query, query_embedding, {"final_text": final_text, "title": prepared.get("title")})
+    conversation.add("assistant", final_text, title=prepared.get("title"))
+    conversation.record_recommendation(turn_query, prepared.get("title"))
 
 # Reset the one-turn skip flag if it was set
 if st.session_state.get("skip_infer_once"):
     del st.session_state["skip_infer_once"]
+
+# -------------------------
+# Close the turn trace (+ optional per-stage breakdown in the sidebar)
+# -------------------------
+if turn_trace is not None:
+    tracing.finish(turn_trace)
+    st.session_state.last_trace = {**turn_trace.to_dict(), "breakdown": turn_trace.breakdown()}
+
+if config.DEBUG_PANEL:
+    with st.sidebar:
+        st.divider()
+        st.markdown("#### Last turn (debug)")
+        last = st.session_state.get("last_trace")
+        if not last:
+            st.caption("No turn traced yet.")
+        else:
+            usage = last["usage"]
+            st.caption(
+                f"trace `{last['trace_id']}` · {last['duration_ms']:.0f} ms · "
+                f"{last['attrs'].get('route', '')} · tokens {usage.get('prompt_tokens', 0)} in / "
+                f"{usage.get('completion_tokens', 0)} out"
+            )
+            st.table([{"stage": name, "ms": round(ms, 1)} for name, ms in last["breakdown"]])
+        profile = conversation.profile.to_dict()
+        st.caption(
+            f"profile: genres {', '.join(profile['genres']) or '—'} · themes {', '.join(profile['themes']) or '—'} · "
+            f"{len(conversation.recommended)} already recommended"
+        )
+        st.markdown("#### Process stats")
+        for name, stats in tracing.gauges().items():
+            groups = {k: v for k, v in stats.items() if isinstance(v, dict)}
+            flat = {k: v for k, v in stats.items() if not isinstance(v, dict)}
+            rows = [{"": name, **flat}] if flat else []
+            rows += [{"": f"{name} · {group}", **values} for group, values in groups.items()]
+            if rows:
+                st.dataframe(rows, hide_index=True)
@@ -0,0 +1,2 @@
+# bench/__init__.py
+# Benchmarks. Run from the repo root, e.g.: python -m bench.bench_startup
@@ -0,0 +1,118 @@
+# bench/bench_chunking.py
+# Chunk size / overlap trade-off: recall vs. index size vs. query latency (see rag.chunk_record).
+# Each configuration is indexed into a throwaway Chroma directory (the app's index and manifest
+# are untouched); embeddings go through the shared cache, so repeated runs are cheap.
+# Dense retrieval only — the BM25 side of hybrid search does not depend on chunking.
+#
+# Usage: python -m bench.bench_chunking [--configs 0:0,200:50,400:100,800:200] [--k 3]
+#                                       [--labels labels.jsonl] [--out chunking.json]
+#   configs: size:overlap in characters (0 = one document per book)
+#   labels : one {"query", "title"} object per line (default: a few queries over the bundled catalog)
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+import chromadb
+
+import config
+from ingest import batched, iter_records
+from rag import DATA_MD, COLLECTION_NAME, RAGEngine, bootstrap_index, chunk_record, get_embedding_function
+
+DEFAULT_LABELS = [
+    {"query": "A society where the government watches everyone and rewrites history.", "title": "1984"},
+    {"query": "A hobbit travels with dwarves to take back treasure from a dragon.", "title": "The Hobbit"},
+    {"query": "A lawyer defends an innocent man in the segregated South.", "title": "To Kill a Mockingbird"},
+    {"query": "A young wizard discovers his magical heritage at a school of magic.", "title": "Harry Potter and the Sorcerer's Stone"},
+    {"query": "Death narrates the story of a girl who steals books in Nazi Germany.", "title": "The Book Thief"},
+    {"query": "A father and son walk through a burned, ruined America.", "title": "The Road"},
+    {"query": "Political intrigue on a desert planet with spice and prophecy.", "title": "Dune"},
+    {"query": "Firemen burn books in a society that fears ideas.", "title": "Fahrenheit 451"},
+    {"query": "A student commits murder and is consumed by guilt.", "title": "Crime and Punishment"},
+    {"query": "Children fight to the death in a televised spectacle.", "title": "The Hunger Games"},
+]
+
+def _parse_configs(spec: str) -> List[Tuple[int, int]]:
+    out = []
+    for item in spec.split(","):
+        size, _, overlap = item.partition(":")
+        out.append((int(size), int(overlap or 0)))
+    return out
+
+def _dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+def _build(records: List[Dict[str, Any]], path: Path):
+    """Index the records under the current chunk settings; returns (collection, documents, seconds)."""
+    emb_fn = get_embedding_function()
+    col = chromadb.PersistentClient(path=str(path)).get_or_create_collection(
+        name=COLLECTION_NAME, embedding_function=emb_fn
+    )
+    docs = [d for r in records for d in chunk_record(r)]
+    t0 = time.perf_counter()
+    for batch in batched(docs, 64, 200_000):
+        col.upsert(
+            ids=[d["id"] for d in batch],
+            documents=[d["text"] for d in batch],
+            metadatas=[d["metadata"] for d in batch],
+            embeddings=list(emb_fn([d["text"] for d in batch])),
+        )
+    return col, len(docs), time.perf_counter() - t0
+
+def run(configs: List[Tuple[int, int]], labels: List[Dict[str, str]], k: int) -> List[Dict[str, Any]]:
+    bootstrap_index()  # the summary store backs per-book grouping
+    records = list(iter_records([DATA_MD]))
+    config.HYBRID_SEARCH = False
+    rows = []
+    for size, overlap in configs:
+        config.CHUNK_SIZE, config.CHUNK_OVERLAP = size, overlap
+        with tempfile.TemporaryDirectory() as tmp:
+            col, n_docs, build_s = _build(records, Path(tmp))
+            engine = RAGEngine(col=col)
+            engine.search(labels[0]["query"], k=k)  # warm-up (HNSW load, embedding cache)
+            latencies, hits, rr = [], 0, 0.0
+            for label in labels:
+                t0 = time.perf_counter()
+                titles = [r["title"] for r in engine.search(label["query"], k=k)]
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if label["title"] in titles:
+                    hits += 1
+                    rr += 1.0 / (titles.index(label["title"]) + 1)
+            rows.append({
+                "chunk_size": size,
+                "chunk_overlap": overlap,
+                "documents": n_docs,
+                "index_bytes": _dir_bytes(Path(tmp)),
+                "build_seconds": build_s,
+                f"recall@{k}": hits / len(labels),
+                "mrr": rr / len(labels),
+                "query_mean_ms": statistics.fmean(latencies),
+                "query_p50_ms": sorted(latencies)[len(latencies) // 2],
+            })
+    return rows
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--configs", default="0:0,200:50,400:100,800:200")
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--labels", type=Path, default=None)
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+
+    labels = DEFAULT_LABELS
+    if args.labels:
+        labels = [json.loads(line) for line in args.labels.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    report = {"k": args.k, "queries": len(labels), "aggregation": config.CHUNK_AGGREGATION,
+              "results": run(_parse_configs(args.configs), labels, args.k)}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# bench/bench_intent.py
+# Accuracy and speed of the follow-up / English-only detectors: intent.py against the previous
+# implementation (regex alternation over textnorm.normalize, list-based letter ratio), kept below
+# as the baseline. Accuracy is measured on the labelled EN/RO corpus in bench/intent_corpus.py, twice:
+# on the lists intent.py was tuned against ("tuned") and on the held-out lists ("held_out") — the
+# latter is the number to quote.
+#
+# Usage: python -m bench.bench_intent [--number 20000] [--out intent.json]
+# Prints a summary; the full report (with misclassified texts) is written only when --out is given.
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Tuple
+
+import intent
+from bench.intent_corpus import FOLLOWUPS, FOLLOWUPS_HELDOUT, LANGUAGE, LANGUAGE_HELDOUT
+from textnorm import normalize
+
+# -------------------------
+# Baseline (previous app.py / voice.py detectors)
+# -------------------------
+LEGACY_FOLLOWUP_REGEX = re.compile("|".join([
+    r"\byes\b", r"\bok\b", r"\byep\b", r"\byup\b",
+    r"\btell me more\b", r"\bmore\b", r"\bsummary\b", r"\bdetails?\b",
+    r"\bshow (me )?(more|the summary)\b",
+    r"\bda\b", r"\bas vrea sa stiu mai multe\b", r"\bmai multe\b", r"\bvreau rezumat\b",
+    r"\bvreau detalii\b", r"\bspune-mi mai multe\b", r"\bvreau sa stiu mai multe\b"
+]))
+LEGACY_DIACRITICS = set("ăâîșțşţĂÂÎȘȚŞŢ")
+
+def legacy_is_followup(text: str) -> bool:
+    return bool(LEGACY_FOLLOWUP_REGEX.search(normalize(text)))
+
+def legacy_is_english(text: str, threshold: float = 0.9) -> bool:
+    if any(ch in LEGACY_DIACRITICS for ch in text):
+        return False
+    letters = [ch for ch in text if ch.isalpha()]
+    if not letters:
+        return False
+    ascii_letters = [ch for ch in letters if ("A" <= ch <= "Z") or ("a" <= ch <= "z")]
+    return len(ascii_letters) / len(letters) >= threshold
+
+DETECTORS: Dict[str, Dict[str, Callable[[str], bool]]] = {
+    "followup": {"legacy": legacy_is_followup, "intent": intent.is_followup_for_summary},
+    "english": {"legacy": legacy_is_english, "intent": intent.is_english_text},
+}
+CORPORA = {
+    "followup": {"tuned": FOLLOWUPS, "held_out": FOLLOWUPS_HELDOUT},
+    "english": {"tuned": LANGUAGE, "held_out": LANGUAGE_HELDOUT},
+}
+
+def accuracy(fn: Callable[[str], bool], corpus: List[Tuple[str, bool]]) -> Dict[str, Any]:
+    tp = fp = fn_ = tn = 0
+    errors = []
+    for text, label in corpus:
+        got = fn(text)
+        tp += got and label
+        fp += got and not label
+        fn_ += label and not got
+        tn += not got and not label
+        if got != label:
+            errors.append(text)
+    return {
+        "accuracy": (tp + tn) / len(corpus),
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn_) if tp + fn_ else 0.0,
+        "errors": errors,
+    }
+
+def ns_per_call(fn: Callable[[str], bool], texts: List[str], number: int) -> float:
+    rounds = max(1, number // len(texts))
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for text in texts:
+                fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best / (rounds * len(texts)) * 1e9
+
+def run(number: int) -> Dict[str, Any]:
+    report: Dict[str, Any] = {}
+    for task, impls in DETECTORS.items():
+        splits = CORPORA[task]
+        texts = [text for corpus in splits.values() for text, _ in corpus]
+        report[task] = {
+            name: {**{split: accuracy(fn, corpus) for split, corpus in splits.items()},
+                   "ns_per_call": round(ns_per_call(fn, texts, number))}
+            for name, fn in impls.items()
+        }
+        legacy, new = report[task]["legacy"]["ns_per_call"], report[task]["intent"]["ns_per_call"]
+        report[task]["speedup"] = round(legacy / new, 2) if new else None
+    return report
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--number", type=int, default=20000, help="calls per timing round")
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+
+    report = run(args.number)
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(json.dumps({
+        task: {"speedup": r["speedup"], **{
+            name: {
+                split: {k: round(v, 3) for k, v in scores.items() if k != "errors"}
+                if isinstance(scores, dict) else scores
+                for split, scores in r[name].items()
+            }
+            for name in ("legacy", "intent")
+        }}
+        for task, r in report.items()
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# bench/bench_reco_modes.py
+# Latency / agreement comparison of the two recommendation modes (see recommender.py).
+# The semantic cache is bypassed; every query runs the full pipeline in both modes.
+#
+# Usage: python -m bench.bench_reco_modes [--queries queries.txt] [--repeat 3] [--out reco_modes.json]
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+from recommender import RECO_MODES, model_choose_and_call_tool
+
+DEFAULT_QUERIES = [
+    "I want a book about freedom and social control.",
+    "What do you recommend if I love fantasy adventures?",
+    "I want friendship and magic.",
+    "Something about guilt and redemption.",
+    "A story about war told from an unusual perspective.",
+    "Dystopian novels about censorship.",
+]
+
+def _percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def run(queries: List[str], repeat: int) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = {m: [] for m in RECO_MODES}
+    answers: List[Dict[str, Any]] = []
+    for q in queries:
+        row: Dict[str, Any] = {"query": q}
+        for mode in RECO_MODES:
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                result = model_choose_and_call_tool(q, mode=mode)
+                latencies[mode].append((time.perf_counter() - t0) * 1000)
+            row[mode] = {"title": result.get("title"), "final_text": result.get("final_text")}
+        row["same_title"] = row[RECO_MODES[0]]["title"] == row[RECO_MODES[1]]["title"]
+        answers.append(row)
+
+    modes = {
+        m: {
+            "n": len(xs),
+            "mean_ms": statistics.fmean(xs),
+            "p50_ms": _percentile(xs, 50),
+            "p95_ms": _percentile(xs, 95),
+        }
+        for m, xs in latencies.items()
+    }
+    return {
+        "modes": modes,
+        "title_agreement": sum(a["same_title"] for a in answers) / len(answers),
+        "answers": answers,  # for side-by-side quality review
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--queries", type=Path, help="one query per line")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", type=Path, default=Path("reco_modes.json"))
+    args = ap.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        queries = [l.strip() for l in args.queries.read_text(encoding="utf-8").splitlines() if l.strip()]
+    report = run(queries, args.repeat)
+    args.out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(json.dumps({"modes": report["modes"], "title_agreement": report["title_agreement"]}, indent=2))
+
+if __name__ == "__main__":
+    main()
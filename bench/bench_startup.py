@@ -0,0 +1,67 @@
+# bench/bench_startup.py
+# Startup / rerun overhead: per-rerun resource setup before vs. after the shared resource layer.
+#
+#   legacy  : what every Streamlit rerun used to do — OpenAI() + bootstrap_index() + RAGEngine()
+#   cold    : first rerun in a fresh process through resources.py
+#   warm    : every later rerun through resources.py (the hot path)
+#
+# Usage: python -m bench.bench_startup [--reruns 20]
+
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from openai import OpenAI
+
+import resources
+from rag import RAGEngine, bootstrap_index
+
+def _time(fn: Callable[[], object], n: int) -> List[float]:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+def _legacy_rerun() -> None:
+    OpenAI()
+    bootstrap_index()
+    RAGEngine()
+
+def _shared_rerun() -> None:
+    resources.get_openai_client()
+    resources.ensure_index()
+    resources.get_rag_engine()
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": ordered[len(ordered) // 2],
+        "max_ms": ordered[-1],
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--reruns", type=int, default=20)
+    args = ap.parse_args()
+
+    resources.reset()
+    cold = _time(_shared_rerun, 1)
+    warm = _time(_shared_rerun, args.reruns)
+    legacy = _time(_legacy_rerun, args.reruns)
+
+    report = {
+        "legacy_per_rerun": _summary(legacy),
+        "shared_cold": _summary(cold),
+        "shared_warm_per_rerun": _summary(warm),
+    }
+    report["speedup_p50"] = report["legacy_per_rerun"]["p50_ms"] / max(report["shared_warm_per_rerun"]["p50_ms"], 1e-6)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# bench/bench_vector_backends.py
+# Query latency of the two vector backends on synthetic catalogs (see local_backends.py):
+#   chroma : HNSW (approximate) — also reports its recall@k against the exact result
+#   numpy  : memory-mapped matrix, exact top-k (one matrix-vector product + argpartition)
+# Vectors are random unit vectors, so no embedding calls are made; both stores live in temp dirs.
+#
+# Usage: python -m bench.bench_vector_backends [--sizes 1000,5000,20000] [--dim 1536] [--queries 200] [--out backends.json]
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+import chromadb
+import numpy as np
+
+from local_backends import NumpyVectorStore
+
+def _unit(rng: np.random.Generator, n: int, dim: int) -> np.ndarray:
+    v = rng.standard_normal((n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+def _load(store, vectors: np.ndarray, batch: int = 1000) -> float:
+    t0 = time.perf_counter()
+    for i in range(0, len(vectors), batch):
+        ids = [f"b{j}" for j in range(i, min(i + batch, len(vectors)))]
+        store.upsert(ids=ids, documents=ids, metadatas=[{"title": x} for x in ids], embeddings=vectors[i:i + batch])
+    return time.perf_counter() - t0
+
+def _latencies(store, queries: np.ndarray, k: int) -> Dict[str, Any]:
+    samples, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        out = store.query(query_embeddings=[q], n_results=k)
+        samples.append((time.perf_counter() - t0) * 1000)
+        results.append(out["ids"][0])
+    ordered = sorted(samples)
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": ordered[int(0.95 * (len(ordered) - 1))],
+        "ids": results,
+    }
+
+def run(sizes: List[int], dim: int, n_queries: int, k: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for n in sizes:
+        vectors = _unit(rng, n, dim)
+        queries = _unit(rng, n_queries, dim)
+        with tempfile.TemporaryDirectory() as tmp:
+            numpy_store = NumpyVectorStore(Path(tmp) / "numpy")
+            chroma_store = chromadb.PersistentClient(path=str(Path(tmp) / "chroma")).get_or_create_collection(
+                name="bench_vectors", embedding_function=None
+            )
+            load = {"numpy": _load(numpy_store, vectors), "chroma": _load(chroma_store, vectors)}
+            exact = _latencies(numpy_store, queries, k)
+            approx = _latencies(chroma_store, queries, k)
+            recall = statistics.fmean(len(set(a) & set(e)) / k for a, e in zip(approx.pop("ids"), exact.pop("ids")))
+            t0 = time.perf_counter()
+            numpy_store.query(query_embeddings=queries, n_results=k)
+            batch_ms = (time.perf_counter() - t0) * 1000
+        rows.append({
+            "documents": n,
+            "dim": dim,
+            "load_seconds": load,
+            "numpy": {**exact, "batch_per_query_ms": batch_ms / n_queries},
+            "chroma": {**approx, f"recall@{k}_vs_exact": recall},
+        })
+    return rows
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", default="1000,5000,20000")
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+
+    report = {"results": run([int(s) for s in args.sizes.split(",")], args.dim, args.queries, args.k)}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# bench/catalog.py
+# Deterministic synthetic catalogs in the data/book_summaries.md format (`## Title:` blocks).
+# Titles are unique; summaries mix a genre, a setting, characters and themes so that lexical and
+# dense retrieval both have something to match.
+#
+# Usage: python -m bench.catalog 10000 --out /tmp/catalog_10k.md [--seed 1]
+
+import argparse
+import random
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+ADJECTIVES = [
+    "Silent", "Burning", "Hidden", "Last", "Broken", "Golden", "Forgotten", "Crimson", "Endless", "Hollow",
+    "Wandering", "Northern", "Glass", "Iron", "Secret", "Distant", "Midnight", "Paper", "Winter", "Shattered",
+]
+NOUNS = [
+    "Garden", "River", "Crown", "Library", "Harbor", "Orchard", "Tower", "Archive", "Mountain", "Lantern",
+    "Empire", "Forest", "Mirror", "Voyage", "Kingdom", "Island", "Storm", "Letter", "Bridge", "Compass",
+]
+FIRST = ["Ana", "Mihai", "Elena", "Tom", "Clara", "Radu", "Iris", "Jonah", "Maya", "Victor", "Lena", "Paul"]
+LAST = ["Popescu", "Hart", "Ionescu", "Vale", "Marin", "Reed", "Stan", "Crane", "Dobre", "Frost", "Lupu", "Shaw"]
+GENRES = {
+    "dystopian": "in a dystopian state where surveillance and censorship rule every home",
+    "fantasy": "in a fantasy realm of magic, dragons and ancient wizards",
+    "science fiction": "aboard a spaceship drifting toward an unexplored galaxy",
+    "war": "during World War II, as the front line creeps closer each week",
+    "romance": "in a quiet seaside town where an unexpected love story begins",
+    "coming of age": "in a small town where a teenager learns who they want to become",
+    "mystery": "in a fog-bound city where a detective follows a trail of coded letters",
+    "post-apocalyptic": "in a post-apocalyptic wasteland where every journey is a gamble",
+}
+THEMES = [
+    "friendship", "courage", "freedom", "identity", "loss", "hope", "power", "betrayal", "family",
+    "memory", "justice", "redemption", "sacrifice", "ambition", "love", "truth", "survival", "loyalty",
+]
+ACTIONS = [
+    "must decide whom to trust", "uncovers a secret that changes everything", "sets out on a dangerous journey",
+    "fights to protect a younger sibling", "questions everything they were taught", "searches for a missing friend",
+    "confronts the cost of ambition", "learns to forgive an old enemy",
+]
+
+def title_for(i: int) -> str:
+    a = ADJECTIVES[i % len(ADJECTIVES)]
+    n = NOUNS[(i // len(ADJECTIVES)) % len(NOUNS)]
+    cycle = i // (len(ADJECTIVES) * len(NOUNS))
+    return f"The {a} {n}" + (f" {cycle + 1}" if cycle else "")
+
+def iter_books(n: int, seed: int = 1) -> Iterator[Dict[str, str]]:
+    rng = random.Random(seed)
+    genres = list(GENRES)
+    for i in range(n):
+        genre = rng.choice(genres)
+        hero = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+        themes = rng.sample(THEMES, 3)
+        summary = (
+            f"Set {GENRES[genre]}, {hero} {rng.choice(ACTIONS)}. "
+            f"Along the way, {hero.split()[0]} {rng.choice(ACTIONS)}, and the story turns on "
+            f"{themes[0]} and {themes[1]}."
+        )
+        yield {"title": title_for(i), "summary": summary, "themes": ", ".join(themes), "genre": genre}
+
+def to_markdown(books: Iterator[Dict[str, str]]) -> Iterator[str]:
+    for b in books:
+        yield f"## Title: {b['title']}\n{b['summary']}\n**Themes:** {b['themes']}.\n\n"
+
+def write_catalog(n: int, path: Path, seed: int = 1) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        f.writelines(to_markdown(iter_books(n, seed)))
+    return path
+
+def sample_queries(n: int, seed: int = 2) -> List[str]:
+    """Free-text reader requests in the style the app receives (all distinct)."""
+    rng = random.Random(seed)
+    genres = list(GENRES)
+    out: List[str] = []
+    seen = set()
+    while len(out) < n:
+        q = rng.choice([
+            f"I want a {rng.choice(genres)} book about {rng.choice(THEMES)}.",
+            f"Something about {rng.choice(THEMES)} and {rng.choice(THEMES)}.",
+            f"A story where someone {rng.choice(ACTIONS)}.",
+            f"Recommend a {rng.choice(genres)} novel with {rng.choice(THEMES)} and {rng.choice(THEMES)}.",
+        ])
+        q = f"{q} ({len(out)})" if q in seen else q
+        seen.add(q)
+        out.append(q)
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("n", type=int)
+    ap.add_argument("--out", type=Path, required=True)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    write_catalog(args.n, args.out, args.seed)
+    print(f"wrote {args.n} books to {args.out}")
+
+if __name__ == "__main__":
+    main()
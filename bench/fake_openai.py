@@ -0,0 +1,340 @@
+# bench/fake_openai.py
+# Local stand-in for the OpenAI HTTP API, for benchmarks and offline runs.
+# Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 (any OPENAI_API_KEY works).
+#
+#   POST /v1/embeddings            deterministic vectors (hashed n-grams: similar texts -> similar vectors)
+#   POST /v1/chat/completions      picks the first candidate; tool calls, json_schema and stream=True supported
+#   POST /v1/moderations           flags texts containing FLAGGED_WORDS
+#   POST /v1/audio/transcriptions  returns a fixed transcript; stream=true sends it as word deltas
+#
+# Every endpoint sleeps for its configured latency (+ uniform jitter) before answering; a streamed
+# transcript spreads its latency over the deltas (like audio being decoded), so a client can act on
+# the first words before the last arrive.
+# Faults for exercising gateway.py: a share of requests per endpoint can be refused with 429 (+ Retry-After)
+# or stalled for --stall-ms before being answered.
+#
+# Usage: python -m bench.fake_openai [--port 8089] [--latency embeddings=30,chat=400,moderations=80,transcriptions=600]
+#                                    [--rate-limit chat=0.3] [--retry-after-ms 200] [--stall embeddings=0.1] [--stall-ms 5000]
+
+import argparse
+import base64
+import email.parser
+import email.policy
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from local_backends import HashingEmbeddingFunction
+
+DEFAULT_LATENCY_MS = {"embeddings": 0.0, "chat": 0.0, "moderations": 0.0, "transcriptions": 0.0}
+FLAGGED_WORDS = ("kill", "murder", "hate you")
+TRANSCRIPT = "I want a fantasy book about friendship and magic."
+_CANDIDATES_RE = re.compile(r"Candidates \(JSON\):\s*(\[.*\])", re.DOTALL)
+
+def _form_fields(raw: bytes, content_type: str) -> Dict[str, Any]:
+    """Text fields of a multipart/form-data body (file parts are skipped)."""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + raw
+    )
+    fields: Dict[str, Any] = {}
+    for part in message.iter_parts() if message.is_multipart() else []:
+        name = part.get_param("name", header="content-disposition")
+        if name and not part.get_filename():
+            fields[name] = part.get_content().strip()
+    return fields
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def _candidate_titles(messages: List[Dict[str, Any]]) -> List[str]:
+    for m in messages:
+        found = _CANDIDATES_RE.search(m.get("content") or "") if isinstance(m.get("content"), str) else None
+        if found:
+            try:
+                return [c["title"] for c in json.loads(found.group(1))]
+            except (ValueError, KeyError, TypeError):
+                return []
+    return []
+
+class FakeOpenAIServer:
+    """Threaded HTTP server; use as a context manager or start()/stop(). `base_url` ends in /v1."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: Optional[Dict[str, float]] = None,
+        jitter_ms: float = 0.0,
+        dim: int = 1536,
+        transcript: str = TRANSCRIPT,
+        rate_limit: Optional[Dict[str, float]] = None,
+        retry_after_ms: float = 200.0,
+        stall: Optional[Dict[str, float]] = None,
+        stall_ms: float = 5000.0,
+    ):
+        self.latency_ms = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+        self.jitter_ms = jitter_ms
+        self.transcript = transcript
+        # share of requests per endpoint answered 429 / answered only after stall_ms
+        self.rate_limit = dict(rate_limit or {})
+        self.retry_after_ms = retry_after_ms
+        self.stall = dict(stall or {})
+        self.stall_ms = stall_ms
+        self.embedder = HashingEmbeddingFunction(dim=dim)
+        self.requests: Dict[str, int] = {k: 0 for k in DEFAULT_LATENCY_MS}
+        self.rate_limited: Dict[str, int] = {k: 0 for k in DEFAULT_LATENCY_MS}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _refuse(self, endpoint: str) -> bool:
+        """Count the request; True if it is to be answered with a 429."""
+        refuse = random.random() < self.rate_limit.get(endpoint, 0.0)
+        with self._lock:
+            self.requests[endpoint] += 1
+            if refuse:
+                self.rate_limited[endpoint] += 1
+        return refuse
+
+    def _delay(self, endpoint: str, spread: int = 0) -> float:
+        """Sleep the request's latency; with spread=n, sleep nothing and return the per-part share."""
+        ms = self.latency_ms.get(endpoint, 0.0) + random.uniform(0, self.jitter_ms)
+        if random.random() < self.stall.get(endpoint, 0.0):
+            ms += self.stall_ms
+        if spread:
+            return ms / spread
+        if ms > 0:
+            time.sleep(ms / 1000)
+        return 0.0
+
+    # ---- endpoint logic (returns the JSON body)
+    def embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = body.get("input")
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs or [])
+        texts = [t if isinstance(t, str) else " ".join(map(str, t)) for t in inputs]
+        dim = int(body.get("dimensions") or self.embedder.dim)
+        embedder = self.embedder if dim == self.embedder.dim else HashingEmbeddingFunction(dim=dim)
+        data = []
+        for i, vec in enumerate(embedder(texts)):
+            vec = np.asarray(vec, dtype=np.float32)
+            if body.get("encoding_format") == "base64":
+                payload: Any = base64.b64encode(vec.tobytes()).decode("ascii")
+            else:
+                payload = vec.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": payload})
+        used = sum(_tokens(t) for t in texts)
+        return {"object": "list", "data": data, "model": body.get("model"),
+                "usage": {"prompt_tokens": used, "total_tokens": used}}
+
+    def chat(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        messages = body.get("messages") or []
+        titles = _candidate_titles(messages)
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        finish = "stop"
+        tool_results = [m.get("content") or "" for m in messages if m.get("role") == "tool"]
+        fmt = body.get("response_format") or {}
+        if body.get("tools") and not tool_results:
+            message["tool_calls"] = [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": body["tools"][0]["function"]["name"],
+                             "arguments": json.dumps({"title": titles[0] if titles else ""})},
+            }]
+            finish = "tool_calls"
+        elif fmt.get("type") == "json_schema":
+            schema = fmt["json_schema"]["schema"]["properties"]
+            title = (schema.get("title", {}).get("enum") or titles or [""])[0]
+            message["content"] = json.dumps({"title": title, "justification": f"{title} matches what you asked for."})
+        elif tool_results:
+            message["content"] = f"I recommend this one. Here is the full summary:\n\n{tool_results[-1]}"
+        else:
+            message["content"] = "I can only recommend books. What would you like to read?"
+        prompt = sum(_tokens(str(m.get("content") or "")) for m in messages)
+        completion = _tokens(message["content"] or json.dumps(message.get("tool_calls")))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+            "usage": {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion},
+        }
+
+    def moderations(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = body.get("input")
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs or [])
+        results = []
+        for text in inputs:
+            flagged = any(w in str(text).lower() for w in FLAGGED_WORDS)
+            categories = {"harassment": flagged, "violence": flagged, "self-harm": False, "sexual": False, "hate": False}
+            results.append({
+                "flagged": flagged,
+                "categories": categories,
+                "category_scores": {k: 0.9 if v else 0.01 for k, v in categories.items()},
+            })
+        return {"id": f"modr-{uuid.uuid4().hex[:12]}", "model": body.get("model"), "results": results}
+
+    def transcriptions(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        return {"text": self.transcript}
+
+    def _handler(self):
+        server = self
+        routes = {
+            "/v1/embeddings": ("embeddings", server.embeddings),
+            "/v1/chat/completions": ("chat", server.chat),
+            "/v1/moderations": ("moderations", server.moderations),
+            "/v1/audio/transcriptions": ("transcriptions", server.transcriptions),
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _send(self, status: int, payload: bytes, content_type: str = "application/json",
+                      headers: Optional[Dict[str, str]] = None) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out and hung up (stalled responses)
+
+            def do_POST(self) -> None:
+                route = routes.get(self.path.split("?")[0])
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if route is None:
+                    self._send(404, json.dumps({"error": {"message": f"unknown path {self.path}"}}).encode())
+                    return
+                endpoint, fn = route
+                body: Dict[str, Any] = {}
+                content_type = self.headers.get("Content-Type") or ""
+                if "json" in content_type:
+                    body = json.loads(raw or b"{}")
+                elif content_type.startswith("multipart/form-data"):
+                    body = _form_fields(raw, content_type)
+                if server._refuse(endpoint):
+                    error = {"error": {"message": "Rate limit reached for requests", "type": "requests",
+                                       "code": "rate_limit_exceeded"}}
+                    self._send(429, json.dumps(error).encode(), headers={
+                        "retry-after-ms": str(int(server.retry_after_ms)),
+                        "retry-after": f"{server.retry_after_ms / 1000:g}",
+                    })
+                    return
+                streaming = str(body.get("stream")).lower() == "true"
+                if endpoint == "transcriptions" and streaming:
+                    words = re.findall(r"\S+\s*", server.transcript)
+                    self._stream_transcript(words, server._delay(endpoint, spread=max(1, len(words))))
+                    return
+                server._delay(endpoint)
+                result = fn(body)
+                if endpoint == "chat" and body.get("stream"):
+                    self._stream(result, body)
+                else:
+                    self._send(200, json.dumps(result).encode("utf-8"))
+
+            def _stream(self, result: Dict[str, Any], body: Dict[str, Any]) -> None:
+                """Server-sent events: the answer in word-sized deltas, then [DONE]."""
+                message = result["choices"][0]["message"]
+                base = {k: result[k] for k in ("id", "created", "model")} | {"object": "chat.completion.chunk"}
+                words = re.findall(r"\S+\s*", message.get("content") or "")
+                events = [{**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}]
+                events += [{**base, "choices": [{"index": 0, "delta": {"content": w}, "finish_reason": None}]} for w in words]
+                events.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    events.append({**base, "choices": [], "usage": result["usage"]})
+                self._send_events(events)
+
+            def _stream_transcript(self, words: List[str], delay_ms: float) -> None:
+                """transcript.text.delta events (one per word, `delay_ms` apart), then transcript.text.done."""
+                events = [{"type": "transcript.text.delta", "delta": w} for w in words]
+                events.append({"type": "transcript.text.done", "text": "".join(words)})
+                self._send_events(events, delay_ms, before=len(words))
+
+            def _send_events(self, events: List[Dict[str, Any]], delay_ms: float = 0.0, before: int = 0) -> None:
+                """Write events as SSE; the first `before` events each wait `delay_ms` first."""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    for i, event in enumerate(events):
+                        if i < before and delay_ms > 0:
+                            time.sleep(delay_ms / 1000)
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client stopped reading (e.g. cut off a non-English transcript)
+                self.close_connection = True
+
+        return Handler
+
+def parse_latency(spec: str) -> Dict[str, float]:
+    """'embeddings=30,chat=400' -> {'embeddings': 30.0, 'chat': 400.0} (also used for --rate-limit/--stall)"""
+    out: Dict[str, float] = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, ms = item.partition("=")
+        out[name.strip()] = float(ms)
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency", default="", help="per-endpoint latency in ms, e.g. embeddings=30,chat=400")
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--transcript", default=TRANSCRIPT, help="text returned by /v1/audio/transcriptions")
+    ap.add_argument("--rate-limit", default="", help="share of requests refused with 429, e.g. chat=0.3,embeddings=0.1")
+    ap.add_argument("--retry-after-ms", type=float, default=200.0, help="Retry-After sent with each 429")
+    ap.add_argument("--stall", default="", help="share of requests stalled by --stall-ms, e.g. chat=0.05")
+    ap.add_argument("--stall-ms", type=float, default=5000.0)
+    args = ap.parse_args()
+    server = FakeOpenAIServer(args.host, args.port, parse_latency(args.latency), args.jitter_ms,
+                              transcript=args.transcript, rate_limit=parse_latency(args.rate_limit),
+                              retry_after_ms=args.retry_after_ms, stall=parse_latency(args.stall),
+                              stall_ms=args.stall_ms).start()
+    print(f"fake OpenAI listening on {server.base_url} (Ctrl+C to stop)", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
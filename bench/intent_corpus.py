@@ -0,0 +1,169 @@
+# bench/intent_corpus.py
+# Labelled EN/RO messages for bench/bench_intent.py.
+# FOLLOWUPS: replies sent right after a recommendation — True when they ask for that book's summary,
+# False when they are a new request (incl. refinements such as "something darker").
+# LANGUAGE: transcripts — True when the voice gate should accept them as English.
+# The phrase weights in intent.py were tuned against FOLLOWUPS and LANGUAGE; the *_HELDOUT lists are
+# messages written afterwards and never used for tuning (nor asserted on in tests/): the benchmark
+# reports them separately as the estimate of accuracy on unseen text. Do not tune against them —
+# move a message into the tuned lists first.
+
+FOLLOWUPS = [
+    # asking for the summary of the last recommendation
+    ("yes", True),
+    ("Yes please!", True),
+    ("ok", True),
+    ("Okay, sure.", True),
+    ("yep", True),
+    ("Tell me more.", True),
+    ("tell me more about it", True),
+    ("Tell me more about Dune", True),
+    ("Can you tell me more about that book?", True),
+    ("What's it about?", True),
+    ("What is the book about?", True),
+    ("Show me the summary", True),
+    ("show me more", True),
+    ("I want the full summary.", True),
+    ("Summary please", True),
+    ("Give me more details", True),
+    ("Is there a summary?", True),
+    ("More info please", True),
+    ("go on", True),
+    ("Sure, give me the details.", True),
+    ("da", True),
+    ("Da, te rog!", True),
+    ("sigur", True),
+    ("Spune-mi mai multe", True),
+    ("spune-mi mai multe despre ea", True),
+    ("Aș vrea să știu mai multe.", True),
+    ("Vreau să știu mai multe despre carte", True),
+    ("Vreau rezumatul", True),
+    ("vreau rezumat", True),
+    ("Vreau detalii", True),
+    ("Mai multe detalii, te rog", True),
+    ("Despre ce e vorba?", True),
+    ("Arată-mi rezumatul", True),
+    ("ok, spune-mi mai multe", True),
+    ("more", True),
+    ("More please", True),
+    ("sure, more please", True),
+    ("I want a summary", True),
+    ("A summary, please", True),
+    ("Tell me more about this book", True),
+    ("Spune-mi mai multe despre cartea asta", True),
+    # new requests and refinements
+    ("More books like Dune", False),
+    ("more like that but darker", False),
+    ("I want more fantasy", False),
+    ("Recommend me another book", False),
+    ("Something else please", False),
+    ("Do you have something more recent?", False),
+    ("I'd like a book about friendship and magic.", False),
+    ("What do you recommend if I love fantasy adventures?", False),
+    ("I want a book about freedom and social control.", False),
+    ("Any novels about the sea?", False),
+    ("Yes, but I want something shorter", False),
+    ("ok now something about war", False),
+    ("I love detailed world building, any suggestions?", False),
+    ("A story told from an unusual perspective", False),
+    ("Looking for a mystery with a female detective", False),
+    ("More science fiction please", False),
+    ("Give me a romance instead", False),
+    ("Something similar but funnier", False),
+    ("I'm looking for books about the ocean", False),
+    ("Dystopian novels about censorship.", False),
+    ("Vreau o carte despre prietenie", False),
+    ("Mai multe cărți ca Dune", False),
+    ("Recomandă-mi ceva asemănător", False),
+    ("Altceva, te rog", False),
+    ("Vreau ceva mai scurt", False),
+    ("Da, dar vreau ceva mai vesel", False),
+    ("O carte despre război", False),
+    ("Caut o carte de aventuri", False),
+    ("Ceva mai întunecat", False),
+    ("Vreau un roman polițist", False),
+    ("Tell me more about fantasy books", False),
+    ("Tell me more about science fiction", False),
+    ("I want a thriller", False),
+    ("more horror", False),
+    ("Spune-mi mai multe despre cărți fantasy", False),
+]
+
+LANGUAGE = [
+    ("I want a book about freedom and social control.", True),
+    ("What do you recommend if I love fantasy adventures?", True),
+    ("Something like Les Misérables but shorter", True),
+    ("A novel set in São Paulo, please", True),
+    ("tell me more about Brontë", True),
+    ("Recommend a café-themed cozy mystery", True),
+    ("I loved Pokémon as a kid, any fantasy like that?", True),
+    ("ok", True),
+    ("books about war and friendship", True),
+    ("Vreau o carte despre prietenie și magie.", False),
+    ("Aș vrea ceva despre libertate", False),
+    ("Ce îmi recomanzi dacă iubesc aventurile?", False),
+    ("Spune-mi mai multe despre carte", False),
+    ("O poveste despre război, țară și familie", False),
+    ("Ich möchte ein Buch über Freundschaft, bitte schön", False),
+    ("Je voudrais un roman très émouvant, s'il vous plaît, où l'été dure", False),
+    ("Хочу книгу о свободе", False),
+    ("???", False),
+]
+
+# -------------------------
+# Held out (never tuned against)
+# -------------------------
+FOLLOWUPS_HELDOUT = [
+    ("Yeah", True),
+    ("sure thing", True),
+    ("Tell me about it", True),
+    ("What happens in it?", True),
+    ("Could I get the summary?", True),
+    ("more details please", True),
+    ("I'd like to know more about that book", True),
+    ("Give me the synopsis", True),
+    ("ok tell me more", True),
+    ("What's the plot?", True),
+    ("Da, vreau rezumatul", True),
+    ("Spune-mi despre ea", True),
+    ("Care e rezumatul?", True),
+    ("Ce se întâmplă în carte?", True),
+    ("Bine, mai multe detalii", True),
+    ("Any other suggestions?", False),
+    ("Something with dragons", False),
+    ("I'd prefer a classic", False),
+    ("What about a biography?", False),
+    ("Books like The Hobbit", False),
+    ("No, something happier", False),
+    ("Can you suggest a historical novel?", False),
+    ("Yes, but not fantasy", False),
+    ("A thriller set in Paris", False),
+    ("Do you have poetry?", False),
+    ("Ceva cu dragoni", False),
+    ("Vreau o carte istorică", False),
+    ("Nu, altceva", False),
+    ("Recomandă-mi un thriller", False),
+    ("Ai ceva de poezie?", False),
+]
+
+LANGUAGE_HELDOUT = [
+    ("Anything by Gabriel García Márquez?", True),
+    ("A book like Cien años de soledad", True),
+    ("I want a thriller set in Zürich", True),
+    ("can you recommend a cozy fantasy", True),
+    ("Something like La La Land but a book", True),
+    ("An e-book about Napoleon", True),
+    ("yes please", True),
+    ("Tell me about Amélie", True),
+    ("Books about the Tour de France", True),
+    ("Vreau ceva despre dragoste", False),
+    ("Care este cea mai buna carte de aventuri", False),
+    ("As vrea o carte cu dragoni si magie", False),
+    ("Recomanda-mi un roman politist", False),
+    ("Quiero un libro sobre el mar", False),
+    ("Ich suche einen Krimi mit einer Kommissarin", False),
+    ("Je cherche un livre sur la mer", False),
+    ("Voglio un libro d'avventura", False),
+    ("Хочу детектив", False),
+    ("¿Tienes algo de ciencia ficción?", False),
+]
@@ -0,0 +1,156 @@
+# bench/load_test.py
+# Load test for the headless service (service.py) against the local OpenAI stand-in.
+#
+# A synthetic catalog is written to a temp working directory, the fake OpenAI server is started with
+# the given per-endpoint latency, and `python -m service` is launched there. Then `--clients`
+# concurrent keep-alive connections send requests for `--duration` seconds (after a warm-up), each
+# sending its next request as soon as the previous one is answered (closed loop).
+# Reported: sustained RPS (2xx only), latency p50/p95/p99/max of successful requests, status counts
+# (503 = shed by backpressure, 504 = deadline), and the requests the fake API received.
+#
+# Usage: python -m bench.load_test [--books 1000] [--clients 64] [--duration 20] [--endpoint recommend]
+#                                  [--concurrency 16] [--queue 64] [--timeout 10]
+#                                  [--latency embeddings=30,chat=400,moderations=80] [--out load.json]
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+from bench.catalog import sample_queries, write_catalog
+from bench.fake_openai import FakeOpenAIServer, parse_latency
+from bench.run_suite import REPO_ROOT, _git_commit, _percentiles
+
+async def _request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, path: str,
+                   body: Dict[str, Any]) -> Tuple[int, bytes]:
+    payload = json.dumps(body).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+async def _client(host: str, port: int, path: str, queries: List[str], stop_at: float, record_after: float,
+                  latencies: List[float], statuses: Dict[int, int]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < stop_at:
+            q = queries[i % len(queries)]
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                status, _ = await _request(reader, writer, path, {"query": q})
+            except (ConnectionError, asyncio.IncompleteReadError, IndexError, ValueError):
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                status = 0  # connection dropped
+            if t0 < record_after:
+                continue
+            statuses[status] = statuses.get(status, 0) + 1
+            if 200 <= status < 300:
+                latencies.append((time.perf_counter() - t0) * 1000)
+            elif status == 503:
+                await asyncio.sleep(0.05)  # honour Retry-After loosely, like a polite client
+    finally:
+        writer.close()
+
+async def _drive(base_url: str, path: str, clients: int, duration: float, warmup: float,
+                 queries: List[str]) -> Dict[str, Any]:
+    host, port = base_url.split("//", 1)[1].rsplit(":", 1)
+    start = time.perf_counter()
+    record_after, stop_at = start + warmup, start + warmup + duration
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    await asyncio.gather(*(
+        _client(host, int(port), path, queries[c::clients] or queries, stop_at, record_after, latencies, statuses)
+        for c in range(clients)
+    ))
+    measured = time.perf_counter() - record_after
+    ok = sum(n for s, n in statuses.items() if 200 <= s < 300)
+    return {
+        "rps": ok / measured,
+        "latency": _percentiles(latencies) | {"max_ms": max(latencies)} if latencies else None,
+        "status": {str(s): n for s, n in sorted(statuses.items())},
+        "measured_seconds": measured,
+    }
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    latency_ms = parse_latency(args.latency)
+    report: Dict[str, Any] = {
+        "git": _git_commit(),
+        "settings": {k: v for k, v in vars(args).items() if k != "out"} | {"latency_ms": latency_ms},
+    }
+    with FakeOpenAIServer(latency_ms=latency_ms, jitter_ms=args.jitter_ms) as fake, \
+            tempfile.TemporaryDirectory(prefix="load_") as workdir:
+        write_catalog(args.books, Path(workdir) / "data" / "book_summaries.md")
+        env = {
+            **os.environ,
+            "OPENAI_BASE_URL": fake.base_url,
+            "OPENAI_API_KEY": "bench",
+            "SERVICE_MAX_CONCURRENCY": str(args.concurrency),
+            "SERVICE_MAX_QUEUE": str(args.queue),
+            "SERVICE_TIMEOUT_SECONDS": str(args.timeout),
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])),
+        }
+        proc = subprocess.Popen([sys.executable, "-m", "service", "--port", "0"], cwd=workdir, env=env,
+                                stdout=subprocess.PIPE, text=True)
+        try:
+            t0 = time.perf_counter()
+            line = proc.stdout.readline()  # "serving N books on http://host:port" once the index is built
+            if not line:
+                raise RuntimeError("service exited before it started serving")
+            report["startup_seconds"] = time.perf_counter() - t0
+            base_url = line.split()[-1]
+            before = dict(fake.requests)
+            # distinct queries so every request exercises the full pipeline, not the semantic cache
+            queries = sample_queries(args.queries, seed=7)
+            report["result"] = asyncio.run(
+                _drive(base_url, f"/v1/{args.endpoint}", args.clients, args.duration, args.warmup, queries)
+            )
+            report["api_requests"] = {k: v - before.get(k, 0) for k, v in fake.requests.items()}
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+    return report
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--books", type=int, default=1000)
+    ap.add_argument("--endpoint", choices=("recommend", "search"), default="recommend")
+    ap.add_argument("--clients", type=int, default=64)
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--warmup", type=float, default=3.0)
+    ap.add_argument("--queries", type=int, default=5000)
+    ap.add_argument("--concurrency", type=int, default=16, help="SERVICE_MAX_CONCURRENCY of the service")
+    ap.add_argument("--queue", type=int, default=64, help="SERVICE_MAX_QUEUE of the service")
+    ap.add_argument("--timeout", type=float, default=10.0, help="SERVICE_TIMEOUT_SECONDS of the service")
+    ap.add_argument("--latency", default="embeddings=30,chat=400,moderations=80",
+                    help="injected per-endpoint latency of the fake API, in ms")
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--out", type=Path, default=None)
+    args = ap.parse_args()
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
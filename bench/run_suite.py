@@ -0,0 +1,177 @@
+# bench/run_suite.py
+# Retrieval + end-to-end benchmark suite against the local OpenAI stand-in (bench/fake_openai.py).
+#
+# For each catalog size a synthetic catalog (bench/catalog.py) is written to a fresh temp working
+# directory and measured in its own process (so every index, cache and side store starts cold):
+#   parse      : parse_books_md throughput
+#   bootstrap  : bootstrap_index cold, unchanged re-run, and incremental (1% of books edited)
+#   search     : RAGEngine.search p50/p95/p99 latency and QPS for each k
+#   pipeline   : model_choose_and_call_tool latency (retrieval + chat + tool)
+# The report is JSON (with the git commit), so two runs can be diffed.
+#
+# Usage: python -m bench.run_suite [--sizes 1000,10000,100000] [--k 1,3,10] [--queries 200]
+#                                  [--pipeline-queries 20] [--latency embeddings=30,chat=400] [--out bench.json]
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+from bench.catalog import sample_queries, write_catalog
+from bench.fake_openai import FakeOpenAIServer, parse_latency
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def _percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+
+    def pick(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {"n": len(ordered), "mean_ms": statistics.fmean(ordered), "p50_ms": pick(50), "p95_ms": pick(95), "p99_ms": pick(99)}
+
+def _git_commit() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+# -------------------------
+# Worker: one catalog size, run inside its working directory
+# -------------------------
+def _edit_catalog(path: Path, every: int = 100) -> int:
+    """Change the summary of every `every`-th book in place; returns how many were edited."""
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    edited, book = 0, -1
+    for i, line in enumerate(lines):
+        if line.startswith("## Title:"):
+            book += 1
+            if book % every == 0 and i + 1 < len(lines):
+                lines[i + 1] = lines[i + 1].rstrip("\n") + " A revised edition adds a new epilogue.\n"
+                edited += 1
+    path.write_text("".join(lines), encoding="utf-8")
+    return edited
+
+def run_worker(ks: List[int], n_queries: int, n_pipeline: int) -> Dict[str, Any]:
+    from rag import DATA_MD, RAGEngine, bootstrap_index, parse_books_md
+    from recommender import model_choose_and_call_tool
+
+    report: Dict[str, Any] = {}
+    text = DATA_MD.read_text(encoding="utf-8")
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        books = parse_books_md(text)
+        best = min(best, time.perf_counter() - t0)
+    report["parse"] = {"books": len(books), "seconds": best, "books_per_sec": len(books) / best,
+                       "mb_per_sec": len(text.encode("utf-8")) / 1e6 / best}
+
+    timings = {}
+    for phase in ("cold", "unchanged"):
+        t0 = time.perf_counter()
+        bootstrap_index()
+        timings[f"{phase}_seconds"] = time.perf_counter() - t0
+    timings["edited_books"] = _edit_catalog(DATA_MD)
+    t0 = time.perf_counter()
+    bootstrap_index()
+    timings["incremental_seconds"] = time.perf_counter() - t0
+    report["bootstrap"] = timings
+
+    engine = RAGEngine()
+    engine.search("warm-up query", k=3)
+    report["search"] = {}
+    for k in ks:
+        latencies = []
+        queries = sample_queries(n_queries, seed=1000 + k)  # fresh per k: no embedding-cache hits
+        t_all = time.perf_counter()
+        for q in queries:
+            t0 = time.perf_counter()
+            engine.search(q, k=k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        wall = time.perf_counter() - t_all
+        report["search"][f"k={k}"] = {**_percentiles(latencies), "qps": len(queries) / wall}
+    report["search"]["routes"] = dict(engine.stats)
+
+    latencies = []
+    for q in sample_queries(n_pipeline, seed=99):
+        t0 = time.perf_counter()
+        model_choose_and_call_tool(q)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    report["pipeline"] = _percentiles(latencies)
+    return report
+
+# -------------------------
+# Driver
+# -------------------------
+def run(sizes: List[int], ks: List[int], n_queries: int, n_pipeline: int,
+        latency_ms: Dict[str, float], jitter_ms: float) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "git": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": {"sizes": sizes, "k": ks, "queries": n_queries, "pipeline_queries": n_pipeline,
+                     "latency_ms": latency_ms, "jitter_ms": jitter_ms},
+        "results": {},
+    }
+    with FakeOpenAIServer(latency_ms=latency_ms, jitter_ms=jitter_ms) as server:
+        env = {
+            **os.environ,
+            "OPENAI_BASE_URL": server.base_url,
+            "OPENAI_API_KEY": "bench",
+            "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])),
+        }
+        for n in sizes:
+            with tempfile.TemporaryDirectory(prefix=f"bench_{n}_") as workdir:
+                write_catalog(n, Path(workdir) / "data" / "book_summaries.md")
+                before = dict(server.requests)
+                proc = subprocess.run(
+                    [sys.executable, "-m", "bench.run_suite", "--worker",
+                     "--k", ",".join(map(str, ks)), "--queries", str(n_queries),
+                     "--pipeline-queries", str(n_pipeline)],
+                    cwd=workdir, env=env, capture_output=True, text=True,
+                )
+                if proc.returncode != 0:
+                    raise RuntimeError(f"benchmark worker failed for {n} books:\n{proc.stderr}")
+                result = json.loads(proc.stdout.strip().splitlines()[-1])
+                result["api_requests"] = {k: v - before.get(k, 0) for k, v in server.requests.items()}
+                report["results"][str(n)] = result
+                print(f"{n} books done", file=sys.stderr, flush=True)
+    return report
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--k", default="1,3,10")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--pipeline-queries", type=int, default=20)
+    ap.add_argument("--latency", default="embeddings=30,chat=400,moderations=80,transcriptions=600",
+                    help="injected per-endpoint latency of the fake API, in ms")
+    ap.add_argument("--jitter-ms", type=float, default=10.0)
+    ap.add_argument("--out", type=Path, default=None)
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    ks = [int(k) for k in args.k.split(",")]
+
+    if args.worker:
+        print(json.dumps(run_worker(ks, args.queries, args.pipeline_queries)))
+        return
+
+    report = run([int(s) for s in args.sizes.split(",")], ks, args.queries, args.pipeline_queries,
+                 parse_latency(args.latency), args.jitter_ms)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
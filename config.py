@@ -0,0 +1,138 @@
+# config.py
+# Runtime settings; every value can be overridden through the environment (or .env)
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _flag(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+# -------------------------
+# Semantic response cache (see semantic_cache.py)
+# -------------------------
+SEMANTIC_CACHE_ENABLED = _flag("SEMANTIC_CACHE_ENABLED", True)
+# cosine similarity required to reuse a previous answer
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(6 * 3600)))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048"))
+
+# -------------------------
+# Recommendation pipeline (see recommender.py)
+# -------------------------
+# "two_call": forced tool call + second completion; "single_call": one structured-output call
+RECO_MODE = os.getenv("RECO_MODE", "two_call").strip().lower()
+
+# -------------------------
+# Retrieval (see rag.RAGEngine / lexical.py)
+# -------------------------
+# fuse BM25 keyword results with the dense results (reciprocal-rank fusion)
+HYBRID_SEARCH = _flag("HYBRID_SEARCH", True)
+# candidates taken from each retriever before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# serve decisive keyword matches from the lexical index alone (no embedding call)
+LEXICAL_FAST_PATH = _flag("LEXICAL_FAST_PATH", True)
+LEXICAL_FAST_PATH_MARGIN = float(os.getenv("LEXICAL_FAST_PATH_MARGIN", "2.0"))
+# distance bonus per query theme a document is tagged with (see rag.extract_metadata)
+THEME_BOOST = float(os.getenv("THEME_BOOST", "0.05"))
+# narrow the vector search with metadata filters implied by the query ("dystopia" -> genre)
+METADATA_FILTERS = _flag("METADATA_FILTERS", True)
+
+# -------------------------
+# Chunked indexing (see rag.chunk_record); changing these re-indexes the catalog
+# -------------------------
+# passage size in characters; 0 indexes every book as a single document
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "0"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+# how passage hits add up to a book score: "max" (best passage) or "sum" (all passages)
+CHUNK_AGGREGATION = os.getenv("CHUNK_AGGREGATION", "max").strip().lower()
+# passages fetched per requested book, so grouping still yields k distinct books
+CHUNK_QUERY_FANOUT = int(os.getenv("CHUNK_QUERY_FANOUT", "4"))
+
+# -------------------------
+# Backends (see local_backends.py); each combination keeps its own index
+# -------------------------
+# "openai" (text-embedding-3-small, cached) or "hashing" (local n-gram projection, offline)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").strip().lower()
+HASH_EMBED_DIM = int(os.getenv("HASH_EMBED_DIM", "512"))
+# "chroma" (HNSW) or "numpy" (memory-mapped matrix, exact search)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").strip().lower()
+
+# -------------------------
+# Voice transcription (see transcription.py)
+# -------------------------
+TRANSCRIBE_MODEL = os.getenv("TRANSCRIBE_MODEL", "gpt-4o-transcribe")
+# recordings are downsampled to this rate (mono 16-bit) before upload; 0 = send as recorded
+TRANSCRIBE_SAMPLE_RATE = int(os.getenv("TRANSCRIBE_SAMPLE_RATE", "16000"))
+# a model/parameter combination that failed is skipped for this long before it is tried again
+TRANSCRIPTION_BREAKER_TTL_SECONDS = float(os.getenv("TRANSCRIPTION_BREAKER_TTL_SECONDS", "600"))
+# stream the transcript (voice.py): the English check runs on partials and cuts non-English speech off early
+VOICE_STREAMING = _flag("VOICE_STREAMING", True)
+# start moderation + retrieval on the partial transcript once it has this many words
+VOICE_SPECULATE_MIN_WORDS = int(os.getenv("VOICE_SPECULATE_MIN_WORDS", "4"))
+# ... and once the partial has not changed for this long (a pause) or ends a sentence
+VOICE_SPECULATE_DEBOUNCE_MS = float(os.getenv("VOICE_SPECULATE_DEBOUNCE_MS", "300"))
+# speculative runs per utterance (a started run cannot be cancelled, so each costs its API calls)
+VOICE_SPECULATE_MAX_RUNS = int(os.getenv("VOICE_SPECULATE_MAX_RUNS", "2"))
+# letters needed before a partial transcript can be rejected as non-English
+VOICE_GATE_MIN_LETTERS = int(os.getenv("VOICE_GATE_MIN_LETTERS", "12"))
+
+# -------------------------
+# Conversation memory (see conversation.py)
+# -------------------------
+# user/assistant turns kept per session (older ones are dropped)
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "25"))
+# messages rendered per page of the chat history
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "10"))
+# never recommend a book twice in one conversation
+EXCLUDE_RECOMMENDED = _flag("EXCLUDE_RECOMMENDED", True)
+# weight kept by older preferences at each new observation (0..1)
+PROFILE_DECAY = float(os.getenv("PROFILE_DECAY", "0.8"))
+
+# -------------------------
+# Precomputed answers (see precomputed.py / warmup.py)
+# -------------------------
+# serve requests matching a warmed query (case/punctuation-insensitive) from the precomputed table
+PRECOMPUTED_ANSWERS = _flag("PRECOMPUTED_ANSWERS", True)
+
+# -------------------------
+# Headless service (see service.py)
+# -------------------------
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8080"))
+# requests running at once; up to SERVICE_MAX_QUEUE more wait, the rest get 503 + Retry-After
+SERVICE_MAX_CONCURRENCY = int(os.getenv("SERVICE_MAX_CONCURRENCY", "16"))
+SERVICE_MAX_QUEUE = int(os.getenv("SERVICE_MAX_QUEUE", "64"))
+# per-request deadline, queueing included (504 when exceeded)
+SERVICE_TIMEOUT_SECONDS = float(os.getenv("SERVICE_TIMEOUT_SECONDS", "30"))
+
+# -------------------------
+# OpenAI gateway (see gateway.py); every OpenAI call goes through it
+# -------------------------
+# keep-alive connections in the shared OpenAI client's pool
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+# per-request timeout (seconds) per endpoint
+OPENAI_TIMEOUT_CHAT = float(os.getenv("OPENAI_TIMEOUT_CHAT", "30"))
+OPENAI_TIMEOUT_EMBEDDINGS = float(os.getenv("OPENAI_TIMEOUT_EMBEDDINGS", "10"))
+OPENAI_TIMEOUT_MODERATIONS = float(os.getenv("OPENAI_TIMEOUT_MODERATIONS", "10"))
+OPENAI_TIMEOUT_TRANSCRIPTIONS = float(os.getenv("OPENAI_TIMEOUT_TRANSCRIPTIONS", "30"))
+# retries after 429 / 5xx / timeouts, with full-jitter exponential backoff (at least Retry-After)
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+OPENAI_BACKOFF_BASE_SECONDS = float(os.getenv("OPENAI_BACKOFF_BASE_SECONDS", "0.5"))
+OPENAI_BACKOFF_MAX_SECONDS = float(os.getenv("OPENAI_BACKOFF_MAX_SECONDS", "8"))
+# requests per minute allowed per endpoint (local token bucket, sized to the account tier); 0 = unlimited
+OPENAI_RPM_CHAT = float(os.getenv("OPENAI_RPM_CHAT", "500"))
+OPENAI_RPM_EMBEDDINGS = float(os.getenv("OPENAI_RPM_EMBEDDINGS", "3000"))
+OPENAI_RPM_MODERATIONS = float(os.getenv("OPENAI_RPM_MODERATIONS", "1000"))
+OPENAI_RPM_TRANSCRIPTIONS = float(os.getenv("OPENAI_RPM_TRANSCRIPTIONS", "50"))
+
+# -------------------------
+# Tracing / metrics (see tracing.py)
+# -------------------------
+# append one JSON line per chat turn (stage spans + token usage) to this file; empty = off
+TRACE_LOG = os.getenv("TRACE_LOG", "").strip()
+# serve Prometheus metrics on http://127.0.0.1:<port>/metrics; 0 = off
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# show the per-stage breakdown of the last turn in the sidebar
+DEBUG_PANEL = _flag("DEBUG_PANEL", False)
@@ -0,0 +1,117 @@
+# conversation.py
+# Bounded per-session conversation state (kept in st.session_state by app.py)
+# ---------------------------------------------------------------------------
+# - messages: ring buffer of the last HISTORY_MAX_TURNS user/assistant turns (older ones are dropped,
+#   so a long session's memory stays flat); page() serves the transcript newest-first in pages
+# - recommended: titles already recommended, excluded from later candidates
+# - profile: rolling genre/theme weights from the chosen books and the genres asked for;
+#   older observations decay, so the profile follows the reader
+# - search_query(): follow-ups like "something darker than that" are searched together with the
+#   previous request instead of on their own (refinement cues: intent.REFINEMENT_PHRASES)
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+import config
+from intent import is_refinement
+from rag import extract_metadata, query_genres, slug
+from tools import get_summary_store
+
+MAX_QUERY_WORDS = 60  # chained refinements keep only the most recent words
+
+class PreferenceProfile:
+    """Decaying weights per genre/theme slug; observe() multiplies older weights by `decay` first."""
+
+    def __init__(self, decay: float = 0.8, max_items: int = 24):
+        self.decay = decay
+        self.max_items = max_items
+        self.genres: Dict[str, float] = {}
+        self.themes: Dict[str, float] = {}
+
+    def observe(self, genres: List[str] = (), themes: List[str] = (), weight: float = 1.0) -> None:
+        for table, items in ((self.genres, genres), (self.themes, themes)):
+            for key in list(table):
+                table[key] *= self.decay
+            for item in items:
+                table[item] = table.get(item, 0.0) + weight
+            # keep the table small: drop the weakest entries
+            for key in sorted(table, key=table.get)[:max(0, len(table) - self.max_items)]:
+                del table[key]
+
+    def observe_title(self, title: str) -> None:
+        """Learn from a recommended book's own metadata (its Themes/Genre lines)."""
+        hit = get_summary_store().lookup(title)
+        if not hit:
+            return
+        meta = extract_metadata(hit[1])
+        self.observe(
+            genres=[k[len("genre_"):] for k in meta if k.startswith("genre_")],
+            themes=[k[len("theme_"):] for k in meta if k.startswith("theme_")],
+        )
+
+    def top_genres(self, n: int = 3) -> List[str]:
+        return sorted(self.genres, key=self.genres.get, reverse=True)[:n]
+
+    def top_themes(self, n: int = 3) -> List[str]:
+        return sorted(self.themes, key=self.themes.get, reverse=True)[:n]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"genres": self.top_genres(), "themes": self.top_themes()}
+
+class Conversation:
+    def __init__(self, max_turns: int = 25, max_recommended: int = 20, decay: float = 0.8):
+        self.messages: "deque[Dict[str, Any]]" = deque(maxlen=2 * max_turns)
+        self.recommended: "deque[str]" = deque(maxlen=max_recommended)
+        self.profile = PreferenceProfile(decay)
+        self.total = 0  # messages ever added (older ones may have been dropped)
+        self.last_query: Optional[str] = None
+
+    # ---- transcript
+    def add(self, role: str, content: str, **extra: Any) -> None:
+        self.messages.append({"role": role, "content": content, **extra})
+        self.total += 1
+
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self.messages[-1] if self.messages else None
+
+    def page(self, page: int = 0, size: int = 10) -> Tuple[List[Dict[str, Any]], bool]:
+        """Messages of page `page` counted from the newest (0 = latest), oldest first; plus whether older ones exist."""
+        end = len(self.messages) - page * size
+        start = max(0, end - size)
+        return list(self.messages)[start:max(0, end)], start > 0
+
+    def dropped(self) -> int:
+        """Messages that fell out of the ring buffer."""
+        return self.total - len(self.messages)
+
+    # ---- recommendation context
+    def is_refinement(self, text: str) -> bool:
+        return self.last_query is not None and is_refinement(text)
+
+    def search_query(self, text: str) -> str:
+        """The text to retrieve with: the request itself, or the previous request + this refinement."""
+        if not self.is_refinement(text):
+            return text
+        words = f"{self.last_query} {text}".split()
+        return " ".join(words[-MAX_QUERY_WORDS:])
+
+    def exclude_titles(self) -> List[str]:
+        return list(self.recommended) if config.EXCLUDE_RECOMMENDED else []
+
+    def boost_themes(self, text: str) -> List[str]:
+        """Profile themes to favour: only for refinements, where the request itself says little."""
+        return self.profile.top_themes() if self.is_refinement(text) else []
+
+    def record_query(self, text: str) -> None:
+        """A new request (before its answer): genres it names feed the profile."""
+        genres = [slug(g) for g in query_genres(text)]
+        if genres:
+            self.profile.observe(genres=genres, weight=0.5)
+
+    def record_recommendation(self, query: str, title: Optional[str]) -> None:
+        self.last_query = query
+        if not title:
+            return
+        if title in self.recommended:
+            self.recommended.remove(title)
+        self.recommended.append(title)
+        self.profile.observe_title(title)
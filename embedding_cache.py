@@ -0,0 +1,158 @@
+# embedding_cache.py
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+EMBED_CACHE_PATH = Path("embedding_cache.sqlite")
+
+def normalize_text(text: str) -> str:
+    """Cache-key normalization: NFC + collapsed whitespace. Case is kept (it changes embeddings)."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Drop-in wrapper around any Chroma embedding function.
+    Lookups go: in-memory LRU -> local SQLite (float32 blobs) -> wrapped function (network).
+    Entries are keyed by (model name, normalized text), so switching models never mixes vectors.
+    """
+
+    def __init__(
+        self,
+        inner: EmbeddingFunction,
+        model_name: str,
+        path: Path = EMBED_CACHE_PATH,
+        max_memory_items: int = 4096,
+    ):
+        self.inner = inner
+        self.model_name = model_name
+        self.path = Path(path)
+        self.max_memory_items = max_memory_items
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "miss_calls": 0, "miss_seconds": 0.0}
+
+    # ---- Chroma embedding-function protocol (delegated so the persisted collection config is unchanged)
+    def name(self) -> str:
+        return self.inner.name()
+
+    def get_config(self) -> Dict[str, Any]:
+        return self.inner.get_config()
+
+    def default_space(self):
+        return self.inner.default_space()
+
+    def supported_spaces(self):
+        return self.inner.supported_spaces()
+
+    def is_legacy(self) -> bool:
+        return self.inner.is_legacy()
+
+    def embed_query(self, input: Documents) -> Embeddings:
+        return self.__call__(input)
+
+    def __call__(self, input: Documents) -> Embeddings:
+        texts = [normalize_text(t) for t in input]
+        keys = [self._key(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                vec = self._lru.get(key)
+                if vec is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vec
+                    self._stats["memory_hits"] += 1
+
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if missing:
+            from_disk = self._load(missing)
+            found.update(from_disk)
+            with self._lock:
+                self._stats["disk_hits"] += len(from_disk)
+
+        # embed each distinct missing text once
+        todo = {k: t for k, t in zip(keys, texts) if k not in found}
+        if todo:
+            t0 = time.perf_counter()
+            vectors = self.inner(list(todo.values()))
+            elapsed = time.perf_counter() - t0
+            fresh = {k: np.asarray(v, dtype=np.float32) for k, v in zip(todo, vectors)}
+            self._store(fresh)
+            found.update(fresh)
+            with self._lock:
+                self._stats["misses"] += len(todo)
+                self._stats["miss_calls"] += 1
+                self._stats["miss_seconds"] += elapsed
+
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                self._remember(key, found[key])
+        return [found[k] for k in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus an estimate of the network time the hits saved."""
+        with self._lock:
+            s = dict(self._stats)
+            s["memory_items"] = len(self._lru)
+        hits = s["memory_hits"] + s["disk_hits"]
+        lookups = hits + s["misses"]
+        per_text = s["miss_seconds"] / s["misses"] if s["misses"] else 0.0
+        s["hit_rate"] = hits / lookups if lookups else 0.0
+        s["avg_miss_latency_ms"] = 1000 * s["miss_seconds"] / s["miss_calls"] if s["miss_calls"] else 0.0
+        s["estimated_seconds_saved"] = hits * per_text
+        return s
+
+    # ---- internals
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        self._lru[key] = vec
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_items:
+            self._lru.popitem(last=False)
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _load(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        out: Dict[str, np.ndarray] = {}
+        with self._lock:
+            db = self._db()
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = db.execute(f"SELECT key, vec FROM embeddings WHERE key IN ({marks})", chunk)
+                for key, blob in rows:
+                    out[key] = np.frombuffer(blob, dtype=np.float32)
+        return out
+
+    def _store(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, dim, vec) VALUES (?, ?, ?, ?)",
+                [(k, self.model_name, int(v.shape[0]), v.tobytes()) for k, v in vectors.items()],
+            )
+            db.commit()
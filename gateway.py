@@ -0,0 +1,242 @@
+# gateway.py
+# Shared gateway in front of every OpenAI call (chat, embeddings, moderations, transcriptions)
+# --------------------------------------------------------------------------------------------
+# Exposes the same surface as the OpenAI client (gateway.chat.completions.create(...),
+# .embeddings.create, .moderations.create, .audio.transcriptions.create), so call sites take it
+# wherever they took the client. Per endpoint it adds:
+# - a request timeout (config.OPENAI_TIMEOUT_*); the SDK's own retries are off, retrying is done here
+# - jittered exponential retry on 429 / 5xx / timeouts / connection errors, honouring Retry-After;
+#   an exhausted quota (insufficient_quota) is not retried
+# - a token bucket sized to the account tier (config.OPENAI_RPM_*): callers wait for a token instead
+#   of sending requests that would be refused, and a 429 pauses the whole bucket for its Retry-After,
+#   so concurrent turns back off together instead of feeding a 429 storm
+# - in-flight deduplication for embeddings and moderations: identical concurrent requests share
+#   one HTTP call
+# - metrics: latency histograms per endpoint (span "openai.<endpoint>") and counters of requests,
+#   failed attempts, retries and throttled seconds (see tracing.count)
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Dict, Any, Callable, Optional, Tuple
+
+import httpx
+import openai
+from openai import DefaultHttpxClient, OpenAI
+
+import config
+import tracing
+
+ENDPOINTS = ("chat", "embeddings", "moderations", "transcriptions")
+DEDUP_ENDPOINTS = {"embeddings", "moderations"}
+RETRY_STATUS = {408, 409, 429}  # plus every 5xx
+BURST_SECONDS = 10.0  # a bucket holds this many seconds' worth of its rate
+
+class RateLimitExceeded(Exception):
+    """No token became available in the local bucket within the endpoint timeout."""
+
+@dataclass
+class EndpointPolicy:
+    timeout: float
+    rpm: float = 0.0  # 0 = no local rate limit
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+
+def default_policies() -> Dict[str, EndpointPolicy]:
+    timeouts = {
+        "chat": config.OPENAI_TIMEOUT_CHAT,
+        "embeddings": config.OPENAI_TIMEOUT_EMBEDDINGS,
+        "moderations": config.OPENAI_TIMEOUT_MODERATIONS,
+        "transcriptions": config.OPENAI_TIMEOUT_TRANSCRIPTIONS,
+    }
+    rpm = {
+        "chat": config.OPENAI_RPM_CHAT,
+        "embeddings": config.OPENAI_RPM_EMBEDDINGS,
+        "moderations": config.OPENAI_RPM_MODERATIONS,
+        "transcriptions": config.OPENAI_RPM_TRANSCRIPTIONS,
+    }
+    return {
+        name: EndpointPolicy(timeouts[name], rpm[name], config.OPENAI_MAX_RETRIES,
+                             config.OPENAI_BACKOFF_BASE_SECONDS, config.OPENAI_BACKOFF_MAX_SECONDS)
+        for name in ENDPOINTS
+    }
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> float:
+        """Take one token, waiting at most `timeout` seconds; returns the time waited."""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if now + wait - start > timeout:
+                raise RateLimitExceeded(f"no request budget within {timeout:g}s")
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for `seconds` (the server asked us to back off)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+def _status(exc: Exception) -> str:
+    """Metric label for a failed attempt."""
+    if isinstance(exc, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(exc, openai.APIConnectionError):
+        return "connection"
+    if isinstance(exc, openai.APIStatusError):
+        return str(exc.status_code)
+    return type(exc).__name__
+
+def _retryable(exc: Exception) -> bool:
+    if isinstance(exc, openai.APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        if getattr(exc, "code", None) == "insufficient_quota":
+            return False
+        return exc.status_code in RETRY_STATUS or exc.status_code >= 500
+    return False
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait (retry-after-ms / retry-after headers), if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value:
+            try:
+                return max(0.0, float(value) * scale)
+            except ValueError:
+                continue  # an HTTP date; fall back to our own backoff
+    return None
+
+class _Endpoint:
+    """`.create(**kwargs)` of one API resource, routed through the gateway."""
+
+    def __init__(self, gateway: "OpenAIGateway", name: str, create: Callable[..., Any]):
+        self._gateway = gateway
+        self._name = name
+        self._create = create
+
+    def create(self, **kwargs: Any) -> Any:
+        return self._gateway.call(self._name, self._create, kwargs)
+
+class OpenAIGateway:
+    """OpenAI-client-shaped wrapper adding per-endpoint timeouts, retries, rate limiting and dedup."""
+
+    def __init__(self, client: OpenAI, policies: Optional[Dict[str, EndpointPolicy]] = None):
+        self.client = client
+        self.policies = policies or default_policies()
+        self.buckets: Dict[str, TokenBucket] = {
+            name: TokenBucket(p.rpm / 60, max(1.0, p.rpm / 60 * BURST_SECONDS))
+            for name, p in self.policies.items() if p.rpm > 0
+        }
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._inflight_lock = threading.Lock()
+        # per-endpoint copies of the client share its connection pool
+        raw = {name: client.with_options(timeout=p.timeout, max_retries=0) for name, p in self.policies.items()}
+        self.chat = SimpleNamespace(completions=_Endpoint(self, "chat", raw["chat"].chat.completions.create))
+        self.embeddings = _Endpoint(self, "embeddings", raw["embeddings"].embeddings.create)
+        self.moderations = _Endpoint(self, "moderations", raw["moderations"].moderations.create)
+        self.audio = SimpleNamespace(
+            transcriptions=_Endpoint(self, "transcriptions", raw["transcriptions"].audio.transcriptions.create)
+        )
+
+    def call(self, endpoint: str, create: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        if endpoint not in DEDUP_ENDPOINTS or kwargs.get("stream"):
+            return self._call(endpoint, create, kwargs)
+        key = (endpoint, json.dumps(kwargs, sort_keys=True, default=str))
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            tracing.count("openai_requests", endpoint=endpoint, outcome="coalesced")
+            with tracing.span(f"openai.{endpoint}", coalesced=True):
+                return future.result()
+        try:
+            result = self._call(endpoint, create, kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _call(self, endpoint: str, create: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        policy = self.policies[endpoint]
+        bucket = self.buckets.get(endpoint)
+        attempt, throttled = 0, 0.0
+        with tracing.span(f"openai.{endpoint}") as s:
+            try:
+                while True:
+                    if bucket is not None:
+                        throttled += bucket.acquire(policy.timeout)
+                    try:
+                        result = create(**kwargs)
+                    except Exception as e:
+                        tracing.count("openai_attempt_errors", endpoint=endpoint, status=_status(e))
+                        if attempt >= policy.max_retries or not _retryable(e):
+                            raise
+                        retry_after = _retry_after(e)
+                        if retry_after and bucket is not None:
+                            bucket.pause(retry_after)
+                        backoff = random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2 ** attempt))
+                        attempt += 1
+                        tracing.count("openai_retries", endpoint=endpoint)
+                        time.sleep(max(retry_after or 0.0, backoff))
+                        continue
+                    tracing.count("openai_requests", endpoint=endpoint, outcome="ok")
+                    return result
+            except BaseException:
+                tracing.count("openai_requests", endpoint=endpoint, outcome="error")
+                raise
+            finally:
+                if attempt:
+                    s.set(retries=attempt)
+                if throttled > 0.001:
+                    s.set(throttled_ms=round(throttled * 1000, 1))
+                    tracing.count("openai_throttled_seconds", throttled, endpoint=endpoint)
+
+_gateway: Optional[OpenAIGateway] = None
+_lock = threading.Lock()
+
+def get_gateway() -> OpenAIGateway:
+    """Process-wide gateway over one pooled OpenAI client (OPENAI_API_KEY / OPENAI_BASE_URL from the environment)."""
+    global _gateway
+    with _lock:
+        if _gateway is None:
+            limits = httpx.Limits(
+                max_connections=config.OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=config.OPENAI_MAX_CONNECTIONS,
+            )
+            _gateway = OpenAIGateway(OpenAI(http_client=DefaultHttpxClient(limits=limits)))
+        return _gateway
+
+def reset() -> None:
+    global _gateway
+    with _lock:
+        _gateway = None
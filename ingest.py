@@ -0,0 +1,330 @@
+# ingest.py
+# Streaming bulk ingestion for large catalogs
+# -------------------------------------------
+# - Parses records lazily from markdown (`## Title:` blocks) and JSONL sources
+# - Skips records whose content hash already matches the manifest
+# - Embeds size-bounded batches through a bounded worker pool (retry + backoff on rate limits is
+#   the gateway's job, see gateway.py)
+# - Writes to Chroma batch by batch and checkpoints the manifest, so an interrupted run resumes
+# - Keeps the local side indexes (summary store, ...) in lockstep with the collection
+# - Records which source each book came from, so syncing one source never deletes another's books
+# - With config.CHUNK_SIZE set, stores each book as overlapping passages (manifest is per document)
+#
+# Usage: python ingest.py data/book_summaries.md more_books.jsonl
+
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Callable, Set, Union
+
+from rag import (
+    CHUNK_SEP,
+    get_or_create_collection,
+    get_embedding_function,
+    chunk_record,
+    parent_id,
+    iter_books_md,
+    make_record,
+    record_hash,
+    load_manifest,
+    save_manifest,
+)
+from lexical import get_lexical_index
+from tools import get_summary_store
+
+
+@dataclass
+class IngestStats:
+    seen: int = 0
+    embedded: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def records_per_sec(self) -> float:
+        return self.seen / self.seconds if self.seconds else 0.0
+
+    @property
+    def embedded_per_sec(self) -> float:
+        return self.embedded / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.seen} records ({self.embedded} embedded, {self.skipped} unchanged, "
+                f"{self.deleted} deleted) in {self.seconds:.1f}s — "
+                f"{self.records_per_sec:.1f} rec/s, {self.embedded_per_sec:.1f} embedded/s")
+
+# -------------------------
+# Sources
+# -------------------------
+def iter_books_jsonl(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """One JSON object per line: {"title", "text" | "summary", optional "metadata"}."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        obj = json.loads(line)
+        title = (obj.get("title") or "").strip()
+        if not title:
+            continue
+        text = (obj.get("text") or obj.get("summary") or "").strip()
+        yield make_record(title, text, obj.get("metadata"))
+
+def source_key(src: Union[str, Path]) -> str:
+    """Stable name of a source file in the manifest: relative to the working directory when inside it."""
+    path = Path(src).resolve()
+    try:
+        return path.relative_to(Path.cwd().resolve()).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+def iter_records(sources: Iterable[Union[str, Path]]) -> Iterator[Dict[str, Any]]:
+    """Stream records from each source in order; the format is picked by file extension."""
+    for src in sources:
+        path = Path(src)
+        with path.open(encoding="utf-8") as f:
+            if path.suffix.lower() in (".jsonl", ".ndjson"):
+                yield from iter_books_jsonl(f)
+            else:
+                yield from iter_books_md(f)
+
+def batched(records: Iterable[Dict[str, Any]], max_records: int, max_chars: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group records so each embeddings request stays under both a count and a size budget."""
+    batch: List[Dict[str, Any]] = []
+    chars = 0
+    for r in records:
+        size = len(r["text"])
+        if batch and (len(batch) >= max_records or chars + size > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append(r)
+        chars += size
+    if batch:
+        yield batch
+
+def _indexed_hashes(col) -> Dict[str, str]:
+    """Hash what is actually stored in the collection (used when the manifest is missing or stale)."""
+    stored = col.get(include=["documents", "metadatas"])
+    docs = stored.get("documents") or []
+    metas = stored.get("metadatas") or []
+    return {
+        rid: record_hash(docs[i] or "", metas[i] or {})
+        for i, rid in enumerate(stored.get("ids") or [])
+    }
+
+def _orphaned_docs(book_id: str, docs: List[Dict[str, Any]], stored: Dict[str, str]) -> List[str]:
+    """Stored documents of a changed book that its new version no longer produces
+    (passages past the new last chunk, or the whole-book document after enabling chunking)."""
+    fresh = {d["id"] for d in docs}
+    out = [book_id] if book_id in stored and book_id not in fresh else []
+    i = 0
+    while True:
+        did = f"{book_id}{CHUNK_SEP}{i}"
+        if did not in stored:
+            break
+        if did not in fresh:
+            out.append(did)
+        i += 1
+    return out
+
+def default_side_indexes() -> List[Any]:
+    """
+    Local indexes fed from the same records as the collection. Each one exposes
+    upsert(records), delete(ids), ids(), version() and set_version(v); a side index whose
+    version differs from the manifest's is rebuilt from the sources (no embedding calls).
+    """
+    return [get_summary_store(), get_lexical_index()]
+
+# -------------------------
+# Pipeline
+# -------------------------
+def ingest(
+    sources: Iterable[Union[str, Path]],
+    col=None,
+    batch_size: int = 64,
+    max_batch_chars: int = 200_000,
+    workers: int = 4,
+    checkpoint_every: int = 20,
+    delete_missing: bool = True,
+    progress: Optional[Callable[[IngestStats], None]] = None,
+    side_indexes: Optional[List[Any]] = None,
+) -> IngestStats:
+    """
+    Sync the given sources into the collection.
+    Only new/changed records are embedded; records no longer present in the source they were
+    ingested from are deleted (when delete_missing) — books of sources not given here are kept,
+    as are books ingested before sources were recorded. The manifest is checkpointed every
+    `checkpoint_every` written batches, so re-running after an interruption skips everything
+    already stored.
+    """
+    sources = list(sources)
+    ingested = {source_key(src) for src in sources}
+    if col is None:
+        col = get_or_create_collection()
+    emb_fn = get_embedding_function()
+    stats = IngestStats()
+    t0 = time.perf_counter()
+
+    manifest = load_manifest()
+    indexed = manifest["records"]
+    if len(indexed) != col.count():
+        # manifest missing or out of sync with the store: diff against the stored content instead
+        indexed = _indexed_hashes(col)
+    stored = dict(indexed)  # document id -> hash of what is in the collection; checkpointed as we go
+    book_sources: Dict[str, str] = dict(manifest["sources"])  # book id -> source_key
+    current: Dict[str, str] = {}
+    seen_ids: Set[str] = set()  # book ids
+    orphans: List[str] = []  # documents of changed books that are no longer produced
+
+    sides = default_side_indexes() if side_indexes is None else side_indexes
+    stale = [
+        side for side in sides
+        if manifest["version"] is None or side.version() != manifest["version"] or indexed is not manifest["records"]
+    ]
+    side_buffer: List[Dict[str, Any]] = []
+
+    def flush_sides(changed: bool) -> None:
+        targets = sides if changed else stale
+        if side_buffer and targets:
+            for side in targets:
+                side.upsert(side_buffer)
+        side_buffer.clear()
+
+    try:
+        max_write = col._client.get_max_batch_size()
+        batch_size = min(batch_size, max_write)
+    except Exception:
+        pass
+
+    def records() -> Iterator[Dict[str, Any]]:
+        for src in sources:
+            key = source_key(src)
+            for r in iter_records([src]):
+                stats.seen += 1
+                if r["id"] in seen_ids:
+                    # duplicate title: the first occurrence wins
+                    stats.skipped += 1
+                    continue
+                seen_ids.add(r["id"])
+                book_sources[r["id"]] = key
+                yield r
+
+    def changed_records() -> Iterator[Dict[str, Any]]:
+        for r in records():
+            docs = chunk_record(r)
+            for d in docs:
+                d["hash"] = record_hash(d["text"], d["metadata"])
+                current[d["id"]] = d["hash"]
+            if all(stored.get(d["id"]) == d["hash"] for d in docs):
+                stats.skipped += 1
+                if stale:
+                    side_buffer.append(r)
+                    if len(side_buffer) >= 500:
+                        flush_sides(changed=False)
+                continue
+            orphans.extend(_orphaned_docs(r["id"], docs, stored))
+            side_buffer.append(r)
+            flush_sides(changed=True)
+            yield from docs
+        flush_sides(changed=False)
+
+    def embed_batch(batch: List[Dict[str, Any]]):
+        # retries/backoff on rate limits happen in the OpenAI gateway (gateway.py)
+        return batch, list(emb_fn([r["text"] for r in batch]))
+
+    written = 0
+
+    def write(fut: Future) -> None:
+        nonlocal written
+        batch, embeddings = fut.result()
+        col.upsert(
+            ids=[r["id"] for r in batch],
+            documents=[r["text"] for r in batch],
+            metadatas=[r["metadata"] for r in batch],
+            embeddings=embeddings,
+        )
+        for r in batch:
+            stored[r["id"]] = r["hash"]
+        stats.embedded += len(batch)
+        written += 1
+        if written % checkpoint_every == 0:
+            save_manifest(stored, book_sources)
+            stats.seconds = time.perf_counter() - t0
+            if progress:
+                progress(stats)
+
+    max_in_flight = max(1, workers) * 2
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        in_flight: Set[Future] = set()
+        try:
+            for batch in batched(changed_records(), batch_size, max_batch_chars):
+                in_flight.add(pool.submit(embed_batch, batch))
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        write(fut)
+            for fut in list(in_flight):
+                in_flight.discard(fut)
+                write(fut)
+        finally:
+            # keep whatever was written, so the next run resumes from here
+            for fut in in_flight:
+                fut.cancel()
+            if stats.embedded:
+                save_manifest(stored, book_sources)
+
+    if delete_missing:
+        # documents no longer produced by their own source (unseen books of a source given here,
+        # or passages a changed book dropped)
+        gone = [
+            did for did in stored
+            if did not in current and (parent_id(did) in seen_ids or book_sources.get(parent_id(did)) in ingested)
+        ]
+    else:
+        gone = [did for did in orphans if did not in current]
+    removed = sorted({parent_id(did) for did in gone} - seen_ids)
+    for rid in removed:
+        book_sources.pop(rid, None)
+    dropped = set(gone)
+    final = {did: h for did, h in {**stored, **current}.items() if did not in dropped}
+    for i in range(0, len(gone), batch_size):
+        col.delete(ids=gone[i:i + batch_size])
+    stats.deleted = len(removed)
+
+    if stats.embedded or gone:
+        # Chroma automatically persists in PersistentClient;
+        # an explicit persist() call is not required,
+        # but is safer when running in notebooks.
+        try:
+            col.persist()
+        except Exception:
+            pass
+    version = manifest["version"]
+    if final != manifest["records"] or book_sources != manifest["sources"] or version is None:
+        version = save_manifest(final, book_sources)["version"]
+
+    books = {parent_id(did) for did in final}
+    for side in sides:
+        if side in stale and delete_missing:
+            side.delete([rid for rid in side.ids() if rid not in books])
+        elif removed:
+            side.delete(removed)
+        side.set_version(version)
+
+    stats.seconds = time.perf_counter() - t0
+    if progress:
+        progress(stats)
+    return stats
+
+if __name__ == "__main__":
+    srcs = sys.argv[1:] or ["data/book_summaries.md"]
+    result = ingest(srcs, progress=lambda s: print(s.summary(), flush=True))
+    print("Done:", result.summary())
+    cache_stats = getattr(get_embedding_function(), "stats", None)
+    if cache_stats is not None:
+        s = cache_stats()
+        print(f"Embedding cache: {s['memory_hits'] + s['disk_hits']} hits, {s['misses']} misses "
+              f"({s['hit_rate']:.0%}), ~{s['estimated_seconds_saved']:.1f}s of embedding calls saved")
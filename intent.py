@@ -0,0 +1,237 @@
+# intent.py
+# Intent and language detection for chat/voice messages (EN + RO)
+# ---------------------------------------------------------------
+# - tokens(): one str.translate pass (lowercase, Latin diacritics -> ASCII, punctuation -> space) + split
+# - a token trie of weighted phrases, matched leftmost-longest: summary follow-up cues score
+#   positive, new-request and refinement cues ("books", "fantasy", "recommend", "darker", "altceva")
+#   negative, and affirmations ("yes", "ok", "da") only count in replies made of nothing else — so
+#   "more books like Dune" and "tell me more about fantasy books" are new requests while "more",
+#   "sure, more please", "I want a summary" and "spune-mi mai multe" ask for the last book's summary
+# - is_english_text(): counting-only check (no per-character lists); ASCII text is decided in C, then
+#   a set lookup per token rejects text made of another language's function words ("spune-mi mai
+#   multe despre carte", "ich möchte ein buch") that the letter count alone lets through
+import re
+import string
+import unicodedata
+from typing import Dict, Any, Iterator, List, Tuple
+
+# -------------------------
+# Single-pass normalizer
+# -------------------------
+_PUNCTUATION = "!\"#$%&()*+,-./:;<=>?@[\\]^_{|}~"
+_APOSTROPHES = "'`"
+
+def _translation_table() -> Dict[int, str]:
+    table: Dict[int, str] = {cp: chr(cp + 32) for cp in range(ord("A"), ord("Z") + 1)}
+    for cp in range(0xC0, 0x250):  # Latin-1 Supplement + Latin Extended-A/B (ă â î ș ț ş ţ é ü ...)
+        ch = chr(cp)
+        base = "".join(c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c))
+        if base != ch and base.isascii():
+            table[cp] = base.lower()
+    for ch in _PUNCTUATION + "«»„“”–—…":
+        table[ord(ch)] = " "
+    for ch in _APOSTROPHES + "’‘´":
+        table[ord(ch)] = ""  # "what's" -> "whats", "i'd" -> "id"
+    return table
+
+_TABLE = _translation_table()
+# ASCII text (most messages) takes bytes.translate: a 256-byte table instead of per-character dict lookups
+_ASCII_TABLE = bytes.maketrans(
+    (string.ascii_uppercase + _PUNCTUATION).encode(), (string.ascii_lowercase + " " * len(_PUNCTUATION)).encode()
+)
+_ASCII_DELETE = _APOSTROPHES.encode()
+
+def tokens(text: str) -> List[str]:
+    """Lowercased, diacritic-free, punctuation-free tokens."""
+    if text.isascii():
+        return text.encode("ascii").translate(_ASCII_TABLE, _ASCII_DELETE).decode("ascii").split()
+    return text.translate(_TABLE).split()
+
+# -------------------------
+# Phrase trie
+# -------------------------
+_END = None  # trie node key holding the phrase payload (tokens are never None)
+
+class PhraseTrie:
+    """Token-level trie; matches() yields (phrase, kind, weight, n_tokens) for leftmost-longest, non-overlapping hits."""
+
+    def __init__(self):
+        self.root: Dict[Any, Any] = {}
+
+    def add(self, phrase: str, kind: str, weight: float) -> None:
+        toks = tokens(phrase)
+        node = self.root
+        for tok in toks:
+            node = node.setdefault(tok, {})
+        node[_END] = (phrase, kind, weight, len(toks))
+
+    def matches(self, toks: List[str]) -> Iterator[Tuple[str, str, float, int]]:
+        root, i, n = self.root, 0, len(toks)
+        while i < n:
+            node = root.get(toks[i])
+            if node is None:
+                i += 1
+                continue
+            best, end, j = node.get(_END), i + 1, i + 1
+            while j < n:
+                node = node.get(toks[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node:
+                    best, end = node[_END], j
+            if best is None:
+                i += 1
+            else:
+                yield best
+                i = end
+
+# pronouns / "the book": "tell me more about <ref>" asks about the last recommendation, while
+# "tell me more about <topic>" on its own is only a weak cue (it is scored by the topic words)
+_REFERENCES = ["it", "this", "that", "the book", "this book", "that book", "her", "him", "them"]
+_RO_REFERENCES = ["ea", "el", "asta", "aceasta", "carte", "cartea", "aceasta carte"]
+FOLLOWUP_PHRASES = {
+    # the summary itself: outweighs a generic lead-in ("i want a summary")
+    4.0: ["summary", "details", "detail", "rezumat", "rezumatul", "detalii"],
+    3.0: [
+        "tell me more", "what is it about", "whats it about", "what is the book about",
+        "whats the book about", "show me the summary", "show the summary", "show me more", "show more",
+        "give me the summary", "the summary", "full summary", "the full summary", "summary please",
+        "more details", "more info", "go on", "i want the summary",
+        "vreau rezumat", "vreau rezumatul", "vreau detalii", "mai multe detalii",
+        "spune mi mai multe", "spune mi mai mult", "as vrea sa stiu mai multe", "vreau sa stiu mai multe",
+        "despre ce e vorba", "despre ce este", "arata mi rezumatul", "da mi rezumatul",
+        *(f"{lead} {ref}" for lead in ("tell me more about", "more about") for ref in _REFERENCES),
+        *(f"{lead} {ref}" for lead in ("spune mi mai multe despre", "vreau sa stiu mai multe despre",
+                                       "as vrea sa stiu mai multe despre") for ref in _RO_REFERENCES),
+    ],
+    # "more" alone (or with an affirmation) is a follow-up; next to a topic it is outweighed
+    1.5: ["more", "mai multe", "mai mult"],
+    1.0: ["tell me more about", "spune mi mai multe despre", "vreau sa stiu mai multe despre",
+          "as vrea sa stiu mai multe despre"],
+}
+AFFIRMATIONS = ["yes", "yeah", "yep", "yup", "ok", "okay", "sure", "please", "yes please", "ok please",
+                "da", "sigur", "te rog", "da te rog", "bine"]
+REQUEST_PHRASES = {
+    3.0: ["recommend", "recommend me", "suggest", "recomanda", "recomanda mi", "vreau o carte",
+          "vreau ceva", "caut o carte"],
+    # topics: books, genres
+    2.0: [
+        "book", "books", "novel", "novels", "story", "stories", "something", "other", "like",
+        "fantasy", "science fiction", "sci fi", "scifi", "mystery", "mysteries", "romance", "thriller",
+        "thrillers", "horror", "dystopian", "dystopia", "adventure", "adventures", "poetry",
+        "carte", "carti", "roman", "romane", "poveste", "povesti", "ceva", "alta", "aventuri", "politist",
+    ],
+    # generic lead-ins: a request only if nothing asks for the summary ("i want a summary")
+    1.5: ["i want a", "i want an", "i would like a", "looking for", "im looking for"],
+}
+# references to the previous recommendation: a new request relative to it
+REFINEMENT_PHRASES = [
+    "than that", "than this", "than it", "another", "another one", "something else", "other one",
+    "other book", "instead", "similar", "similar to", "more like", "less like", "like that", "like this",
+    "like it", "same author", "same genre", "same vibe", "darker", "lighter", "happier", "sadder",
+    "shorter", "longer", "funnier", "scarier", "older", "newer",
+    "altceva", "alta carte", "asemanator", "asemanatoare", "asemanatori",
+    "mai intunecat", "mai intunecata", "mai intunecate", "mai usor", "mai usoara", "mai usoare",
+    "mai scurt", "mai scurta", "mai scurte", "mai lung", "mai lunga", "mai lungi",
+    "mai vesel", "mai vesela", "mai vesele", "mai trist", "mai trista", "mai triste",
+]
+
+def _build_trie() -> PhraseTrie:
+    trie = PhraseTrie()
+    for weight, phrases in FOLLOWUP_PHRASES.items():
+        for p in phrases:
+            trie.add(p, "followup", weight)
+    for p in AFFIRMATIONS:
+        trie.add(p, "affirmation", 1.5)
+    for weight, phrases in REQUEST_PHRASES.items():
+        for p in phrases:
+            trie.add(p, "request", -weight)
+    for p in REFINEMENT_PHRASES:
+        trie.add(p, "refinement", -2.0)
+    return trie
+
+_TRIE = _build_trie()
+
+def classify(text: str) -> Dict[str, Any]:
+    """
+    {intent: "followup" | "request", score, refinement, matched: [phrases]}; score > 0 means follow-up.
+    Affirmations ("yes", "ok please", "da") only count when the reply consists of nothing else.
+    """
+    toks = tokens(text)
+    score = affirm = 0.0
+    covered, refinement, matched = 0, False, []
+    for phrase, kind, weight, n in _TRIE.matches(toks):
+        matched.append(phrase)
+        if kind == "affirmation":
+            affirm += weight
+            covered += n
+            continue
+        if kind == "followup":
+            covered += n
+        elif kind == "refinement":
+            refinement = True
+        score += weight
+    if covered == len(toks):
+        score += affirm
+    return {"intent": "followup" if score > 0 else "request", "score": score,
+            "refinement": refinement, "matched": matched}
+
+def is_followup_for_summary(text: str) -> bool:
+    """The message asks for (more of) the last recommendation rather than a new book."""
+    return classify(text)["intent"] == "followup"
+
+def is_refinement(text: str) -> bool:
+    """The message asks for a new book relative to the last one ("something darker than that")."""
+    return any(kind == "refinement" for _, kind, _, _ in _TRIE.matches(tokens(text)))
+
+# -------------------------
+# English-only check (counting, no intermediate lists)
+# -------------------------
+DIACRITICS = frozenset("ăâîșțşţĂÂÎȘȚŞŢ")
+_ASCII_LETTER = re.compile(r"[A-Za-z]")
+
+def letter_counts(text: str) -> Tuple[int, int, bool]:
+    """(letters, A–Z letters, has Romanian diacritics)."""
+    if text.isascii():
+        ascii_letters = len(text) - len(_ASCII_LETTER.sub("", text))
+        return ascii_letters, ascii_letters, False
+    letters = sum(map(str.isalpha, text))
+    ascii_letters = sum(map(str.isalpha, text.encode("ascii", "ignore").decode("ascii")))
+    return letters, ascii_letters, not DIACRITICS.isdisjoint(text)
+
+# closed-class words (plus "want", "book", "something") of the languages users switch to; words that
+# are also English ("as", "care", "die", "will", "roman", "la", "de") are left out so titles such as
+# "La La Land" or "Tour de France" do not count
+_FOREIGN_WORDS = frozenset("""
+    si sau despre mai multe mult vreau vrea ce cu pe din pentru este sunt nu eu mi imi te rog o un una
+    acest aceasta asta ceva foarte carte cartea carti
+    ich du ein eine einen einer und oder mit das der den dem nicht ist fur uber auch bitte buch mochte
+    je une et vous pour avec dans est tres livre voudrais veux sur du des au aux sil plait
+    quiero libro sobre con por favor para del los las es algo
+    voglio uno il della per sono qualcosa
+""".split())
+_ENGLISH_WORDS = frozenset("""
+    the a an and or of to in on for with about is are i me my you your it this that what some any
+    like want book books please something
+""".split())
+
+def has_foreign_words(text: str) -> bool:
+    """At least two function words of another language, and more of them than English ones."""
+    foreign = english = 0
+    for tok in tokens(text):
+        foreign += tok in _FOREIGN_WORDS
+        english += tok in _ENGLISH_WORDS
+    return foreign >= 2 and foreign > english
+
+def is_english_text(text: str, threshold: float = 0.9) -> bool:
+    """
+    Heuristic: reject if Romanian diacritics present; else require >=90% A–Z letters among alphabetic
+    chars and no run of another language's function words.
+    """
+    if text.isascii():
+        return _ASCII_LETTER.search(text) is not None and not has_foreign_words(text)
+    if not DIACRITICS.isdisjoint(text):
+        return False
+    letters, ascii_letters, _ = letter_counts(text)
+    return letters > 0 and ascii_letters >= threshold * letters and not has_foreign_words(text)
@@ -0,0 +1,160 @@
+# lexical.py
+# BM25 inverted index over the catalog, persisted in SQLite and updated incrementally
+# by the ingestion pipeline (a side index, like the summary store).
+# Catches what dense retrieval ranks poorly — authors, character names ("Katniss"),
+# **Themes:** keywords — and needs no embedding call.
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from textnorm import strip_diacritics
+
+LEXICAL_DB = Path("lexical.sqlite")
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 3  # title terms count this many times
+
+_STOPWORDS = frozenset("""
+a an the and or of to in on for with about by from into at as is are was were be been being
+i me my we you your it its that this these those what which who whom how do does did can could
+would should will want wanted looking look like something some any anything more other another
+book books novel novels read reading recommend recommendation please give show find me
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    return [
+        t for t in re.findall(r"[a-z0-9]+", strip_diacritics((text or "").lower()))
+        if len(t) > 1 and t not in _STOPWORDS
+    ]
+
+class LexicalIndex:
+    def __init__(self, path: Path = LEXICAL_DB):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._totals: Optional[Tuple[int, float]] = None  # (N, avgdl), reset on every write
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, title TEXT NOT NULL, length INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " term TEXT NOT NULL, id TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, id)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS postings_id ON postings(id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+            self._conn = conn
+        return self._conn
+
+    # ---- side-index protocol (see ingest.default_side_indexes)
+    def upsert(self, records: Iterable[Dict[str, Any]]) -> None:
+        docs, postings, ids = [], [], []
+        for r in records:
+            tf = Counter(tokenize(r["text"]))
+            for t in tokenize(r["title"]):
+                tf[t] += TITLE_WEIGHT
+            ids.append(r["id"])
+            docs.append((r["id"], r["title"], sum(tf.values())))
+            postings.extend((term, r["id"], n) for term, n in tf.items())
+        with self._lock:
+            db = self._db()
+            self._delete_locked(db, ids)
+            db.executemany("INSERT INTO docs (id, title, length) VALUES (?, ?, ?)", docs)
+            db.executemany("INSERT INTO postings (term, id, tf) VALUES (?, ?, ?)", postings)
+            db.commit()
+            self._totals = None
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            db = self._db()
+            self._delete_locked(db, ids)
+            db.commit()
+            self._totals = None
+
+    @staticmethod
+    def _delete_locked(db: sqlite3.Connection, ids: List[str]) -> None:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            db.execute(f"DELETE FROM postings WHERE id IN ({marks})", chunk)
+            db.execute(f"DELETE FROM docs WHERE id IN ({marks})", chunk)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._db().execute("SELECT id FROM docs")]
+
+    def refresh(self) -> None:
+        """Forget cached corpus totals (another process wrote to the index)."""
+        with self._lock:
+            self._totals = None
+
+    def version(self) -> Optional[str]:
+        with self._lock:
+            row = self._db().execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+        return row[0] if row else None
+
+    def set_version(self, version: Optional[str]) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('version', ?)", (version,))
+            db.commit()
+
+    # ---- search
+    def search(self, query: str, n: int = 10) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        BM25 top-n. Returns (hits, query_terms); each hit is {id, title, score, matched}
+        where `matched` is how many distinct query terms the document contains.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], terms
+        with self._lock:
+            db = self._db()
+            if self._totals is None:
+                count, total = db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+                self._totals = (count, total / count if count else 0.0)
+            n_docs, avgdl = self._totals
+            if not n_docs:
+                return [], terms
+            rows = {
+                term: db.execute(
+                    "SELECT p.id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.id WHERE p.term = ?", (term,)
+                ).fetchall()
+                for term in terms
+            }
+            scores: Dict[str, float] = {}
+            matched: Counter = Counter()
+            for term, postings in rows.items():
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf, length in postings:
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+                    matched[doc_id] += 1
+            top = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:n]
+            titles = dict(db.execute(
+                f"SELECT id, title FROM docs WHERE id IN ({','.join('?' * len(top))})", [d for d, _ in top]
+            ).fetchall()) if top else {}
+        return [
+            {"id": doc_id, "title": titles.get(doc_id, doc_id), "score": score, "matched": matched[doc_id]}
+            for doc_id, score in top
+        ], terms
+
+def is_decisive(hits: List[Dict[str, Any]], terms: List[str], margin: float) -> bool:
+    """A keyword match strong enough to skip dense retrieval: the top document contains every
+    query term and outscores the runner-up by `margin`."""
+    if not hits or not terms or hits[0]["matched"] < len(terms):
+        return False
+    return len(hits) == 1 or hits[0]["score"] >= margin * hits[1]["score"]
+
+_index = LexicalIndex()
+
+def get_lexical_index() -> LexicalIndex:
+    return _index
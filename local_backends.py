@@ -0,0 +1,322 @@
+# local_backends.py
+# Offline backends, selected in config.py (EMBEDDING_BACKEND / VECTOR_BACKEND):
+# - HashingEmbeddingFunction: hashed word + character n-gram projection, no downloads, no network
+# - NumpyVectorStore: normalized float32 vectors in a memory-mapped matrix, exact top-k with one
+#   matrix-vector product + argpartition; implements the subset of the Chroma collection API the
+#   app uses (upsert, delete, get, query, count, persist)
+# Exact search is O(N·d) per query, which beats HNSW bookkeeping for catalogs of a few thousand books.
+import json
+import math
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from lexical import tokenize
+
+VECTOR_STORE_PATH = Path("vectors")
+
+# -------------------------
+# Embeddings
+# -------------------------
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Signed feature hashing of word unigrams, word bigrams and character trigrams
+    (sublinear tf), L2-normalized. Deterministic across processes (crc32, not hash()).
+    """
+
+    def __init__(self, dim: int = 512, char_weight: float = 0.5, bigram_weight: float = 0.7):
+        self.dim = dim
+        self.char_weight = char_weight
+        self.bigram_weight = bigram_weight
+
+    def _features(self, text: str) -> Counter:
+        words = tokenize(text)
+        feats: Counter = Counter()
+        for w in words:
+            feats["w:" + w] += 1.0
+            padded = f"#{w}#"
+            for i in range(len(padded) - 2):
+                feats["c:" + padded[i:i + 3]] += self.char_weight
+        for a, b in zip(words, words[1:]):
+            feats[f"b:{a} {b}"] += self.bigram_weight
+        return feats
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat, tf in self._features(text).items():
+            h = zlib.crc32(feat.encode("utf-8"))
+            weight = 1.0 + math.log(tf) if tf > 1 else tf
+            vec[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else vec
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return [self.embed(t) for t in input]
+
+    # ---- Chroma embedding-function protocol
+    @staticmethod
+    def name() -> str:
+        return "hashing_ngrams"
+
+    def get_config(self) -> Dict[str, Any]:
+        return {"dim": self.dim, "char_weight": self.char_weight, "bigram_weight": self.bigram_weight}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(**config)
+
+# -------------------------
+# Vector store
+# -------------------------
+def _matches(meta: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Chroma `where` semantics for the operators the app uses ($and/$or, $eq/$ne/$in/$nin/$gt/$gte/$lt/$lte)."""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(_matches(meta, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(meta, c) for c in cond):
+                return False
+        else:
+            ops = cond if isinstance(cond, dict) else {"$eq": cond}
+            value = meta.get(key)
+            for op, arg in ops.items():
+                if op == "$eq" and value != arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$nin" and value in arg:
+                    return False
+                if op in ("$gt", "$gte", "$lt", "$lte"):
+                    if value is None:
+                        return False
+                    if op == "$gt" and not value > arg:
+                        return False
+                    if op == "$gte" and not value >= arg:
+                        return False
+                    if op == "$lt" and not value < arg:
+                        return False
+                    if op == "$lte" and not value <= arg:
+                        return False
+    return True
+
+class NumpyVectorStore:
+    """
+    Chroma-collection stand-in. Vectors live in `<path>/vectors.f32` (np.memmap, grown by doubling);
+    ids, documents and metadata in `<path>/rows.sqlite`. Id -> slot map and metadata are kept in
+    memory for filtering; distances are squared L2 between unit vectors (2 - 2·cos), like Chroma's default.
+    """
+
+    def __init__(self, path: Path = VECTOR_STORE_PATH, embedding_function: Optional[EmbeddingFunction] = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.embedding_function = embedding_function
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path / "rows.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            " id TEXT PRIMARY KEY, slot INTEGER NOT NULL, document TEXT, metadata TEXT)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._slots: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._metas: List[Optional[Dict[str, Any]]] = []
+        for rid, slot, meta in self._conn.execute("SELECT id, slot, metadata FROM rows"):
+            self._place(rid, slot, json.loads(meta) if meta else None)
+        self._free = [s for s, rid in enumerate(self._ids) if rid is None]
+        self._live: Optional[np.ndarray] = None  # occupied slots, rebuilt after writes
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim: Optional[int] = int(row[0]) if row else None
+        self._matrix: Optional[np.memmap] = None
+        if self.dim is not None:
+            self._reserve(len(self._ids))
+
+    # ---- storage
+    def _place(self, rid: str, slot: int, meta: Optional[Dict[str, Any]]) -> None:
+        while len(self._ids) <= slot:
+            self._ids.append(None)
+            self._metas.append(None)
+        self._ids[slot] = rid
+        self._metas[slot] = meta
+        self._slots[rid] = slot
+        self._live = None
+
+    def _reserve(self, rows: int) -> None:
+        """Map the vector file with room for at least `rows` rows (doubling when it has to grow)."""
+        if self._matrix is not None and self._matrix.shape[0] >= rows:
+            return
+        file = self.path / "vectors.f32"
+        row_bytes = 4 * self.dim
+        have = file.stat().st_size // row_bytes if file.exists() else 0
+        capacity = max(have, 64)
+        while capacity < rows:
+            capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        if capacity != have:
+            with open(file, "ab") as f:
+                f.truncate(capacity * row_bytes)
+        self._matrix = np.memmap(file, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    # ---- Chroma collection subset
+    def count(self) -> int:
+        return len(self._slots)
+
+    def upsert(
+        self,
+        ids: List[str],
+        documents: Optional[List[str]] = None,
+        metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+        embeddings: Optional[Sequence[Any]] = None,
+    ) -> None:
+        if embeddings is None:
+            embeddings = self.embedding_function(list(documents or []))
+        vecs = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        vecs = vecs / np.where(norms == 0, 1, norms)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vecs.shape[1]
+                self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif vecs.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vecs.shape[1]} does not match the store ({self.dim})")
+            rows = []
+            for j, rid in enumerate(ids):
+                slot = self._slots.get(rid)
+                if slot is None:
+                    slot = self._free.pop() if self._free else len(self._ids)
+                meta = metadatas[j] if metadatas else None
+                self._place(rid, slot, meta)
+                self._reserve(slot + 1)
+                self._matrix[slot] = vecs[j]
+                rows.append((rid, slot, documents[j] if documents else None, json.dumps(meta) if meta else None))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows (id, slot, document, metadata) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+            self._matrix.flush()
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            targets = list(ids) if ids is not None else list(self._slots)
+            if where:
+                targets = [rid for rid in targets if rid in self._slots and _matches(self._metas[self._slots[rid]] or {}, where)]
+            for rid in targets:
+                slot = self._slots.pop(rid, None)
+                if slot is not None:
+                    self._ids[slot] = None
+                    self._metas[slot] = None
+                    self._free.append(slot)
+                    self._live = None
+            for i in range(0, len(targets), 500):
+                chunk = targets[i:i + 500]
+                self._conn.execute(f"DELETE FROM rows WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            self._conn.commit()
+
+    def _documents(self, ids: List[str]) -> Dict[str, str]:
+        docs: Dict[str, str] = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            docs.update(self._conn.execute(
+                f"SELECT id, document FROM rows WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return docs
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Dict[str, Any]:
+        with self._lock:
+            wanted = [rid for rid in (ids if ids is not None else list(self._slots)) if rid in self._slots]
+            if where:
+                wanted = [rid for rid in wanted if _matches(self._metas[self._slots[rid]] or {}, where)]
+            out: Dict[str, Any] = {"ids": wanted}
+            if "documents" in include:
+                docs = self._documents(wanted)
+                out["documents"] = [docs.get(rid) for rid in wanted]
+            if "metadatas" in include:
+                out["metadatas"] = [self._metas[self._slots[rid]] for rid in wanted]
+            if "embeddings" in include:
+                out["embeddings"] = [np.array(self._matrix[self._slots[rid]]) for rid in wanted]
+        return out
+
+    def query(
+        self,
+        query_embeddings: Optional[Sequence[Any]] = None,
+        query_texts: Optional[List[str]] = None,
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Sequence[str] = ("documents", "metadatas", "distances"),
+    ) -> Dict[str, Any]:
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(list(query_texts or []))
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        q = q.reshape(-1, q.shape[-1])
+        norms = np.linalg.norm(q, axis=1, keepdims=True)
+        q = q / np.where(norms == 0, 1, norms)
+        out: Dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            if self._live is None:
+                self._live = np.asarray([s for s, rid in enumerate(self._ids) if rid is not None], dtype=np.int64)
+            slots = self._live
+            if where:
+                slots = slots[[_matches(self._metas[s] or {}, where) for s in slots]] if len(slots) else slots
+            if not len(slots) or self._matrix is None:
+                for _ in range(len(q)):
+                    for key in out:
+                        out[key].append([])
+                return out
+            full = len(slots) == len(self._ids)
+            matrix = self._matrix[:len(self._ids)] if full else self._matrix[slots]
+            sims = q @ matrix.T  # one product for the whole batch of queries
+            k = min(n_results, len(slots))
+            q_sq = (q * q).sum(axis=1)  # 1 for unit queries, 0 for an empty one
+            for row, qq in zip(sims, q_sq):
+                top = np.argpartition(-row, k - 1)[:k] if k < len(row) else np.arange(len(row))
+                top = top[np.argsort(-row[top])]
+                ids = [self._ids[slots[i]] for i in top]
+                out["ids"].append(ids)
+                out["metadatas"].append([self._metas[slots[i]] for i in top])
+                out["distances"].append([float(qq + 1.0 - 2.0 * row[i]) for i in top])
+                if "documents" in include:
+                    docs = self._documents(ids)
+                    out["documents"].append([docs.get(rid) for rid in ids])
+        return out
+
+    def persist(self) -> None:
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+
+_stores: Dict[str, NumpyVectorStore] = {}
+_stores_lock = threading.Lock()
+
+def get_numpy_store(path: Path = VECTOR_STORE_PATH, embedding_function: Optional[EmbeddingFunction] = None) -> NumpyVectorStore:
+    """One store per directory and process (the in-memory slot map must not be duplicated)."""
+    with _stores_lock:
+        store = _stores.get(str(path))
+        if store is None:
+            store = _stores[str(path)] = NumpyVectorStore(path, embedding_function)
+        elif embedding_function is not None:
+            store.embedding_function = embedding_function
+        return store
+
+def reload_numpy_stores() -> None:
+    """Drop the per-process stores so the next get_numpy_store() re-reads them from disk
+    (another process wrote to the index); holders of the old instances keep working on them."""
+    with _stores_lock:
+        _stores.clear()
@@ -1,6 +1,22 @@
 # moderation_ext.py
-from typing import List, Tuple, Dict, Any
-from openai import OpenAI
+# Three-tier moderation (the single moderation entry point for the app)
+# ---------------------------------------------------------------------
+# 1) local rules   — clears trivially safe follow-ups ("yes", "tell me more", ...: the phrases of
+#                   intent.py, on its tokens) and blocks obvious abuse immediately
+# 2) verdict cache — bounded TTL cache of remote verdicts keyed by normalized text
+# 3) remote        — OpenAI Moderation API (omni-moderation-latest), only on a cache miss
+# Per-tier counts, shares and latency are published as librarian_moderation gauges (/metrics, debug panel).
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import tracing
+from intent import AFFIRMATIONS, FOLLOWUP_PHRASES, REFINEMENT_PHRASES, tokens
+from resources import get_openai_client
+from textnorm import normalize
+from tracing import span
 
 # Reusable polite message
 BLOCK_MESSAGE_EXT = (
@@ -9,21 +25,147 @@ BLOCK_MESSAGE_EXT = (
     "Please tell me what kind of book you are looking for."
 )
 
-_client = OpenAI()
+MODERATION_MODEL = "omni-moderation-latest"  # recommended model in the docs
+TIERS = ("local", "cache", "remote")
+
+# -------------------------
+# Tier 1: local rules (block rules also undo leetspeak)
+# -------------------------
+# whole messages that are safe as-is: the follow-up detector's phrases (intent.py) plus plain acknowledgements
+ACKNOWLEDGEMENTS = ["y", "k", "no", "nope", "thanks", "thank you", "thx", "nu", "mersi", "ok mersi", "multumesc"]
+SAFE_MESSAGES = frozenset(
+    " ".join(tokens(p))
+    for p in [*AFFIRMATIONS, *REFINEMENT_PHRASES, *ACKNOWLEDGEMENTS,
+              *(p for phrases in FOLLOWUP_PHRASES.values() for p in phrases)]
+)
+_BLOCK_RULES: List[Tuple[str, re.Pattern]] = [
+    ("harassment/threatening", re.compile(r"\b(i ?(will|'ll|am going to|m going to|m gonna) (kill|murder|hurt) you)\b")),
+    ("harassment", re.compile(r"\b(kill yourself|kys|go die)\b")),
+    ("self-harm/intent", re.compile(r"\b(i want to (kill myself|die)|how (do i|to) kill myself)\b")),
+]
+_PUNCT = re.compile(r"[^\w\s'-]+")
+
+def local_verdict(text: str) -> Optional[Dict[str, Any]]:
+    """Return a verdict for obvious cases, or None when the text needs a real check."""
+    plain = " ".join(tokens(text))
+    if not plain or plain in SAFE_MESSAGES:
+        return {"blocked": False, "reasons": [], "raw": {"rule": "safe"}}
+    # block rules see through leetspeak ("k1ll y0urself")
+    t = " ".join(_PUNCT.sub(" ", normalize(text)).split())
+    for category, rule in _BLOCK_RULES:
+        if rule.search(t):
+            return {"blocked": True, "reasons": [category], "raw": {"rule": rule.pattern}}
+    return None
+
+# -------------------------
+# Tier 2: verdict cache
+# -------------------------
+class VerdictCache:
+    """Bounded LRU of verdicts with a time-to-live."""
+
+    def __init__(self, max_entries: int = 4096, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, verdict = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return verdict
+
+    def put(self, key: str, verdict: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, verdict)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
 
-def check_with_openai_moderation(text: str) -> Tuple[bool, List[str], Dict[str, Any]]:
+_cache = VerdictCache()
+
+# -------------------------
+# Tier 3: remote
+# -------------------------
+def _remote_moderation(text: str) -> Dict[str, Any]:
+    try:
+        resp = get_openai_client().moderations.create(model=MODERATION_MODEL, input=text)
+        # The SDK returns .results[0] with fields: flagged, categories{...}
+        result = resp.results[0]
+        cats = getattr(result, "categories", None)
+        try:
+            cats_dict = cats.model_dump() if cats else {}
+        except Exception:
+            cats_dict = {}
+        reasons = [k for k, v in cats_dict.items() if bool(v)]
+        flagged = bool(getattr(result, "flagged", False))
+        return {"blocked": flagged, "reasons": reasons, "raw": resp.model_dump()}
+    except Exception as e:
+        # Log-friendly fallback; do NOT block the convo on moderation outage
+        return {"blocked": False, "reasons": ["moderation_error"], "raw": {"error": str(e)}}
+
+# -------------------------
+# Entry point + per-tier stats
+# -------------------------
+_stats_lock = threading.Lock()
+_stats = {tier: {"count": 0, "seconds": 0.0} for tier in TIERS}
+
+def _record(tier: str, started: float) -> None:
+    with _stats_lock:
+        _stats[tier]["count"] += 1
+        _stats[tier]["seconds"] += time.perf_counter() - started
+
+def check_with_openai_moderation(text: str) -> Dict[str, Any]:
     """
-    Returns: (blocked, reasons, raw)
-      - blocked: True if OpenAI Moderation marks the content as problematic
-      - reasons: list of triggered categories
-      - raw: the full response for debugging/logging
+    Returns: { 'blocked': bool, 'reasons': list[str], 'raw': dict, 'tier': 'local' | 'cache' | 'remote' }
+    Resilient to API hiccups: if moderation fails, we fall back to NOT blocked (and do not cache that).
     """
-    resp = _client.moderations.create(
-        model="omni-moderation-latest",  # recommended model in the docs
-        input=text
-    )
-    # The SDK returns .results[0] with fields: flagged, categories{...}
-    result = resp.results[0]
-    flagged = bool(result.flagged)
-    reasons = [cat for cat, v in result.categories.items() if v]
-    return flagged, reasons, resp.model_dump()
+    with span("moderation") as s:
+        verdict = _check(text)
+        s.set(tier=verdict["tier"], blocked=verdict["blocked"])
+    return verdict
+
+def _check(text: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    verdict = local_verdict(text)
+    if verdict is not None:
+        _record("local", started)
+        return {**verdict, "tier": "local"}
+
+    key = normalize(text)
+    verdict = _cache.get(key)
+    if verdict is not None:
+        _record("cache", started)
+        return {**verdict, "tier": "cache"}
+
+    with span("moderation.remote"):
+        verdict = _remote_moderation(text)
+    if "moderation_error" not in verdict["reasons"]:
+        _cache.put(key, verdict)
+    _record("remote", started)
+    return {**verdict, "tier": "remote"}
+
+def moderation_stats() -> Dict[str, Any]:
+    """Per-tier share of checks and average latency (ms)."""
+    with _stats_lock:
+        snapshot = {tier: dict(v) for tier, v in _stats.items()}
+    total = sum(v["count"] for v in snapshot.values())
+    return {
+        tier: {
+            "count": v["count"],
+            "rate": v["count"] / total if total else 0.0,
+            "avg_ms": 1000 * v["seconds"] / v["count"] if v["count"] else 0.0,
+        }
+        for tier, v in snapshot.items()
+    } | {"total": total, "cached_verdicts": len(_cache)}
+
+tracing.register_gauges("moderation", moderation_stats)
@@ -0,0 +1,114 @@
+# precomputed.py
+# Precomputed answers for recurring requests
+# ------------------------------------------
+# `python -m warmup` runs popular queries through the full pipeline offline and stores the answers
+# here, keyed by (query_key(query), catalog version). The app serves a request whose key matches
+# straight from memory — no embedding, vector search or chat call. Rows of other catalog versions
+# are never served, so editing the catalog invalidates the table until the next warm-up.
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+from textnorm import query_key
+
+PRECOMPUTED_DB = Path("precomputed.sqlite")
+
+# the sidebar examples in app.py; always warmed
+EXAMPLE_QUERIES = [
+    "I want a book about freedom and social control.",
+    "What do you recommend if I love fantasy adventures?",
+    "I want friendship and magic.",
+]
+
+class PrecomputedTable:
+    """
+    (key, version) -> answer rows in SQLite, plus an in-memory map of the rows for the version being
+    served. The map is reloaded when another process (the warm-up job) commits (PRAGMA data_version).
+    """
+
+    def __init__(self, path: Path = PRECOMPUTED_DB):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._loaded: Optional[tuple] = None  # (version, data_version) of the in-memory map
+        self._rows: Dict[str, Dict[str, Any]] = {}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " key TEXT NOT NULL, version TEXT NOT NULL, query TEXT NOT NULL, title TEXT NOT NULL,"
+                " final_text TEXT NOT NULL, candidates TEXT NOT NULL, mode TEXT, created_at REAL NOT NULL,"
+                " PRIMARY KEY (key, version))"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _refresh(self, version: str) -> None:
+        data_version = self._db().execute("PRAGMA data_version").fetchone()[0]
+        if self._loaded == (version, data_version):
+            return
+        rows = self._db().execute(
+            "SELECT key, query, title, final_text, candidates, mode FROM answers WHERE version = ?", (version,)
+        )
+        self._rows = {
+            key: {"query": query, "title": title, "final_text": final_text,
+                  "candidates": json.loads(candidates), "mode": mode}
+            for key, query, title, final_text, candidates, mode in rows
+        }
+        self._loaded = (version, data_version)
+
+    def get(self, query: str, version: Optional[str]) -> Optional[Dict[str, Any]]:
+        if version is None:
+            return None
+        with self._lock:
+            self._refresh(version)
+            return self._rows.get(query_key(query))
+
+    def keys(self, version: str) -> List[str]:
+        with self._lock:
+            self._refresh(version)
+            return list(self._rows)
+
+    def put_many(self, version: str, answers: Iterable[Dict[str, Any]]) -> int:
+        """Store {query, title, final_text, candidates: [titles], mode} rows for `version`."""
+        now = time.time()
+        rows = [
+            (query_key(a["query"]), version, a["query"], a["title"], a["final_text"],
+             json.dumps(a.get("candidates") or [], ensure_ascii=False), a.get("mode"), now)
+            for a in answers
+        ]
+        with self._lock:
+            db = self._db()
+            db.executemany(
+                "INSERT OR REPLACE INTO answers (key, version, query, title, final_text, candidates, mode, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            db.commit()
+            self._loaded = None  # data_version only tracks other connections' commits
+        return len(rows)
+
+    def prune(self, keep_version: str) -> int:
+        """Drop rows of every other catalog version; returns how many were removed."""
+        with self._lock:
+            db = self._db()
+            removed = db.execute("DELETE FROM answers WHERE version != ?", (keep_version,)).rowcount
+            db.commit()
+            self._loaded = None
+        return removed
+
+    def count(self, version: Optional[str] = None) -> int:
+        with self._lock:
+            if version is None:
+                return self._db().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            return self._db().execute("SELECT COUNT(*) FROM answers WHERE version = ?", (version,)).fetchone()[0]
+
+_table = PrecomputedTable()
+
+def get_precomputed_table() -> PrecomputedTable:
+    return _table
@@ -1,96 +1,551 @@
 # rag.py
+import asyncio
+import hashlib
+import json
 import os
 import re
+import threading
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
 
 import chromadb
+from chromadb.api.types import EmbeddingFunction
 from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
 from dotenv import load_dotenv
 
+import config
+from embedding_cache import CachedEmbeddingFunction
+from gateway import get_gateway
+from local_backends import HashingEmbeddingFunction, get_numpy_store
+from lexical import get_lexical_index, is_decisive
+from tools import get_summary_store
+from tracing import register_gauges, span
+
 load_dotenv()
 
 DATA_MD = Path("data/book_summaries.md")
 CHROMA_PATH = Path("chroma")
 COLLECTION_NAME = "book_summaries"
+EMBED_MODEL = "text-embedding-3-small"
+# content hashes of what is currently indexed, kept next to the chroma/ directory
+MANIFEST_PATH = CHROMA_PATH.parent / "chroma_manifest.json"
+VECTORS_PATH = Path("vectors")
+
+_TITLE_RE = re.compile(r"^##\s*Title:\s*")
+
+def _block_to_record(block_lines: List[str]) -> Optional[Dict[str, Any]]:
+    block = "\n".join(block_lines).strip()
+    if not block:
+        return None
+    # title: up to the first empty line or end of block
+    lines = block.splitlines()
+    title = lines[0].strip()
+    summary = "\n".join(lines[1:]).strip()
+    return make_record(title, summary)
+
+# -------------------------
+# Structured metadata (themes, author, genre) for filtered search
+# -------------------------
+_FIELD_RE = re.compile(r"^\*\*\s*(themes|author|genres?)\s*:\s*\*\*\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+_AUTHOR_IN_PROSE_RE = re.compile(
+    r"(?:novel|book|classic|story|written|[\"”])\s+by\s+([A-Z][\w.'’-]+(?:\s+[A-Z][\w.'’-]+){0,3})"
+)
+# genre -> phrases that imply it when no explicit **Genre:** line is given
+GENRE_KEYWORDS: Dict[str, List[str]] = {
+    "dystopia": ["dystopian", "dystopia", "totalitarian", "surveillance", "theocratic", "tyranny",
+                 "tyrannized", "censorship", "social control", "oppressive regime"],
+    "fantasy": ["fantasy", "magic", "magical", "wizard", "dragon", "dwarves", "elves", "one ring"],
+    "science fiction": ["science fiction", "sci-fi", "spaceship", "galaxy", "alien", "desert planet"],
+    "post-apocalyptic": ["post-apocalyptic", "apocalypse"],
+    "romance": ["romance", "love story", "feelings for"],
+    "war": ["wwii", "world war", "wartime", "battlefield"],
+    "coming of age": ["coming of age", "coming-of-age"],
+}
+# genre -> how users ask for it
+GENRE_QUERY_TERMS: Dict[str, List[str]] = {
+    "dystopia": ["dystopia", "dystopian"],
+    "fantasy": ["fantasy"],
+    "science fiction": ["science fiction", "sci-fi", "scifi"],
+    "post-apocalyptic": ["post-apocalyptic", "apocalyptic", "apocalypse"],
+    "romance": ["romance", "romantic"],
+    "war": ["war novel", "war book", "war story", "wartime"],
+    "coming of age": ["coming of age", "coming-of-age"],
+}
+
+def slug(value: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", value.lower()).strip("_")
+
+def _genre_patterns(table: Dict[str, List[str]]) -> Dict[str, re.Pattern]:
+    return {g: re.compile(r"\b(?:" + "|".join(map(re.escape, words)) + r")\b") for g, words in table.items()}
+
+_GENRE_TEXT_PATTERNS = _genre_patterns(GENRE_KEYWORDS)
+_GENRE_QUERY_PATTERNS = _genre_patterns(GENRE_QUERY_TERMS)
+
+def _genres_in(text: str, patterns: Dict[str, re.Pattern]) -> List[str]:
+    lowered = text.lower()
+    return [g for g, pattern in patterns.items() if pattern.search(lowered)]
+
+def _split_list(value: Any) -> List[str]:
+    items = value if isinstance(value, (list, tuple)) else re.split(r"[,;]", str(value))
+    cleaned = (str(i).strip().rstrip(".").strip() for i in items)
+    return [i for i in cleaned if i]
+
+def extract_metadata(text: str, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Structured fields for Chroma metadata (scalar values only):
+      themes/genre/author as display strings + one boolean flag per theme and genre
+      (theme_<slug>, genre_<slug>) so they can be used in `where` filters.
+    """
+    fields: Dict[str, Any] = {}
+    for name, value in _FIELD_RE.findall(text):
+        fields["genre" if name.lower().startswith("genre") else name.lower()] = value
+    fields.update(overrides or {})
+
+    # caller-provided extras are kept; Chroma only stores scalars, so lists become strings
+    meta: Dict[str, Any] = {
+        k: ", ".join(map(str, v)) if isinstance(v, (list, tuple)) else v
+        for k, v in (overrides or {}).items()
+        if k not in ("themes", "genre", "author") and v is not None
+    }
+    themes = _split_list(fields.get("themes", ""))
+    if themes:
+        meta["themes"] = ", ".join(themes)
+        meta.update({f"theme_{slug(t)}": True for t in themes})
+
+    if fields.get("genre"):
+        genres = _split_list(fields["genre"])
+    else:
+        genres = _genres_in(text, _GENRE_TEXT_PATTERNS)
+    if genres:
+        meta["genre"] = ", ".join(genres)
+        meta.update({f"genre_{slug(g)}": True for g in genres})
+
+    author = fields.get("author")
+    if not author:
+        m = _AUTHOR_IN_PROSE_RE.search(text)
+        author = m.group(1) if m else None
+    if author:
+        meta["author"] = str(author).strip().rstrip(".")
+    return meta
+
+def make_record(title: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build an index record {id, title, text, metadata} with the id derived from the title."""
+    rid = title.lower().replace(" ", "-")
+    return {
+        "id": rid,
+        "title": title,
+        "text": text,
+        "metadata": {**extract_metadata(text, metadata), "title": title}
+    }
+
+# -------------------------
+# Optional chunking (config.CHUNK_SIZE > 0): long summaries are indexed as overlapping passages
+# -------------------------
+CHUNK_SEP = "#c"
+
+def chunk_text(text: str, size: int, overlap: int) -> List[str]:
+    """Split text into passages of at most ~`size` characters on word boundaries,
+    each starting `overlap` characters (at most half a passage) before the previous one ended."""
+    overlap = min(overlap, size // 2)
+    words = [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+    if not words or len(text) <= size:
+        return [text]
+    chunks = []
+    start = 0
+    while start < len(words):
+        end = start
+        while end + 1 < len(words) and words[end + 1][1] - words[start][0] <= size:
+            end += 1
+        chunks.append(text[words[start][0]:words[end][1]])
+        if end + 1 >= len(words):
+            break
+        cut = words[end][1] - overlap
+        nxt = next((i for i in range(start + 1, end + 1) if words[i][0] >= cut), end + 1)
+        start = nxt
+    return chunks
+
+def chunk_record(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Documents to store for a book record: the record itself, or (chunking enabled) one
+    document per passage with the stable id `<book id>#c<i>` and a `parent_id` reference.
+    """
+    if config.CHUNK_SIZE <= 0:
+        return [record]
+    passages = chunk_text(record["text"], config.CHUNK_SIZE, config.CHUNK_OVERLAP)
+    return [
+        {
+            "id": f"{record['id']}{CHUNK_SEP}{i}",
+            "title": record["title"],
+            "text": passage,
+            "metadata": {**record["metadata"], "parent_id": record["id"], "chunk": i},
+        }
+        for i, passage in enumerate(passages)
+    ]
+
+def parent_id(doc_id: str) -> str:
+    """Book id of a stored document (chunk ids map to their book)."""
+    head, sep, tail = doc_id.rpartition(CHUNK_SEP)
+    return head if sep and tail.isdigit() else doc_id
+
+def query_genres(query: str) -> List[str]:
+    """Genres a reader's query asks for (GENRE_QUERY_TERMS)."""
+    return _genres_in(query, _GENRE_QUERY_PATTERNS)
+
+def infer_query_filters(query: str) -> Dict[str, Any]:
+    """
+    search() keyword arguments implied by the query: a genre named in the query becomes a
+    `where` filter (narrowing the candidate set before the vector search), and query words
+    become theme boosts.
+    """
+    genres = query_genres(query)
+    where = None
+    if len(genres) == 1:
+        where = {f"genre_{slug(genres[0])}": True}
+    elif genres:
+        where = {"$or": [{f"genre_{slug(g)}": True} for g in genres]}
+    # single words and short phrases, so "coming of age" can hit theme_coming_of_age
+    words = re.findall(r"[a-z]+", query.lower())
+    themes = {
+        "_".join(words[i:i + n])
+        for n in (1, 2, 3) for i in range(len(words) - n + 1)
+        if n > 1 or len(words[i]) > 3
+    }
+    return {"where": where, "themes": sorted(themes)}
+
+def iter_books_md(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Lazily parse markdown lines (e.g. an open file) into records, one `## Title:` block at a time."""
+    block: Optional[List[str]] = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        m = _TITLE_RE.match(line)
+        if m:
+            if block is not None:
+                record = _block_to_record(block)
+                if record:
+                    yield record
+            block = [line[m.end():]]
+        elif block is not None:
+            block.append(line)
+    if block is not None:
+        record = _block_to_record(block)
+        if record:
+            yield record
 
 def parse_books_md(md_text: str) -> List[Dict[str, Any]]:
     """Parse the markdown file into records {id, title, text, metadata}."""
-    blocks = re.split(r"^##\s*Title:\s*", md_text, flags=re.MULTILINE)
-    records: List[Dict[str, Any]] = []
-    for block in blocks:
-        block = block.strip()
-        if not block:
-            continue
-        # title: up to the first empty line or end of block
-        lines = block.splitlines()
-        title = lines[0].strip()
-        summary = "\n".join(lines[1:]).strip()
-        rid = title.lower().replace(" ", "-")
-        records.append({
-            "id": rid,
-            "title": title,
-            "text": summary,
-            "metadata": {"title": title}
-        })
-    return records
+    return list(iter_books_md(md_text.splitlines()))
 
 def get_client() -> chromadb.PersistentClient:
     CHROMA_PATH.mkdir(parents=True, exist_ok=True)
     return chromadb.PersistentClient(path=str(CHROMA_PATH))
 
-def get_or_create_collection(client: chromadb.PersistentClient):
-    emb_fn = OpenAIEmbeddingFunction(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        model_name="text-embedding-3-small"
-    )
-    return client.get_or_create_collection(
-        name=COLLECTION_NAME,
-        embedding_function=emb_fn
+_emb_fn = None
+_emb_fn_lock = threading.Lock()
+
+def get_embedding_function() -> EmbeddingFunction:
+    """
+    Process-wide embedding function (shared by indexing and search), per config.EMBEDDING_BACKEND:
+    "openai" (cache-backed OpenAI embeddings) or "hashing" (local n-gram projection, no network).
+    """
+    global _emb_fn
+    with _emb_fn_lock:
+        if _emb_fn is None:
+            if config.EMBEDDING_BACKEND == "hashing":
+                _emb_fn = HashingEmbeddingFunction(dim=config.HASH_EMBED_DIM)
+            else:
+                openai_fn = OpenAIEmbeddingFunction(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    model_name=EMBED_MODEL,
+                    # e.g. the local stand-in in bench/fake_openai.py
+                    api_base=os.getenv("OPENAI_BASE_URL") or None
+                )
+                # calls go through the shared gateway (timeouts, retries, rate limit, dedup);
+                # the function itself is kept so the persisted collection config is unchanged
+                openai_fn.client = get_gateway()
+                _emb_fn = CachedEmbeddingFunction(openai_fn, model_name=EMBED_MODEL)
+        return _emb_fn
+
+def _embedding_cache_stats() -> Dict[str, Any]:
+    return _emb_fn.stats() if isinstance(_emb_fn, CachedEmbeddingFunction) else {}
+
+register_gauges("embedding_cache", _embedding_cache_stats)
+
+def _index_suffix() -> str:
+    """Non-default backends get their own collection/manifest, so vectors of different models never mix."""
+    parts = [p for p in (config.VECTOR_BACKEND, config.EMBEDDING_BACKEND) if p not in ("chroma", "openai")]
+    return "_".join(parts)
+
+def get_or_create_collection(client: Optional[chromadb.PersistentClient] = None):
+    """The vector collection for the configured backends (a NumpyVectorStore when VECTOR_BACKEND=numpy)."""
+    if config.VECTOR_BACKEND == "numpy":
+        return get_numpy_store(VECTORS_PATH / config.EMBEDDING_BACKEND, get_embedding_function())
+    suffix = _index_suffix()
+    return (client or get_client()).get_or_create_collection(
+        name=f"{COLLECTION_NAME}_{suffix}" if suffix else COLLECTION_NAME,
+        embedding_function=get_embedding_function()
     )
 
+def manifest_path() -> Path:
+    suffix = _index_suffix()
+    return MANIFEST_PATH.with_name(f"chroma_manifest.{suffix}.json") if suffix else MANIFEST_PATH
+
+def record_hash(text: str, metadata: Dict[str, Any]) -> str:
+    """Stable content hash of an indexed record (document text + metadata)."""
+    payload = json.dumps({"text": text, "metadata": metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_manifest() -> Dict[str, Any]:
+    """Return the index manifest {version, records: {id: hash}, sources: {book id: source}};
+    empty if missing or unreadable."""
+    try:
+        manifest = json.loads(manifest_path().read_text(encoding="utf-8"))
+        if isinstance(manifest.get("records"), dict):
+            if not isinstance(manifest.get("sources"), dict):
+                manifest["sources"] = {}  # written before sources were tracked
+            return manifest
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"version": None, "records": {}, "sources": {}}
+
+def save_manifest(hashes: Dict[str, str], sources: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Atomically write the manifest; the version is a hash over all record hashes.
+    `sources` maps each book id to the source file it was ingested from (see ingest.source_key)."""
+    digest = hashlib.sha256()
+    for rid in sorted(hashes):
+        digest.update(f"{rid}:{hashes[rid]}\n".encode("utf-8"))
+    manifest = {"version": digest.hexdigest(), "records": hashes, "sources": sources or {}}
+    path = manifest_path()
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=0), encoding="utf-8")
+    os.replace(tmp, path)
+    return manifest
+
+def book_count(manifest: Dict[str, Any]) -> int:
+    """Books in a manifest (passage records count once per book)."""
+    return len({parent_id(rid) for rid in manifest["records"]})
+
 def bootstrap_index() -> int:
-    """Read data/book_summaries.md and (re)index if the collection is empty. Returns the number of records."""
-    client = get_client()
-    col = get_or_create_collection(client)
-    count = col.count()
-    if count and count >= 10:
-        return count
+    """Sync data/book_summaries.md into the collection, embedding only new or changed records.
+    Records removed from the markdown are deleted; books ingested from other sources are kept.
+    Returns the number of books (not passages, when chunking is on)."""
+    from ingest import ingest  # ingest builds on this module
 
     if not DATA_MD.exists():
         raise FileNotFoundError(f"Cannot find {DATA_MD.resolve()}")
 
-    records = parse_books_md(DATA_MD.read_text(encoding="utf-8"))
-    # upsert all
-    col.upsert(
-        ids=[r["id"] for r in records],
-        documents=[r["text"] for r in records],
-        metadatas=[r["metadata"] for r in records]
-    )
-    # Chroma automatically persists in PersistentClient;
-    # an explicit persist() call is not required,
-    # but is safer when running in notebooks.
-    try:
-        col.persist()
-    except Exception:
-        pass
+    col = get_or_create_collection()
+    ingest([DATA_MD], col=col)
+    return book_count(load_manifest())
 
-    return col.count()
+def _without(hits: List[Dict[str, Any]], exclude: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+    if not exclude:
+        return hits
+    skip = set(exclude)
+    return [h for h in hits if h["title"] not in skip]
 
 class RAGEngine:
-    def __init__(self):
-        self.client = get_client()
-        self.col = get_or_create_collection(self.client)
-
-    def search(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
-        """Return the top-k relevant documents (title + text)."""
-        out = self.col.query(query_texts=[query], n_results=k)
-        results = []
-        docs = out.get("documents", [[]])[0]
-        metas = out.get("metadatas", [[]])[0]
-        ids = out.get("ids", [[]])[0]
-        for i, doc in enumerate(docs):
-            meta = metas[i] if i < len(metas) else {}
-            title = meta.get("title", ids[i])
-            results.append({"title": title, "summary": doc})
+    """
+    Hybrid retrieval: dense (Chroma) + BM25 (lexical.py) fused with reciprocal-rank fusion.
+    A decisive keyword match (see lexical.is_decisive) is served from the lexical index alone,
+    without an embedding call: lexical_fast_path() returns its hits even when there are fewer than k
+    (a name like "Katniss" matches one book), while search() keeps them on top and fills the rest
+    from the dense results. With chunked indexing, passage hits are grouped per book.
+    """
+
+    def __init__(self, col=None):
+        self.client = get_client() if config.VECTOR_BACKEND == "chroma" else None
+        self.col = col if col is not None else get_or_create_collection(self.client)
+        self.emb_fn = get_embedding_function()
+        self.lexical = get_lexical_index()
+        self.stats = {"dense": 0, "hybrid": 0, "lexical_only": 0}
+
+    @staticmethod
+    def _scored(out: Dict[str, Any], i: int = 0, themes: Optional[List[str]] = None) -> List[Tuple[float, str, str]]:
+        """
+        Row i of a Chroma query result as (distance, title, document), nearest first. With
+        `themes`, each matching theme_<slug> flag in a document's metadata takes THEME_BOOST
+        off its distance.
+        """
+        docs = (out.get("documents") or [[]])[i]
+        metas = (out.get("metadatas") or [[]])[i] or []
+        ids = (out.get("ids") or [[]])[i]
+        dists = (out.get("distances") or [[]])[i] or []
+        scored = []
+        for j, doc in enumerate(docs):
+            meta = (metas[j] if j < len(metas) else None) or {}
+            dist = dists[j] if j < len(dists) else float(j)
+            if themes:
+                dist -= config.THEME_BOOST * sum(1 for t in themes if meta.get(f"theme_{t}"))
+            scored.append((dist, meta.get("title", ids[j]), doc))
+        if themes:
+            scored.sort(key=lambda x: x[0])
+        return scored
+
+    @staticmethod
+    def _format(out: Dict[str, Any], i: int = 0, themes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Turn row i of a Chroma query result into [{title, summary}]."""
+        return [{"title": title, "summary": doc} for _, title, doc in RAGEngine._scored(out, i, themes)]
+
+    @staticmethod
+    def _group_chunks(out: Dict[str, Any], i: int = 0, themes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Passage hits -> distinct books, ranked by CHUNK_AGGREGATION over 1 / (1 + distance):
+        "max" keeps each book's best passage, "sum" also rewards books matching in several passages.
+        """
+        scores: Dict[str, float] = {}
+        for dist, title, _ in RAGEngine._scored(out, i, themes):
+            rel = 1.0 / (1.0 + max(dist, 0.0))
+            if config.CHUNK_AGGREGATION == "sum":
+                scores[title] = scores.get(title, 0.0) + rel
+            else:
+                scores[title] = max(scores.get(title, 0.0), rel)
+        return RAGEngine._with_summaries(sorted(scores, key=scores.get, reverse=True))
+
+    def _dense(self, out: Dict[str, Any], i: int = 0, themes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self._group_chunks(out, i, themes) if config.CHUNK_SIZE > 0 else self._format(out, i, themes)
+
+    @staticmethod
+    def _with_summaries(titles: List[str]) -> List[Dict[str, Any]]:
+        out = []
+        for title in titles:
+            hit = get_summary_store().lookup(title)
+            if hit:
+                out.append({"title": hit[0], "summary": hit[1]})
+        return out
+
+    @staticmethod
+    def _fuse(dense: List[Dict[str, Any]], lexical: List[Dict[str, Any]], k: int) -> List[Dict[str, Any]]:
+        """Reciprocal-rank fusion of the two ranked lists (by title)."""
+        scores: Dict[str, float] = {}
+        for ranked in (dense, lexical):
+            for rank, item in enumerate(ranked):
+                scores[item["title"]] = scores.get(item["title"], 0.0) + 1.0 / (config.RRF_K + rank + 1)
+        by_title = {d["title"]: d for d in dense}
+        top = sorted(scores, key=scores.get, reverse=True)[:k]
+        missing = RAGEngine._with_summaries([t for t in top if t not in by_title])
+        by_title.update({m["title"]: m for m in missing})
+        return [by_title[t] for t in top if t in by_title]
+
+    def lexical_fast_path(
+        self, query: str, k: int = 3, exclude: Optional[Sequence[str]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Up to k hits from the lexical index if the keyword match is decisive, else None. May return
+        fewer than k — the decisive hits are the candidates; use search() when exactly k are needed.
+        """
+        if not (config.HYBRID_SEARCH and config.LEXICAL_FAST_PATH):
+            return None
+        with span("lexical_search"):
+            hits, terms = self.lexical.search(query, max(k, config.HYBRID_CANDIDATES) + len(exclude or ()))
+        hits = _without(hits, exclude)
+        if not is_decisive(hits, terms, config.LEXICAL_FAST_PATH_MARGIN):
+            return None
+        self.stats["lexical_only"] += 1
+        return self._with_summaries([h["title"] for h in hits[:k]])
+
+    def search(
+        self, query: str, k: int = 3, where: Optional[Dict[str, Any]] = None, themes: Optional[List[str]] = None,
+        exclude: Optional[Sequence[str]] = None, embedding: Any = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the top-k relevant documents (title + text).
+        `where` is a Chroma metadata filter (e.g. {"genre_dystopia": True}, see extract_metadata)
+        applied before the vector search; `themes` boosts documents tagged with those themes;
+        `exclude` titles (e.g. already recommended) are never returned. `embedding` is the query's
+        embedding if the caller already has it (no embedding call then).
+        """
+        embeddings = None if embedding is None else [embedding]
+        return self._search_batch([query], k, where, themes, exclude, embeddings)[0]
+
+    def _search_batch(
+        self, queries: List[str], k: int, where: Optional[Dict[str, Any]] = None, themes: Optional[List[str]] = None,
+        exclude: Optional[Sequence[str]] = None, query_embeddings: Optional[List[Any]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        lexical: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        decisive: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)  # fewer than k keyword hits
+        # the BM25 index knows nothing about metadata filters, so filtered searches are dense-only
+        # (excluded titles are simply dropped from its hits)
+        hybrid = config.HYBRID_SEARCH and where is None
+        n = max(k, config.HYBRID_CANDIDATES) if hybrid or themes else k
+        # passages: fetch enough of them to still end up with n distinct books
+        n_docs = n * max(1, config.CHUNK_QUERY_FANOUT) if config.CHUNK_SIZE > 0 else n
+        not_excluded = {"title": {"$nin": sorted(set(exclude))}} if exclude else None
+        dense_where = {"$and": [where, not_excluded]} if where and not_excluded else where or not_excluded
+        dense_rows = []
+        for i, q in enumerate(queries):
+            if hybrid:
+                with span("lexical_search"):
+                    hits, terms = self.lexical.search(q, n + len(exclude or ()))
+                hits = _without(hits, exclude)[:n]
+                if config.LEXICAL_FAST_PATH and is_decisive(hits, terms, config.LEXICAL_FAST_PATH_MARGIN):
+                    if len(hits) >= k:
+                        results[i] = self._with_summaries([h["title"] for h in hits[:k]])
+                        self.stats["lexical_only"] += 1
+                        continue
+                    decisive[i] = self._with_summaries([h["title"] for h in hits])
+                lexical[i] = hits
+            dense_rows.append(i)
+
+        if dense_rows:
+            if query_embeddings is not None:
+                embeddings = [query_embeddings[i] for i in dense_rows]
+            else:
+                with span("embedding", texts=len(dense_rows)):
+                    embeddings = self.emb_fn([queries[i] for i in dense_rows])
+            with span("vector_query", n_results=n_docs, filtered=dense_where is not None):
+                out = self.col.query(query_embeddings=embeddings, n_results=n_docs, where=dense_where)
+            for j, i in enumerate(dense_rows):
+                dense = self._dense(out, j, themes)[:n]
+                if decisive[i] is not None:
+                    # keep the decisive keyword hits first, top up to k from the dense ranking
+                    seen = {r["title"] for r in decisive[i]}
+                    results[i] = decisive[i] + [d for d in dense if d["title"] not in seen][:k - len(decisive[i])]
+                    self.stats["hybrid"] += 1
+                elif lexical[i]:
+                    results[i] = self._fuse(dense, lexical[i], k)
+                    self.stats["hybrid"] += 1
+                else:
+                    results[i] = dense[:k]
+                    self.stats["dense"] += 1
+
+            # too few documents pass the filter: top up from an unfiltered search (still without excluded titles)
+            short = [j for j, i in enumerate(dense_rows) if where is not None and len(results[i]) < k]
+            if short:
+                with span("vector_query", n_results=n_docs, top_up=True):
+                    extra = self.col.query(
+                        query_embeddings=[embeddings[j] for j in short], n_results=n_docs, where=not_excluded
+                    )
+                for row, j in enumerate(short):
+                    i = dense_rows[j]
+                    seen = {r["title"] for r in results[i]}
+                    fill = [r for r in self._dense(extra, row, themes) if r["title"] not in seen]
+                    results[i] = results[i] + fill[:k - len(results[i])]
         return results
+
+    def search_many(self, queries: List[str], k: int = 3, batch_size: int = 64) -> List[List[Dict[str, Any]]]:
+        """Top-k results for many queries, aligned with the input order.
+        Each batch costs one embeddings request and one multi-query Chroma call; duplicates run once."""
+        unique = list(dict.fromkeys(queries))
+        by_query: Dict[str, List[Dict[str, Any]]] = {}
+        for i in range(0, len(unique), batch_size):
+            chunk = unique[i:i + batch_size]
+            by_query.update(zip(chunk, self._search_batch(chunk, k)))
+        return [by_query[q] for q in queries]
+
+    async def asearch_many(
+        self, queries: List[str], k: int = 3, batch_size: int = 64, max_in_flight: int = 4
+    ) -> List[List[Dict[str, Any]]]:
+        """Async search_many: up to `max_in_flight` batches run concurrently in worker threads."""
+        unique = list(dict.fromkeys(queries))
+        chunks = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+        sem = asyncio.Semaphore(max_in_flight)
+
+        async def run(chunk: List[str]) -> List[List[Dict[str, Any]]]:
+            async with sem:
+                return await asyncio.to_thread(self._search_batch, chunk, k)
+
+        by_query: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk, res in zip(chunks, await asyncio.gather(*(run(c) for c in chunks))):
+            by_query.update(zip(chunk, res))
+        return [by_query[q] for q in queries]
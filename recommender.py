@@ -0,0 +1,392 @@
+# recommender.py
+# Recommendation pipeline (RAG -> LLM choose -> Tool -> Final answer), importable without Streamlit
+# - two_call    : forced tool call, then a second completion writes the final answer (default)
+# - single_call : one structured-output call returns {title, justification};
+#                 the final card is assembled locally from the tool output
+
+import json
+from concurrent.futures import Executor
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+import config
+from gateway import OpenAIGateway
+from moderation_ext import check_with_openai_moderation
+from precomputed import get_precomputed_table
+from rag import infer_query_filters
+from resources import (
+    get_executor, get_openai_client, get_rag_engine, get_semantic_cache, get_title_index, index_version
+)
+from tools import find_summary
+from tracing import bind_context, record_usage, span
+
+CHAT_MODEL = "gpt-4o-mini"
+RECO_MODES = ("two_call", "single_call")
+
+# -------------------------
+# Tool schema for function calling
+# -------------------------
+TOOL_SCHEMA = [{
+    "type": "function",
+    "function": {
+        "name": "get_summary_by_title",
+        "description": "Returns the full summary for an exact book title.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "title": {"type": "string", "description": "The EXACT selected book title"}
+            },
+            "required": ["title"]
+        }
+    }
+}]
+
+SYSTEM_PROMPT = (
+    "You are Smart Librarian. You receive user reading preferences and a list of candidates "
+    "from a vector store. Your job: pick EXACTLY ONE book from the candidates that best matches "
+    "the user's request. After you choose, ALWAYS call `get_summary_by_title` with the EXACT title "
+    "and present the full summary in your final answer. Do NOT ask if the user wants a summary "
+    "before calling the tool. Do not invent titles not present in candidates. "
+    "STAY STRICTLY IN ROLE: you only recommend books. If asked for anything else, politely say you "
+    "can only recommend books and ask for reading preferences."
+)
+
+SINGLE_CALL_PROMPT = (
+    "You are Smart Librarian. You receive user reading preferences and a list of candidates "
+    "from a vector store. Pick EXACTLY ONE book from the candidates that best matches the user's "
+    "request and reply with its EXACT title and a short justification (2-3 sentences, addressed to "
+    "the user) of why it fits. Do not invent titles not present in candidates. "
+    "STAY STRICTLY IN ROLE: you only recommend books."
+)
+
+def resolve_summary(title: str, candidates: Optional[List[Dict[str, Any]]] = None) -> Tuple[str, str]:
+    """
+    find_summary() with a fuzzy fallback for title variants the model produces
+    (case, leading "The", punctuation, subtitles). When candidates are given, only
+    they are considered. Returns (canonical title, summary); raises KeyError.
+    """
+    try:
+        return find_summary(title)
+    except KeyError:
+        pool = [c["title"] for c in candidates] if candidates else None
+        resolved = get_title_index().resolve(title, candidates=pool)
+        if resolved is None:
+            raise
+        return find_summary(resolved)
+
+# -------------------------
+# Two-call mode: forced tool call -> local tool -> second completion writes the answer
+# -------------------------
+def _two_call(client: OpenAIGateway, user_query: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Everything up to the final answer; returns {title, messages} for the second completion."""
+    candidates_json = json.dumps(candidates, ensure_ascii=False)
+
+    # 2) First call: FORCE the tool call so the model doesn't “ask first”
+    first_messages: List[Dict[str, str]] = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_query},
+        {"role": "system", "content": f"Candidates (JSON): {candidates_json}"}
+    ]
+
+    with span("completion.choose", mode="two_call"):
+        first = client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=first_messages,
+            tools=TOOL_SCHEMA,
+            tool_choice={"type": "function", "function": {"name": "get_summary_by_title"}},  # force call
+            temperature=0.2
+        )
+    record_usage(first, CHAT_MODEL)
+
+    choice = first.choices[0].message
+    tool_calls = choice.tool_calls or []
+
+    # 3) Execute tool(s) locally and capture outputs
+    tool_messages: List[Dict[str, str]] = []
+    chosen_title = None
+    assistant_tool_calls_payload = []
+
+    for tc in tool_calls:
+        assistant_tool_calls_payload.append({
+            "id": getattr(tc, "id", getattr(tc, "tool_call_id", None)),
+            "type": "function",
+            "function": {
+                "name": getattr(tc.function, "name", None) if getattr(tc, "function", None) else None,
+                "arguments": getattr(tc.function, "arguments", None) if getattr(tc, "function", None) else None,
+            }
+        })
+
+        if getattr(tc, "type", "function") == "function" and getattr(tc, "function", None):
+            fn_name = getattr(tc.function, "name", "")
+            if fn_name == "get_summary_by_title":
+                args_raw = getattr(tc.function, "arguments", "{}") or "{}"
+                try:
+                    args = json.loads(args_raw)
+                except Exception:
+                    args = {}
+                title = (args.get("title") or "").strip()
+                if title:
+                    chosen_title = title
+                else:
+                    # Fallback: if the model forgot to pass a title, pick the top candidate
+                    if candidates:
+                        chosen_title = candidates[0]["title"]
+                        args["title"] = chosen_title
+
+                try:
+                    # returns the canonical title, so case/diacritic variants still resolve
+                    with span("tool", tool=fn_name):
+                        chosen_title, summary = resolve_summary(chosen_title, candidates)
+                    tool_messages.append({
+                        "role": "tool",
+                        "tool_call_id": assistant_tool_calls_payload[-1]["id"],
+                        "content": summary
+                    })
+                except Exception as e:
+                    tool_messages.append({
+                        "role": "tool",
+                        "tool_call_id": assistant_tool_calls_payload[-1]["id"],
+                        "content": f"Error: {e}"
+                    })
+
+    # 4) Second call: send back tool outputs so the model can compose the final answer
+    second_messages: List[Dict[str, Any]] = first_messages + [
+        {
+            "role": "assistant",
+            "content": choice.content or "",
+            "tool_calls": assistant_tool_calls_payload
+        },
+        *tool_messages
+    ]
+
+    return {"title": chosen_title, "messages": second_messages}
+
+def _final_completion(client: OpenAIGateway, messages: List[Dict[str, Any]]) -> str:
+    with span("completion.final"):
+        second = client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=messages,
+            temperature=0.2
+        )
+    record_usage(second, CHAT_MODEL)
+    return second.choices[0].message.content or "I couldn't generate a final answer."
+
+# -------------------------
+# Single-call mode: structured output {title, justification}; summary attached locally
+# -------------------------
+def _choice_format(titles: List[str]) -> Dict[str, Any]:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "book_choice",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string", "enum": titles},
+                    "justification": {"type": "string"}
+                },
+                "required": ["title", "justification"],
+                "additionalProperties": False
+            }
+        }
+    }
+
+def compose_card_text(justification: str, summary: str) -> str:
+    """Final answer for single-call mode: the model's justification followed by the local summary."""
+    if not justification:
+        return summary
+    return f"{justification}\n\n**Summary:** {summary}"
+
+def _single_call(client: OpenAIGateway, user_query: str, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    titles = list(dict.fromkeys(c["title"] for c in candidates))
+    if not titles:
+        return {"final_text": "I couldn't find a matching book in the library.", "title": None}
+
+    with span("completion.choose", mode="single_call"):
+        resp = client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": SINGLE_CALL_PROMPT},
+                {"role": "user", "content": user_query},
+                {"role": "system", "content": f"Candidates (JSON): {json.dumps(candidates, ensure_ascii=False)}"}
+            ],
+            response_format=_choice_format(titles),
+            temperature=0.2
+        )
+    record_usage(resp, CHAT_MODEL)
+    try:
+        choice = json.loads(resp.choices[0].message.content or "{}")
+    except Exception:
+        choice = {}
+    title = (choice.get("title") or "").strip()
+    if title not in titles:
+        # Fallback: refusal or malformed output -> top candidate
+        title = titles[0]
+
+    try:
+        with span("tool", tool="get_summary_by_title"):
+            title, summary = resolve_summary(title, candidates)
+    except Exception:
+        summary = next((c["summary"] for c in candidates if c["title"] == title), "")
+    return {"final_text": compose_card_text((choice.get("justification") or "").strip(), summary), "title": title}
+
+# -------------------------
+# Entry points
+# -------------------------
+def _search(
+    user_query: str, k: int = 3, exclude: Optional[Sequence[str]] = None, themes: Optional[Sequence[str]] = None,
+    embedding: Any = None
+) -> List[Dict[str, Any]]:
+    """Top-k candidates, narrowed by the genre/theme filters the query implies (+ extra theme boosts).
+    `embedding` is the query's embedding when semantic_lookup already computed it."""
+    filters = infer_query_filters(user_query) if config.METADATA_FILTERS else {}
+    if themes:
+        filters["themes"] = sorted(set(filters.get("themes") or []) | set(themes))
+    return get_rag_engine().search(user_query, k=k, exclude=exclude, embedding=embedding, **filters)
+
+def retrieve(
+    user_query: str, exclude: Optional[Sequence[str]] = None, themes: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    The network-bound front half of a turn, safe to run concurrently with moderation:
+    {hit: cached answer or None, embedding, candidates: top-k (None on a cache hit)}.
+    `exclude` titles (already recommended in this conversation) are never offered, not even from the cache.
+    """
+    rag = get_rag_engine()
+    with span("retrieval", excluded=len(exclude or ())) as s:
+        # a decisive keyword match ("Katniss", an author) needs no embedding call at all, even when
+        # it names fewer than 3 books: those are the only candidates worth offering
+        candidates = rag.lexical_fast_path(user_query, k=3, exclude=exclude)
+        if candidates:
+            s.set(route="lexical_only")
+            return {"hit": None, "embedding": None, "candidates": candidates}
+        hit, embedding = semantic_lookup(user_query)
+        if hit is not None and hit.get("title") not in (exclude or ()):
+            s.set(route="semantic_cache")
+            return {"hit": hit, "embedding": embedding, "candidates": None}
+        s.set(route="search")
+        return {"hit": None, "embedding": embedding, "candidates": _search(user_query, exclude=exclude, themes=themes, embedding=embedding)}
+
+def prepare_recommendation(
+    user_query: str, mode: Optional[str] = None, candidates: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Retrieval (unless `candidates` are given) + model choice + local tool. Returns {title, mode}
+    plus either `final_text` (answer already complete) or `messages` (pass to stream_final_text).
+    """
+    mode = mode or config.RECO_MODE
+    client = get_openai_client()
+    # 1) Retrieve top candidates (semantic search)
+    if candidates is None:
+        candidates = _search(user_query)
+    if mode == "single_call":
+        prepared = _single_call(client, user_query, candidates)
+    else:
+        prepared = _two_call(client, user_query, candidates)
+    prepared["mode"] = mode
+    return prepared
+
+def stream_final_text(prepared: Dict[str, Any]) -> Iterator[str]:
+    """Yield the final answer as it is generated (a single chunk if it is already complete)."""
+    if "messages" not in prepared:
+        yield prepared.get("final_text") or ""
+        return
+    produced = False
+    with span("completion.final", stream=True) as s:
+        stream = get_openai_client().chat.completions.create(
+            model=CHAT_MODEL,
+            messages=prepared["messages"],
+            temperature=0.2,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                record_usage(chunk, CHAT_MODEL)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not produced:
+                    s.set(ttft_ms=round(s.elapsed_ms(), 1))
+                produced = True
+                yield delta
+    if not produced:
+        yield "I couldn't generate a final answer."
+
+def model_choose_and_call_tool(user_query: str, mode: Optional[str] = None) -> Dict[str, Any]:
+    """RAG -> GPT choice -> local tool -> final text + chosen title. `mode` defaults to config.RECO_MODE."""
+    prepared = prepare_recommendation(user_query, mode)
+    final_text = prepared.get("final_text")
+    if "messages" in prepared:
+        final_text = _final_completion(get_openai_client(), prepared["messages"])
+    return {"final_text": final_text, "title": prepared["title"], "mode": prepared["mode"]}
+
+# -------------------------
+# Semantic cache in front of the pipeline
+# -------------------------
+def semantic_lookup(user_query: str) -> Tuple[Optional[Dict[str, Any]], Any]:
+    """Return (cached answer or None, query embedding); retrieve() passes the embedding on to the search."""
+    if not config.SEMANTIC_CACHE_ENABLED:
+        return None, None
+    with span("embedding", texts=1):
+        embedding = get_rag_engine().emb_fn([user_query])[0]
+    with span("semantic_cache") as s:
+        hit = get_semantic_cache().get(embedding, index_version())
+        s.set(hit=hit is not None)
+    return hit, embedding
+
+def semantic_store(user_query: str, embedding: Any, result: Dict[str, Any]) -> None:
+    if embedding is not None and result.get("title"):
+        get_semantic_cache().put(
+            user_query, embedding,
+            {"final_text": result["final_text"], "title": result["title"]},
+            index_version()
+        )
+
+def precomputed_answer(user_query: str, exclude: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+    """Warm-up answer (see warmup.py) for this exact request under the current catalog version, else None."""
+    if not config.PRECOMPUTED_ANSWERS:
+        return None
+    with span("precomputed") as s:
+        row = get_precomputed_table().get(user_query, index_version())
+        if row is not None and row["title"] in (exclude or ()):
+            row = None
+        s.set(hit=row is not None)
+    return row
+
+# -------------------------
+# One complete turn without a UI (service.py)
+# -------------------------
+def recommend(
+    user_query: str, exclude: Optional[Sequence[str]] = None, mode: Optional[str] = None,
+    executor: Optional[Executor] = None, use_precomputed: bool = True
+) -> Dict[str, Any]:
+    """
+    Moderation (on `executor`, default the shared pool) || retrieval, then choice + tool + final text —
+    the app's turn minus streaming: {blocked, reasons, title, final_text, mode, cached, source, candidates}.
+    Blocked queries never reach the chat model. A precomputed answer skips retrieval and the chat
+    model, but is served only once moderation has allowed the query.
+    """
+    moderation_future = (executor or get_executor()).submit(bind_context(check_with_openai_moderation), user_query)
+    row = precomputed_answer(user_query, exclude) if use_precomputed else None
+    retrieval = retrieve(user_query, exclude=exclude) if row is None else None
+    moderation = moderation_future.result()
+    if moderation["blocked"]:
+        return {"blocked": True, "reasons": moderation["reasons"], "title": None, "final_text": None,
+                "mode": None, "cached": False, "source": "moderation", "candidates": []}
+    if row is not None:
+        return {"blocked": False, "reasons": [], "title": row["title"], "final_text": row["final_text"],
+                "mode": row["mode"], "cached": True, "source": "precomputed", "candidates": row["candidates"]}
+    hit = retrieval["hit"]
+    if hit is not None:
+        return {"blocked": False, "reasons": [], "title": hit.get("title"), "final_text": hit.get("final_text"),
+                "mode": hit.get("mode"), "cached": True, "source": "semantic_cache", "candidates": []}
+    prepared = prepare_recommendation(user_query, mode, candidates=retrieval["candidates"])
+    final_text = prepared.get("final_text")
+    if "messages" in prepared:
+        final_text = _final_completion(get_openai_client(), prepared["messages"])
+    result = {"final_text": final_text, "title": prepared["title"], "mode": prepared["mode"]}
+    semantic_store(user_query, retrieval["embedding"], result)
+    return {"blocked": False, "reasons": [], **result, "cached": False, "source": "pipeline",
+            "candidates": [c["title"] for c in retrieval["candidates"] or []]}
@@ -0,0 +1,134 @@
+# resources.py
+# Process-wide shared resources
+# -----------------------------
+# Streamlit re-executes app.py on every interaction, but imported modules stay loaded.
+# Everything cached here is therefore built once per process and shared by all sessions:
+# - one OpenAI gateway (gateway.py: one pooled client + shared timeouts/retries/rate limits)
+# - one small thread pool for per-turn concurrent work (moderation || retrieval)
+# - one index sync (re-run only when the source markdown changes on disk); an ingest from any
+#   other source (python ingest.py extra.jsonl, another process) is picked up from the manifest
+# - one RAGEngine and one fuzzy title index (rebuilt only when the index manifest version changes)
+# - one semantic response cache (invalidated by the manifest version it is queried with)
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import config
+import gateway
+import tracing
+from lexical import get_lexical_index
+from local_backends import reload_numpy_stores
+from rag import DATA_MD, RAGEngine, book_count, bootstrap_index, load_manifest, manifest_path
+from semantic_cache import SemanticCache
+from title_index import TitleIndex
+from tools import get_summary_store
+
+_lock = threading.RLock()
+_Stat = Optional[Tuple[int, int]]
+_index_signature: Optional[Tuple[_Stat, _Stat]] = None  # (source markdown, index manifest)
+_index_total = 0
+_index_version: Optional[str] = None
+_engine: Optional[RAGEngine] = None
+_engine_version: Optional[str] = None
+_semantic_cache: Optional[SemanticCache] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_title_index: Optional[TitleIndex] = None
+_title_index_version: Optional[str] = None
+
+def get_openai_client() -> gateway.OpenAIGateway:
+    """Shared OpenAI client, behind the gateway (thread-safe; one connection pool per process)."""
+    return gateway.get_gateway()
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for I/O-bound per-turn work (threads are reused across reruns)."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="librarian")
+        return _executor
+
+def _stat(path) -> _Stat:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def ensure_index() -> int:
+    """
+    Sync the index once per process, and again only if the source markdown changed. Any other
+    catalog change (an ingest of another source, here or in another process) rewrites the manifest:
+    the version and book count are re-read from it and the in-memory index state is reloaded.
+    Returns the book count.
+    """
+    global _index_signature, _index_total, _index_version
+    with _lock:
+        markdown, manifest = _stat(DATA_MD), _stat(manifest_path())
+        if _index_signature is not None and (markdown, manifest) == _index_signature:
+            return _index_total
+        if _index_signature is None or markdown is None or markdown != _index_signature[0]:
+            bootstrap_index()
+        current = load_manifest()
+        if _index_version is not None and current["version"] != _index_version:
+            reload_numpy_stores()
+            get_lexical_index().refresh()
+        _index_total = book_count(current)
+        _index_version = current["version"]
+        _index_signature = (markdown, _stat(manifest_path()))
+        get_title_index()  # precompute at bootstrap, off the per-turn path
+        return _index_total
+
+def index_version() -> Optional[str]:
+    """Catalog version (manifest hash) of the index this process is serving."""
+    ensure_index()
+    return _index_version
+
+def get_rag_engine() -> RAGEngine:
+    """Shared RAGEngine, rebuilt only when the index manifest version changes."""
+    global _engine, _engine_version
+    with _lock:
+        version = index_version()
+        if _engine is None or version != _engine_version:
+            _engine = RAGEngine()
+            _engine_version = version
+        return _engine
+
+def get_title_index() -> TitleIndex:
+    """Fuzzy title resolver over the whole catalog, rebuilt when the manifest version changes."""
+    global _title_index, _title_index_version
+    with _lock:
+        version = index_version()
+        if _title_index is None or version != _title_index_version:
+            _title_index = TitleIndex(get_summary_store().titles())
+            _title_index_version = version
+        return _title_index
+
+def get_semantic_cache() -> SemanticCache:
+    """Shared semantic response cache, sized from config."""
+    global _semantic_cache
+    with _lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache(
+                threshold=config.SEMANTIC_CACHE_THRESHOLD,
+                ttl_seconds=config.SEMANTIC_CACHE_TTL_SECONDS,
+                max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+            )
+        return _semantic_cache
+
+tracing.register_gauges("semantic_cache", lambda: _semantic_cache.stats() if _semantic_cache is not None else {})
+
+def reset() -> None:
+    """Drop every cached resource (benchmarks / tests)."""
+    global _index_signature, _index_total, _index_version, _engine, _engine_version
+    global _semantic_cache, _title_index, _title_index_version
+    with _lock:
+        gateway.reset()
+        _title_index = None
+        _title_index_version = None
+        _semantic_cache = None
+        _index_signature = None
+        _index_total = 0
+        _index_version = None
+        _engine = None
+        _engine_version = None
@@ -0,0 +1,93 @@
+# semantic_cache.py
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+class SemanticCache:
+    """
+    Answers keyed by query embedding: a lookup is one matrix-vector product over the stored
+    (unit-normalized) query vectors. Entries expire after `ttl_seconds`, the least recently used
+    entry is evicted when full, and everything is dropped when the catalog version changes.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl_seconds: float = 6 * 3600, max_entries: int = 2048):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._matrix: Optional[np.ndarray] = None  # (max_entries, dim) float32, allocated on first put
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._created = np.zeros(max_entries, dtype=np.float64)
+        self._used = np.zeros(max_entries, dtype=np.float64)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _unit(vec) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32).ravel()
+        n = float(np.linalg.norm(v))
+        return v / n if n else v
+
+    def _check_version(self, version: Optional[str]) -> None:
+        if version != self._version:
+            if self._valid.any():
+                self._stats["invalidations"] += 1
+            self._valid[:] = False
+            self._entries = [None] * self.max_entries
+            self._version = version
+
+    def get(self, embedding, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return the stored answer of the most similar previous query, if above the threshold."""
+        q = self._unit(embedding)
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            if self._matrix is None or self._matrix.shape[1] != q.shape[0] or not self._valid.any():
+                self._stats["misses"] += 1
+                return None
+            self._valid &= (now - self._created) < self.ttl_seconds
+            sims = self._matrix @ q
+            sims[~self._valid] = -np.inf
+            slot = int(np.argmax(sims))
+            if sims[slot] < self.threshold:
+                self._stats["misses"] += 1
+                return None
+            self._used[slot] = now
+            self._stats["hits"] += 1
+            entry = self._entries[slot]
+            return {**entry["value"], "cache": {"query": entry["query"], "similarity": float(sims[slot])}}
+
+    def put(self, query: str, embedding, value: Dict[str, Any], version: Optional[str] = None) -> None:
+        q = self._unit(embedding)
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            if self._matrix is None or self._matrix.shape[1] != q.shape[0]:
+                self._matrix = np.zeros((self.max_entries, q.shape[0]), dtype=np.float32)
+                self._valid[:] = False
+            self._valid &= (now - self._created) < self.ttl_seconds
+            free = np.flatnonzero(~self._valid)
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._used))
+                self._stats["evictions"] += 1
+            self._matrix[slot] = q
+            self._valid[slot] = True
+            self._created[slot] = self._used[slot] = now
+            self._entries[slot] = {"query": query, "value": dict(value)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._valid[:] = False
+            self._entries = [None] * self.max_entries
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        lookups = s["hits"] + s["misses"]
+        s["hit_rate"] = s["hits"] / lookups if lookups else 0.0
+        s["entries"] = int(self._valid.sum())
+        return s
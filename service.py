@@ -0,0 +1,263 @@
+# service.py
+# Headless recommendation service (asyncio, stdlib only) over the same pipeline as app.py
+# ---------------------------------------------------------------------------------------
+#   POST /v1/recommend  {"query": "...", "exclude": ["title", ...], "mode": "two_call"|"single_call"}
+#   POST /v1/search     {"query": "...", "k": 3}
+#   POST /v1/moderate   {"text": "..."}
+#   GET  /v1/summary?title=...
+#   GET  /healthz       GET /metrics (Prometheus text: stage histograms + service counters)
+#
+# - the pipeline is blocking (OpenAI SDK, Chroma), so each request runs on a worker thread; the
+#   OpenAI client, index and caches are the process-wide ones from resources.py
+# - at most SERVICE_MAX_CONCURRENCY requests run at once and SERVICE_MAX_QUEUE more may wait; beyond
+#   that requests are refused at once with 503 + Retry-After (backpressure instead of an unbounded queue)
+# - every request has a SERVICE_TIMEOUT_SECONDS deadline (queueing included) -> 504. A timed-out
+#   worker keeps its slot until it actually finishes, so the limit holds for real work in flight
+#
+# Usage: python -m service [--host 127.0.0.1] [--port 8080]
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import config
+import tracing
+from moderation_ext import check_with_openai_moderation
+from recommender import RECO_MODES, recommend
+from resources import ensure_index, get_rag_engine
+from tools import find_summary
+
+MAX_BODY_BYTES = 64 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+class Limiter:
+    """Concurrency limit + bounded wait queue; work runs on `pool` and holds its slot until it finishes."""
+
+    def __init__(self, limit: int, max_queue: int, pool: ThreadPoolExecutor):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.pool = pool
+        self.active = 0
+        self.waiting = 0
+        self._sem = asyncio.Semaphore(limit)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, deadline: float) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._sem.locked() and self.waiting >= self.max_queue:
+            raise HTTPError(503, "server busy, retry later", {"Retry-After": "1"})
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "timed out waiting for a free worker") from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        future = loop.run_in_executor(self.pool, tracing.bind_context(fn), *args)
+
+        def release(_: Any) -> None:
+            self.active -= 1
+            self._sem.release()
+
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "request timed out") from None
+
+class Service:
+    def __init__(
+        self,
+        concurrency: int = config.SERVICE_MAX_CONCURRENCY,
+        max_queue: int = config.SERVICE_MAX_QUEUE,
+        timeout_seconds: float = config.SERVICE_TIMEOUT_SECONDS,
+    ):
+        self.timeout_seconds = timeout_seconds
+        # one pipeline thread per slot, plus one each for the moderation call run alongside retrieval
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="service")
+        self.side_pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="service-side")
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.limiter: Optional[Limiter] = None  # created on the serving loop
+        self.counts: Dict[Tuple[str, int], int] = {}
+        self._counts_lock = threading.Lock()
+        self.routes: Dict[Tuple[str, str], Callable[[Dict[str, Any], Dict[str, Any]], Any]] = {
+            ("POST", "/v1/recommend"): self.recommend,
+            ("POST", "/v1/search"): self.search,
+            ("POST", "/v1/moderate"): self.moderate,
+            ("GET", "/v1/summary"): self.summary,
+        }
+
+    # ---- handlers (run on worker threads)
+    @staticmethod
+    def _query(body: Dict[str, Any], key: str = "query") -> str:
+        text = body.get(key)
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPError(400, f"'{key}' must be a non-empty string")
+        return text.strip()
+
+    def recommend(self, body: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        mode = body.get("mode")
+        if mode is not None and mode not in RECO_MODES:
+            raise HTTPError(400, f"'mode' must be one of {', '.join(RECO_MODES)}")
+        exclude = body.get("exclude") or []
+        if not isinstance(exclude, list) or not all(isinstance(t, str) for t in exclude):
+            raise HTTPError(400, "'exclude' must be a list of titles")
+        return recommend(self._query(body), exclude=exclude, mode=mode, executor=self.side_pool)
+
+    def search(self, body: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        k = body.get("k", 3)
+        if not isinstance(k, int) or not 1 <= k <= 20:
+            raise HTTPError(400, "'k' must be an integer between 1 and 20")
+        return {"results": get_rag_engine().search(self._query(body), k=k)}
+
+    def moderate(self, body: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        return check_with_openai_moderation(self._query(body, "text"))
+
+    def summary(self, body: Dict[str, Any], params: Dict[str, Any]) -> Dict[str, Any]:
+        title = (params.get("title") or [""])[0].strip()
+        if not title:
+            raise HTTPError(400, "'title' query parameter is required")
+        try:
+            title, summary = find_summary(title)
+        except KeyError:
+            raise HTTPError(404, f"no book titled {title!r}") from None
+        return {"title": title, "summary": summary}
+
+    # ---- dispatch
+    def _count(self, path: str, status: int) -> None:
+        if path not in ("/healthz", "/metrics") and not any(path == p for _, p in self.routes):
+            path = "other"  # keep the label set bounded
+        with self._counts_lock:
+            self.counts[(path, status)] = self.counts.get((path, status), 0) + 1
+
+    def metrics_text(self) -> str:
+        lines = [tracing.metrics_text().rstrip("\n"), "# TYPE librarian_service_requests_total counter"]
+        with self._counts_lock:
+            lines += [f'librarian_service_requests_total{{path="{p}",status="{s}"}} {n}'
+                      for (p, s), n in sorted(self.counts.items())]
+        if self.limiter is not None:
+            lines += ["# TYPE librarian_service_in_flight gauge", f"librarian_service_in_flight {self.limiter.active}",
+                      "# TYPE librarian_service_waiting gauge", f"librarian_service_waiting {self.limiter.waiting}"]
+        return "\n".join(lines) + "\n"
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, bytes, str, Dict[str, str]]:
+        """(status, payload, content type, extra headers) for one request."""
+        url = urlsplit(target)
+        if url.path == "/healthz":
+            return 200, b'{"status": "ok"}', "application/json", {}
+        if url.path == "/metrics":
+            return 200, self.metrics_text().encode("utf-8"), "text/plain; version=0.0.4", {}
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            known = any(path == url.path for _, path in self.routes)
+            raise HTTPError(405 if known else 404, f"{method} {url.path} is not supported")
+        try:
+            payload = json.loads(body or b"{}") if method == "POST" else {}
+        except ValueError:
+            raise HTTPError(400, "body must be JSON") from None
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "body must be a JSON object")
+
+        def run() -> Any:
+            # the query in the trace lets `python -m warmup --log` find popular requests in TRACE_LOG
+            query = payload.get("query") if isinstance(payload.get("query"), str) else None
+            with tracing.trace("request", path=url.path, **({"query": query} if query else {})):
+                return handler(payload, parse_qs(url.query))
+
+        loop = asyncio.get_running_loop()
+        result = await self.limiter.run(run, deadline=loop.time() + self.timeout_seconds)
+        return 200, json.dumps(result, ensure_ascii=False).encode("utf-8"), "application/json", {}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """HTTP/1.1 with keep-alive; one request at a time per connection."""
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                    if not request_line:
+                        break
+                    method, target, version = request_line.decode("latin-1").split()
+                    headers: Dict[str, str] = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                except (ValueError, asyncio.IncompleteReadError):
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                path = urlsplit(target).path
+                started = time.perf_counter()
+                extra: Dict[str, str] = {}
+                try:
+                    length = int(headers.get("content-length") or 0)
+                    if length > MAX_BODY_BYTES:
+                        keep_alive = False
+                        raise HTTPError(413, "body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload, content_type, extra = await self.dispatch(method.upper(), target, body)
+                except HTTPError as e:
+                    status, content_type, extra = e.status, "application/json", e.headers
+                    payload = json.dumps({"error": str(e)}).encode("utf-8")
+                except Exception as e:
+                    status, content_type = 500, "application/json"
+                    payload = json.dumps({"error": f"{type(e).__name__}: {e}"}).encode("utf-8")
+                self._count(path, status)
+                head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                        f"Content-Length: {len(payload)}", f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                        f"X-Elapsed-Ms: {(time.perf_counter() - started) * 1000:.1f}"]
+                head += [f"{k}: {v}" for k, v in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int, ready: Optional[Callable[[str], None]] = None) -> None:
+        self.limiter = Limiter(self.concurrency, self.max_queue, self.pool)
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        bound_host, bound_port = server.sockets[0].getsockname()[:2]
+        if ready is not None:
+            ready(f"http://{bound_host}:{bound_port}")
+        async with server:
+            await server.serve_forever()
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=config.SERVICE_PORT)
+    args = ap.parse_args()
+    books = ensure_index()  # sync the index and warm shared resources before accepting traffic
+    get_rag_engine()
+    service = Service()
+
+    def ready(url: str) -> None:
+        print(f"serving {books} books on {url}", flush=True)
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.pool.shutdown(wait=False, cancel_futures=True)
+        service.side_pool.shutdown(wait=False, cancel_futures=True)
+
+if __name__ == "__main__":
+    main()
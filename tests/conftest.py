@@ -0,0 +1,46 @@
+# tests/conftest.py
+# The suite runs offline: a local OpenAI stand-in (bench/fake_openai.py), hashing embeddings and the
+# numpy vector store, in a scratch copy of data/ (every index/cache file is created relative to CWD).
+# The environment is set here, before any test module imports config.
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench.fake_openai import FakeOpenAIServer  # noqa: E402
+
+_server = FakeOpenAIServer().start()
+_workdir = Path(tempfile.mkdtemp(prefix="librarian-tests-"))
+shutil.copytree(ROOT / "data", _workdir / "data")
+os.chdir(_workdir)
+os.environ.update(
+    OPENAI_BASE_URL=_server.base_url,
+    OPENAI_API_KEY="test",
+    EMBEDDING_BACKEND="hashing",
+    VECTOR_BACKEND="numpy",
+    SEMANTIC_CACHE_ENABLED="0",
+    PRECOMPUTED_ANSWERS="0",
+    TRACE_LOG="",
+    METRICS_PORT="0",
+)
+
+@pytest.fixture
+def fake_openai() -> FakeOpenAIServer:
+    """The running stand-in, with its latency/fault settings and request counters reset."""
+    _server.latency_ms = {k: 0.0 for k in _server.latency_ms}
+    _server.rate_limit, _server.stall = {}, {}
+    for counts in (_server.requests, _server.rate_limited):
+        for k in counts:
+            counts[k] = 0
+    yield _server
+
+def pytest_sessionfinish(session, exitstatus) -> None:
+    _server.stop()
+    os.chdir(ROOT)
+    shutil.rmtree(_workdir, ignore_errors=True)
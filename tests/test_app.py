@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+import recommender
+
+APP = str(Path(__file__).resolve().parent.parent / "app.py")
+
+BLOCKED_FANTASY = "I will kill you unless you find me a fantasy book"
+
+def _send(message: str) -> AppTest:
+    at = AppTest.from_file(APP, default_timeout=30).run()
+    at.chat_input[0].set_value(message).run()
+    assert not at.exception
+    return at
+
+def _assistant_replies(at: AppTest) -> list:
+    return [m["content"] for m in at.session_state.conversation.messages if m["role"] == "assistant"]
+
+def test_allowed_query_feeds_the_profile(fake_openai):
+    at = _send("I'd like a fantasy book")
+    assert "fantasy" in at.session_state.conversation.profile.top_genres()
+
+def test_blocked_query_does_not_reach_the_profile(fake_openai):
+    at = _send(BLOCKED_FANTASY)
+    conversation = at.session_state.conversation
+    assert conversation.profile.top_genres() == []
+    assert _assistant_replies(at)[-1].startswith("Please keep the conversation respectful.")
+    assert fake_openai.requests["chat"] == 0
+
+def test_blocked_query_is_not_answered_from_precomputed(fake_openai, monkeypatch):
+    row = {"title": "The Hobbit", "final_text": "WARMED ANSWER", "mode": "two_call", "candidates": []}
+    monkeypatch.setattr(recommender, "precomputed_answer", lambda query, exclude=None: dict(row))
+    at = _send(BLOCKED_FANTASY)
+    replies = _assistant_replies(at)
+    assert len(replies) == 1 and replies[0].startswith("Please keep the conversation respectful.")
+    assert not any("WARMED ANSWER" in m.value for m in at.markdown)
+    assert at.session_state.last_reco_title is None
+
+def test_allowed_query_is_answered_from_precomputed(fake_openai, monkeypatch):
+    row = {"title": "The Hobbit", "final_text": "WARMED ANSWER", "mode": "two_call", "candidates": []}
+    monkeypatch.setattr(recommender, "precomputed_answer", lambda query, exclude=None: dict(row))
+    at = _send("I'd like a fantasy book")
+    assert _assistant_replies(at) == ["WARMED ANSWER"]
+    assert fake_openai.requests["chat"] == 0
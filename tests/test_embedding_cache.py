@@ -0,0 +1,63 @@
+# tests/test_embedding_cache.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import rag
+import tracing
+from embedding_cache import CachedEmbeddingFunction
+from local_backends import HashingEmbeddingFunction
+
+class CountingEmbedder(HashingEmbeddingFunction):
+    def __init__(self):
+        super().__init__(dim=64)
+        self.texts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, input):
+        with self._lock:
+            self.texts.extend(input)
+        return super().__call__(input)
+
+def test_a_new_instance_reuses_vectors_from_disk(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    texts = ["a lighthouse keeper", "a comet returns", "a lighthouse keeper"]
+    first_inner = CountingEmbedder()
+    first = CachedEmbeddingFunction(first_inner, "hash-64", path=path)
+    vectors = first(texts)
+    assert first_inner.texts == ["a lighthouse keeper", "a comet returns"]  # duplicates embedded once
+    assert first.stats()["misses"] == 2
+
+    second_inner = CountingEmbedder()
+    second = CachedEmbeddingFunction(second_inner, "hash-64", path=path)  # e.g. the next process
+    again = second(texts)
+    assert second_inner.texts == []
+    assert second.stats()["disk_hits"] == 2 and second.stats()["misses"] == 0
+    for a, b in zip(vectors, again):
+        np.testing.assert_array_equal(a, b)
+    second(["a comet returns"])
+    assert second.stats()["memory_hits"] == 1
+
+    other_model = CachedEmbeddingFunction(CountingEmbedder(), "hash-64-v2", path=path)
+    other_model(["a comet returns"])
+    assert other_model.stats()["misses"] == 1  # keys include the model name
+
+def test_counters_are_consistent_under_concurrency(tmp_path):
+    inner = CountingEmbedder()
+    cache = CachedEmbeddingFunction(inner, "hash-64", path=tmp_path / "cache.sqlite")
+    batches = [[f"book {i} {j}" for j in range(5)] for i in range(40)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(cache, batches))
+        list(pool.map(cache, batches))
+    s = cache.stats()
+    assert s["misses"] == len(inner.texts) == 200
+    assert s["miss_calls"] == 40
+    assert s["memory_hits"] + s["disk_hits"] == 200
+
+def test_embedding_cache_stats_are_exported(monkeypatch, tmp_path):
+    cache = CachedEmbeddingFunction(CountingEmbedder(), "hash-64", path=tmp_path / "cache.sqlite")
+    cache(["dune"])
+    monkeypatch.setattr(rag, "_emb_fn", cache)
+    assert tracing.gauges()["embedding_cache"]["misses"] == 1
+    assert 'librarian_embedding_cache{stat="hit_rate"}' in tracing.metrics_text()
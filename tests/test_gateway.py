@@ -0,0 +1,88 @@
+# tests/test_gateway.py
+# The OpenAI gateway against the local stand-in: retries on 429, the shared Retry-After pause,
+# coalescing of identical concurrent requests and per-endpoint timeouts.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+import pytest
+from openai import OpenAI
+
+from gateway import ENDPOINTS, EndpointPolicy, OpenAIGateway
+
+def _gateway(fake_openai, **overrides) -> OpenAIGateway:
+    policies = {name: EndpointPolicy(timeout=5.0, max_retries=3, backoff_base=0.01, backoff_max=0.05)
+                for name in ENDPOINTS}
+    policies.update(overrides)
+    return OpenAIGateway(OpenAI(base_url=fake_openai.base_url, api_key="test"), policies)
+
+def _refuse_first(fake_openai, monkeypatch, n: int):
+    """Answer the first `n` requests with a 429; returns the arrival times of all requests."""
+    arrivals = []
+    lock = threading.Lock()
+    original = fake_openai._refuse
+
+    def refuse(endpoint):
+        original(endpoint)  # keeps the request counters
+        with lock:
+            arrivals.append(time.monotonic())
+            return len(arrivals) <= n
+
+    monkeypatch.setattr(fake_openai, "_refuse", refuse)
+    return arrivals
+
+def test_retries_a_429_then_succeeds(fake_openai, monkeypatch):
+    _refuse_first(fake_openai, monkeypatch, 2)
+    out = _gateway(fake_openai).embeddings.create(model="text-embedding-3-small", input=["dune"])
+    assert len(out.data) == 1
+    assert fake_openai.requests["embeddings"] == 3
+
+def test_gives_up_after_max_retries(fake_openai, monkeypatch):
+    _refuse_first(fake_openai, monkeypatch, 5)
+    gw = _gateway(fake_openai, chat=EndpointPolicy(timeout=5.0, max_retries=1, backoff_base=0.01))
+    with pytest.raises(openai.RateLimitError):
+        gw.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+    assert fake_openai.requests["chat"] == 2
+
+def test_retry_after_pauses_the_whole_bucket(fake_openai, monkeypatch):
+    monkeypatch.setattr(fake_openai, "retry_after_ms", 400.0)
+    fake_openai.latency_ms["moderations"] = 50
+    arrivals = _refuse_first(fake_openai, monkeypatch, 1)
+    gw = _gateway(fake_openai, moderations=EndpointPolicy(timeout=5.0, rpm=6000, backoff_base=0.01))
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(gw.moderations.create, model="omni-moderation-latest", input="first")
+        time.sleep(0.1)  # the 429 has arrived and paused the bucket
+        second = pool.submit(gw.moderations.create, model="omni-moderation-latest", input="second")
+        first.result(), second.result()
+    refused_at = arrivals[0]
+    # neither the retry nor the other caller's request is sent before Retry-After has passed
+    assert len(arrivals) == 3
+    assert min(arrivals[1:]) - refused_at >= 0.35
+
+def test_identical_concurrent_requests_share_one_call(fake_openai):
+    fake_openai.latency_ms.update(embeddings=200, moderations=200)
+    gw = _gateway(fake_openai)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        embeds = [pool.submit(gw.embeddings.create, model="text-embedding-3-small", input=["same text"])
+                  for _ in range(8)]
+        mods = [pool.submit(gw.moderations.create, model="omni-moderation-latest", input="same text")
+                for _ in range(8)]
+        vectors = {tuple(f.result().data[0].embedding[:4]) for f in embeds}
+        flagged = {f.result().results[0].flagged for f in mods}
+    assert len(vectors) == 1 and len(flagged) == 1
+    assert fake_openai.requests["embeddings"] == 1
+    assert fake_openai.requests["moderations"] == 1
+    gw.embeddings.create(model="text-embedding-3-small", input=["other text"])
+    assert fake_openai.requests["embeddings"] == 2  # different inputs are never merged
+
+def test_timeouts_are_per_endpoint(fake_openai, monkeypatch):
+    monkeypatch.setattr(fake_openai, "stall", {"moderations": 1.0})
+    monkeypatch.setattr(fake_openai, "stall_ms", 3000.0)
+    gw = _gateway(fake_openai, moderations=EndpointPolicy(timeout=0.3, max_retries=0))
+    t0 = time.monotonic()
+    with pytest.raises(openai.APITimeoutError):
+        gw.moderations.create(model="omni-moderation-latest", input="slow")
+    assert time.monotonic() - t0 < 2.0
+    out = gw.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+    assert out.choices[0].message.content
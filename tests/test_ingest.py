@@ -0,0 +1,77 @@
+# tests/test_ingest.py
+import json
+
+from ingest import ingest
+from lexical import get_lexical_index
+from rag import DATA_MD, bootstrap_index, get_embedding_function, get_or_create_collection, load_manifest, manifest_path
+from tools import get_summary_store
+
+def _md(*titles: str) -> str:
+    return "\n".join(f"## Title: {t}\nA story about {t.lower()}, friendship and courage.\n" for t in titles)
+
+def _ids():
+    col_ids = set(get_or_create_collection().get(include=[])["ids"])
+    return col_ids, set(get_summary_store().ids()), set(get_lexical_index().ids())
+
+def test_other_sources_survive_a_catalog_sync(tmp_path):
+    bootstrap_index()
+    extra = tmp_path / "extra.jsonl"
+    extra.write_text(json.dumps({"title": "The Lighthouse Keeper", "summary": "A keeper and the sea."}) + "\n")
+    ingest([extra])
+    before = bootstrap_index()  # what every app start does
+    assert bootstrap_index() == before
+    for ids in _ids():
+        assert "the-lighthouse-keeper" in ids
+    assert load_manifest()["sources"]["the-lighthouse-keeper"].endswith("extra.jsonl")
+
+def test_books_removed_from_their_source_are_deleted(tmp_path):
+    shelf = tmp_path / "shelf.md"
+    shelf.write_text(_md("Alpha Tide", "Beta Tide"))
+    ingest([shelf])
+    shelf.write_text(_md("Alpha Tide"))
+    stats = ingest([shelf])
+    assert stats.deleted == 1
+    for ids in _ids():
+        assert "alpha-tide" in ids and "beta-tide" not in ids
+        assert "1984" in ids  # the main catalog is untouched
+
+def _count_embedded(monkeypatch):
+    texts = []
+    emb_fn = get_embedding_function()
+
+    def counting(batch):
+        texts.extend(batch)
+        return emb_fn(batch)
+    monkeypatch.setattr("ingest.get_embedding_function", lambda: counting)
+    return texts
+
+def test_unchanged_catalog_embeds_nothing(monkeypatch):
+    books = bootstrap_index()
+    manifest = load_manifest()
+    embedded = _count_embedded(monkeypatch)
+    assert bootstrap_index() == books
+    assert embedded == []
+    assert load_manifest()["version"] == manifest["version"]
+    # a lost manifest is rebuilt from what the collection stores, still without embedding
+    manifest_path().unlink()
+    assert bootstrap_index() == books
+    assert embedded == []
+    assert load_manifest()["records"] == manifest["records"]
+
+def test_edited_book_is_the_only_one_embedded(monkeypatch):
+    books = bootstrap_index()
+    manifest = load_manifest()
+    original = DATA_MD.read_text(encoding="utf-8")
+    embedded = _count_embedded(monkeypatch)
+    try:
+        DATA_MD.write_text(original.replace("Winston Smith secretly resists", "Winston Smith quietly resists", 1),
+                           encoding="utf-8")
+        assert bootstrap_index() == books
+        assert len(embedded) == 1 and "quietly resists" in embedded[0]
+        edited = load_manifest()
+        assert edited["version"] != manifest["version"]
+        assert {rid for rid in manifest["records"] if edited["records"][rid] != manifest["records"][rid]} == {"1984"}
+    finally:
+        DATA_MD.write_text(original, encoding="utf-8")
+        bootstrap_index()
+    assert load_manifest()["version"] == manifest["version"]
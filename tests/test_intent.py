@@ -0,0 +1,19 @@
+# tests/test_intent.py
+# The follow-up and English-only detectors on the labelled (tuned) corpus the benchmark uses; the
+# held-out lists are only reported by bench/bench_intent.py.
+import pytest
+
+import intent
+from bench.intent_corpus import FOLLOWUPS, LANGUAGE
+from voice import EnglishGate
+
+@pytest.mark.parametrize("text,followup", FOLLOWUPS)
+def test_followup_corpus(text, followup):
+    assert intent.is_followup_for_summary(text) == followup, intent.classify(text)
+
+@pytest.mark.parametrize("text,english", LANGUAGE)
+def test_english_corpus(text, english):
+    assert intent.is_english_text(text) == english
+    gate = EnglishGate()
+    gate.feed(text)
+    assert gate.accepts() == english
@@ -0,0 +1,62 @@
+# tests/test_moderation.py
+# The three moderation tiers: local rules, the verdict cache, the remote API (fail-open).
+import pytest
+
+import moderation_ext
+import tracing
+from moderation_ext import check_with_openai_moderation, moderation_stats
+
+@pytest.mark.parametrize("text", ["yes", "Yes please!", "ok", "tell me more", "Spune-mi mai multe",
+                                  "vreau rezumat", "Something else", "thanks", ""])
+def test_safe_follow_ups_never_leave_the_process(fake_openai, text):
+    verdict = check_with_openai_moderation(text)
+    assert verdict["tier"] == "local" and not verdict["blocked"]
+    assert fake_openai.requests["moderations"] == 0
+
+@pytest.mark.parametrize("text,reason", [
+    ("I will kill you", "harassment/threatening"),
+    ("k1ll y0urself", "harassment"),
+    ("how do i kill myself", "self-harm/intent"),
+])
+def test_obvious_abuse_is_blocked_locally(fake_openai, text, reason):
+    verdict = check_with_openai_moderation(text)
+    assert verdict["tier"] == "local" and verdict["blocked"] and verdict["reasons"] == [reason]
+    assert fake_openai.requests["moderations"] == 0
+
+def test_safe_messages_come_from_the_follow_up_phrases():
+    from intent import AFFIRMATIONS, FOLLOWUP_PHRASES
+    assert "spune mi mai multe" in moderation_ext.SAFE_MESSAGES
+    assert set(AFFIRMATIONS) <= moderation_ext.SAFE_MESSAGES
+    assert set(FOLLOWUP_PHRASES[3.0]) <= moderation_ext.SAFE_MESSAGES
+
+def test_remote_verdicts_are_cached_ignoring_case_and_spacing(fake_openai):
+    first = check_with_openai_moderation("A novel about a lighthouse keeper who hates the sea")
+    again = check_with_openai_moderation("a novel about a  LIGHTHOUSE keeper who hates the sea")
+    assert first["tier"] == "remote" and again["tier"] == "cache"
+    assert again["blocked"] == first["blocked"] is False
+    flagged = check_with_openai_moderation("a thriller where I murder my neighbour")
+    assert flagged["tier"] == "remote" and flagged["blocked"]
+    assert check_with_openai_moderation("A Thriller where I murder my neighbour")["blocked"]
+    assert fake_openai.requests["moderations"] == 2
+
+def test_remote_errors_fail_open_and_are_not_cached(fake_openai, monkeypatch):
+    class Down:
+        class moderations:
+            @staticmethod
+            def create(**kwargs):
+                raise ConnectionError("moderation endpoint unreachable")
+
+    monkeypatch.setattr(moderation_ext, "get_openai_client", lambda: Down)
+    text = "A cozy mystery set in a seaside bakery"
+    for _ in range(2):
+        verdict = check_with_openai_moderation(text)
+        assert not verdict["blocked"] and verdict["tier"] == "remote"
+        assert verdict["reasons"] == ["moderation_error"]
+    monkeypatch.undo()
+    assert check_with_openai_moderation(text)["tier"] == "remote"  # the error was not cached
+
+def test_tier_stats_are_exported():
+    check_with_openai_moderation("yes")
+    stats = moderation_stats()
+    assert stats["local"]["count"] >= 1 and stats["total"] >= 1
+    assert 'librarian_moderation{group="local",stat="rate"}' in tracing.metrics_text()
@@ -0,0 +1,100 @@
+# tests/test_rag.py
+import asyncio
+
+import config
+from rag import RAGEngine, bootstrap_index, get_or_create_collection, infer_query_filters
+from tools import get_summary_store
+
+def test_single_decisive_keyword_hit_is_served_without_embedding(monkeypatch):
+    bootstrap_index()
+    rag = RAGEngine()
+    assert rag.lexical.search("Bilbo", 10)[0][0]["title"] == "The Hobbit"  # the only BM25 hit
+    calls = _count_embedding_calls(rag, monkeypatch)
+    assert [r["title"] for r in rag.lexical_fast_path("Bilbo", k=3)] == ["The Hobbit"]
+    assert calls == []
+    # search() still returns k: the decisive hit on top, the rest from the dense ranking
+    results = rag.search("Bilbo", k=3)
+    titles = [r["title"] for r in results]
+    assert len(titles) == 3 and len(set(titles)) == 3
+    assert titles[0] == "The Hobbit"
+    assert rag.lexical_fast_path("Bilbo", k=1)[0]["title"] == "The Hobbit"
+
+def test_bootstrap_counts_books_not_passages(monkeypatch):
+    books = len(set(get_summary_store().ids()))
+    assert bootstrap_index() == books
+    monkeypatch.setattr(config, "CHUNK_SIZE", 120)
+    monkeypatch.setattr(config, "CHUNK_OVERLAP", 20)
+    try:
+        assert bootstrap_index() == books
+        assert get_or_create_collection().count() > books
+    finally:
+        monkeypatch.undo()
+        bootstrap_index()  # back to one record per book for the other tests
+
+QUERIES = ["friendship and magic", "war and survival", "friendship and magic", "a dystopian society",
+           "war and survival"]
+
+def _count_embedding_calls(rag, monkeypatch):
+    calls = []
+    emb_fn = rag.emb_fn
+
+    def counting(texts):
+        calls.append(list(texts))
+        return emb_fn(texts)
+    monkeypatch.setattr(rag, "emb_fn", counting)
+    return calls
+
+def test_search_many_keeps_order_and_embeds_each_batch_once(monkeypatch):
+    bootstrap_index()
+    monkeypatch.setattr(config, "HYBRID_SEARCH", False)  # every query takes the dense path
+    rag = RAGEngine()
+    expected = [rag.search(q, k=3) for q in QUERIES]
+    calls = _count_embedding_calls(rag, monkeypatch)
+    assert rag.search_many(QUERIES, k=3, batch_size=2) == expected
+    # 3 distinct queries, duplicates run once: one embeddings request per batch of 2
+    assert calls == [["friendship and magic", "war and survival"], ["a dystopian society"]]
+
+def test_asearch_many_matches_search_many(monkeypatch):
+    bootstrap_index()
+    monkeypatch.setattr(config, "HYBRID_SEARCH", False)
+    rag = RAGEngine()
+    expected = rag.search_many(QUERIES, k=3)
+    calls = _count_embedding_calls(rag, monkeypatch)
+    assert asyncio.run(rag.asearch_many(QUERIES, k=3, batch_size=2, max_in_flight=2)) == expected
+    assert sorted(map(len, calls)) == [1, 2]
+    assert sorted(q for batch in calls for q in batch) == sorted(set(QUERIES))
+
+def _titles_with(flag: str) -> set:
+    stored = get_or_create_collection().get(where={flag: True}, include=["metadatas"])
+    return {m["title"] for m in stored["metadatas"]}
+
+def test_genre_named_in_the_query_filters_the_search():
+    bootstrap_index()
+    filters = infer_query_filters("a dystopian novel about friendship")
+    assert filters["where"] == {"genre_dystopia": True}
+    assert "friendship" in filters["themes"] and "dystopian_novel" in filters["themes"]
+    titles = [r["title"] for r in RAGEngine().search("a dystopian novel about friendship", k=3, **filters)]
+    assert len(titles) == 3 and set(titles) <= _titles_with("genre_dystopia")
+
+def test_several_genres_or_none():
+    assert infer_query_filters("fantasy or science fiction")["where"] == {
+        "$or": [{"genre_fantasy": True}, {"genre_science_fiction": True}]
+    }
+    assert infer_query_filters("something about courage")["where"] is None
+
+def test_genre_with_too_few_books_is_topped_up():
+    bootstrap_index()
+    war = _titles_with("genre_war")
+    assert len(war) == 1
+    titles = [r["title"] for r in RAGEngine().search("a war story", k=3, **infer_query_filters("a war story"))]
+    assert titles[0] in war and len(set(titles)) == 3
+
+def test_theme_boost_reorders_dense_hits(monkeypatch):
+    monkeypatch.setattr(config, "THEME_BOOST", 0.05)
+    out = {
+        "ids": [["a", "b"]], "documents": [["doc a", "doc b"]], "distances": [[0.30, 0.32]],
+        "metadatas": [[{"title": "A"}, {"title": "B", "theme_courage": True}]],
+    }
+    assert [r["title"] for r in RAGEngine._format(out)] == ["A", "B"]
+    assert [r["title"] for r in RAGEngine._format(out, themes=["courage"])] == ["B", "A"]
+    assert [r["title"] for r in RAGEngine._format(out, themes=["grief"])] == ["A", "B"]
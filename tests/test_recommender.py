@@ -0,0 +1,77 @@
+# tests/test_recommender.py
+import json
+
+import pytest
+
+import config
+import recommender
+import tracing
+from recommender import RECO_MODES, prepare_recommendation, recommend, retrieve
+from resources import ensure_index, get_rag_engine
+from tools import find_summary
+
+@pytest.fixture(scope="module", autouse=True)
+def index() -> None:
+    ensure_index()
+
+def test_two_call_tool_message_holds_the_summary(fake_openai):
+    result = recommend("I want a book about freedom and social control.", mode="two_call", use_precomputed=False)
+    assert result["source"] == "pipeline" and result["title"]
+    _, summary = find_summary(result["title"])
+    # the stand-in's final answer quotes the last tool message verbatim
+    assert summary in result["final_text"]
+    assert "Error:" not in result["final_text"]
+
+def test_two_call_prepared_messages(fake_openai):
+    prepared = prepare_recommendation("I want friendship and magic.", "two_call")
+    tool = [m for m in prepared["messages"] if m["role"] == "tool"]
+    assert len(tool) == 1
+    assert tool[0]["content"] == find_summary(prepared["title"])[1]
+
+@pytest.mark.parametrize("mode", RECO_MODES)
+def test_card_contains_the_summary(fake_openai, mode):
+    result = recommend("What do you recommend if I love fantasy adventures?", mode=mode, use_precomputed=False)
+    assert find_summary(result["title"])[1] in result["final_text"]
+
+def test_retrieve_embeds_the_query_once(monkeypatch):
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_ENABLED", True)
+    engine = get_rag_engine()
+    calls = []
+
+    def counting(texts):
+        calls.append(list(texts))
+        return emb_fn(texts)
+
+    emb_fn = engine.emb_fn
+    monkeypatch.setattr(engine, "emb_fn", counting)
+    out = retrieve("a quiet story about grief and second chances")
+    assert out["hit"] is None and out["candidates"]
+    assert calls == [["a quiet story about grief and second chances"]]  # semantic lookup; the search reuses it
+
+def test_retrieve_serves_a_single_decisive_hit_without_embedding(monkeypatch):
+    engine = get_rag_engine()
+    monkeypatch.setattr(engine, "emb_fn", lambda texts: pytest.fail(f"embedded {texts}"))
+    out = retrieve("Bilbo")
+    assert out["embedding"] is None
+    assert [c["title"] for c in out["candidates"]] == ["The Hobbit"]
+
+def test_precomputed_answers_are_moderated(monkeypatch):
+    row = {"title": "1984", "final_text": "warmed", "mode": "two_call", "candidates": ["1984"]}
+    monkeypatch.setattr(recommender, "precomputed_answer", lambda query, exclude=None: row)
+    monkeypatch.setattr(recommender, "check_with_openai_moderation",
+                        lambda text: {"blocked": "kill" in text, "reasons": []})
+    assert recommend("books where they kill everyone")["blocked"]
+    assert recommend("books about surveillance")["source"] == "precomputed"
+
+def test_traced_two_call_turn(fake_openai, monkeypatch, tmp_path):
+    log = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(config, "TRACE_LOG", str(log))
+    with tracing.trace("turn", input="text") as turn:
+        result = recommend("I want a book about freedom and social control.", mode="two_call", use_precomputed=False)
+    assert find_summary(result["title"])[1] in result["final_text"]
+    tools = [s for s in turn.spans if s["name"] == "tool"]
+    assert [s["attrs"] for s in tools] == [{"tool": "get_summary_by_title"}]
+    assert not any("error" in s for s in turn.spans)
+    assert {"moderation", "retrieval", "completion.choose", "completion.final", "openai.chat"} <= {s["name"] for s in turn.spans}
+    logged = json.loads(log.read_text(encoding="utf-8").splitlines()[-1])
+    assert logged["trace_id"] == turn.trace_id and logged["usage"]["completion_tokens"] > 0
@@ -0,0 +1,41 @@
+# tests/test_resources.py
+# The shared resources follow the index manifest, not just the source markdown: books ingested
+# from another source (in this process or another one) are served without a restart.
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import config
+from ingest import ingest
+from resources import ensure_index, get_rag_engine, get_title_index, index_version
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def _jsonl(path: Path, title: str, summary: str) -> Path:
+    path.write_text(json.dumps({"title": title, "summary": summary}) + "\n", encoding="utf-8")
+    return path
+
+def test_ingest_in_process_is_picked_up(tmp_path):
+    books, version = ensure_index(), index_version()
+    assert get_title_index().resolve("The Glass Orchard") is None
+    ingest([_jsonl(tmp_path / "orchard.jsonl", "The Glass Orchard", "An orchard of glass trees.")])
+    assert index_version() != version
+    assert ensure_index() == books + 1
+    assert get_title_index().resolve("the glass orchard") == "The Glass Orchard"
+
+def test_ingest_from_another_process_is_picked_up(tmp_path, monkeypatch):
+    books, version = ensure_index(), index_version()
+    engine = get_rag_engine()
+    src = _jsonl(tmp_path / "comet.jsonl", "Quillon's Comet",
+                 "Astronomer Quillon tracks a comet that returns every nine hundred years.")
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    subprocess.run([sys.executable, str(ROOT / "ingest.py"), str(src)], check=True, env=env, capture_output=True)
+    assert index_version() != version
+    assert ensure_index() == books + 1
+    assert get_rag_engine() is not engine
+    assert get_title_index().resolve("Quillons Comet") == "Quillon's Comet"
+    monkeypatch.setattr(config, "HYBRID_SEARCH", False)  # the vector store itself must see the new book
+    titles = [r["title"] for r in get_rag_engine().search("a comet that returns every nine hundred years", k=3)]
+    assert "Quillon's Comet" in titles
@@ -0,0 +1,30 @@
+# tests/test_semantic_cache.py
+import json
+
+import config
+import tracing
+from ingest import ingest
+from recommender import semantic_lookup, semantic_store
+from resources import ensure_index, get_semantic_cache
+
+QUERY = "a gentle story about a lighthouse and the people it keeps safe"
+
+def test_ingesting_another_source_retires_cached_answers(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SEMANTIC_CACHE_ENABLED", True)
+    ensure_index()
+    hit, embedding = semantic_lookup(QUERY)
+    assert hit is None
+    semantic_store(QUERY, embedding, {"final_text": "Try 1984.", "title": "1984"})
+    assert semantic_lookup(QUERY)[0]["title"] == "1984"
+
+    src = tmp_path / "harbour.jsonl"
+    src.write_text(json.dumps({"title": "Harbour Lights", "summary": "A keeper and his lamp."}) + "\n")
+    ingest([src])
+    assert semantic_lookup(QUERY)[0] is None  # new catalog version: the cached answer may be outdated
+    assert get_semantic_cache().stats()["invalidations"] >= 1
+
+def test_semantic_cache_stats_are_exported():
+    get_semantic_cache()
+    text = tracing.metrics_text()
+    assert 'librarian_semantic_cache{stat="hit_rate"}' in text
+    assert "semantic_cache" in tracing.gauges()
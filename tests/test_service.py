@@ -0,0 +1,71 @@
+# tests/test_service.py
+# The service's Limiter: SERVICE_MAX_CONCURRENCY running, SERVICE_MAX_QUEUE waiting, 503 beyond that,
+# 504 once a request's deadline passes (while queued or while running).
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from service import HTTPError, Limiter
+
+def _blocked(gate: threading.Event, result: str = "done"):
+    def work() -> str:
+        gate.wait(5)
+        return result
+    return work
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0.01)
+
+def test_full_queue_is_refused_with_503():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        limiter = Limiter(limit=1, max_queue=1, pool=ThreadPoolExecutor(2))
+        gate = threading.Event()
+        deadline = loop.time() + 5
+        running = asyncio.ensure_future(limiter.run(_blocked(gate, "first"), deadline=deadline))
+        queued = asyncio.ensure_future(limiter.run(_blocked(gate, "second"), deadline=deadline))
+        await _settle()
+        assert (limiter.active, limiter.waiting) == (1, 1)
+        with pytest.raises(HTTPError) as refused:
+            await limiter.run(_blocked(gate), deadline=deadline)
+        assert refused.value.status == 503 and refused.value.headers == {"Retry-After": "1"}
+        gate.set()
+        assert await asyncio.gather(running, queued) == ["first", "second"]
+        assert (limiter.active, limiter.waiting) == (0, 0)
+    asyncio.run(scenario())
+
+def test_deadline_while_queued_is_504():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        limiter = Limiter(limit=1, max_queue=4, pool=ThreadPoolExecutor(2))
+        gate = threading.Event()
+        running = asyncio.ensure_future(limiter.run(_blocked(gate), deadline=loop.time() + 5))
+        await _settle()
+        with pytest.raises(HTTPError) as timed_out:
+            await limiter.run(_blocked(gate), deadline=loop.time() + 0.05)
+        assert timed_out.value.status == 504 and "waiting" in str(timed_out.value)
+        assert limiter.waiting == 0
+        gate.set()
+        assert await running == "done"
+    asyncio.run(scenario())
+
+def test_deadline_while_running_is_504_and_keeps_the_slot():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        limiter = Limiter(limit=1, max_queue=4, pool=ThreadPoolExecutor(2))
+        gate = threading.Event()
+        with pytest.raises(HTTPError) as timed_out:
+            await limiter.run(_blocked(gate), deadline=loop.time() + 0.05)
+        assert timed_out.value.status == 504 and str(timed_out.value) == "request timed out"
+        # the worker is still busy: its slot is not handed out until it finishes
+        assert limiter.active == 1
+        follower = asyncio.ensure_future(limiter.run(lambda: "next", deadline=loop.time() + 5))
+        await _settle()
+        assert not follower.done()
+        gate.set()
+        assert await follower == "next"
+        assert limiter.active == 0
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+# tests/test_title_index.py
+import pytest
+
+import title_index
+from title_index import TitleIndex, title_norm
+
+CATALOG = ["The Hobbit", "Harry Potter and the Sorcerer's Stone", "Fahrenheit 451", "Dune: Book One",
+           "Dune Messiah", "1984", "The Name of the Wind"]
+
+@pytest.fixture
+def index() -> TitleIndex:
+    return TitleIndex(CATALOG)
+
+def test_title_norm():
+    assert title_norm("The Hobbit!") == "hobbit"
+    assert title_norm("  A   Tale of Two Cities ") == "tale of two cities"
+
+@pytest.mark.parametrize("noisy,title", [
+    ("the hobbit", "The Hobbit"),
+    ("HOBBIT", "The Hobbit"),
+    ("the hobit", "The Hobbit"),
+    ("Fahrenhiet 451", "Fahrenheit 451"),
+    ("Dune", "Dune: Book One"),  # the main title before a subtitle
+    ("dune messiah", "Dune Messiah"),
+    ("harry potter", "Harry Potter and the Sorcerer's Stone"),  # short mention of a long title
+    ("name of the wnid", "The Name of the Wind"),
+])
+def test_resolve_noisy_titles(index, noisy, title):
+    assert index.resolve(noisy) == title
+
+@pytest.mark.parametrize("noisy", ["", "!!!", "a cookbook for beginners"])
+def test_resolve_unknown_is_none(index, noisy):
+    assert index.resolve(noisy) is None
+
+def test_min_score(index):
+    assert index.resolve("the hobit", min_score=0.99) is None
+    assert index.resolve("the hobit", min_score=0.5) == "The Hobbit"
+
+def test_candidates_restrict_the_pool(index):
+    assert index.resolve("the hobit", candidates=["1984", "Dune Messiah"]) is None
+    assert index.resolve("hobit", candidates=["the hobbit", "1984"]) == "The Hobbit"
+    # an exact hit outside the candidates is not returned
+    assert index.resolve("1984", candidates=["The Hobbit"]) is None
+    assert index.resolve("1984", candidates=["Not In The Catalog"]) is None
+
+def test_common_trigrams_still_generate_candidates(index, monkeypatch):
+    monkeypatch.setattr(title_index, "RARE_GRAM_MAX_DF", 0)  # every trigram counts as common
+    assert index.resolve("the hobit") == "The Hobbit"
+
+def test_find_in_text(index):
+    assert index.find_in_text("Tell me more about The Hobbit, please") == "The Hobbit"
+    assert index.find_in_text("I loved Dune Messiah") == "Dune Messiah"  # the longest mention wins
+    assert index.find_in_text("something like dune") == "Dune: Book One"
+    assert index.find_in_text("tell me more") is None
@@ -0,0 +1,65 @@
+# tests/test_transcription.py
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+import transcription
+from transcription import CircuitBreaker, transcribe_audio_bytes
+
+def _error(status: int, message: str, code=None, param=None) -> openai.APIStatusError:
+    response = httpx.Response(status, request=httpx.Request("POST", "http://test/v1/audio/transcriptions"))
+    cls = {400: openai.BadRequestError, 404: openai.NotFoundError}[status]
+    return cls(message, response=response, body={"message": message, "code": code, "param": param})
+
+class StubClient:
+    """audio.transcriptions.create: raises fail(model, params) if it returns an error, else echoes the model."""
+
+    def __init__(self, fail):
+        self.calls = []
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self.create))
+        self._fail = fail
+
+    def create(self, model, file, **params):
+        self.calls.append((model, params))
+        error = self._fail(model, params)
+        if error is not None:
+            raise error
+        return SimpleNamespace(text=f"heard by {model}")
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(transcription, "_breaker", CircuitBreaker(ttl_seconds=600))
+
+    def install(fail) -> StubClient:
+        client = StubClient(fail)
+        monkeypatch.setattr(transcription, "get_openai_client", lambda: client)
+        return client
+
+    return install
+
+def test_bad_recording_fails_only_that_request(stub):
+    client = stub(lambda model, params: _error(400, "Audio file is too short. Minimum audio length is 0.1 seconds."))
+    with pytest.raises(openai.BadRequestError):
+        transcribe_audio_bytes(b"short", prefer_model="gpt-4o-transcribe")
+    assert len(client.calls) == 1
+    assert transcription._breaker.open_keys() == []
+    # the next user still gets the preferred model with the language hint
+    stub(lambda model, params: None)
+    assert transcribe_audio_bytes(b"fine", prefer_model="gpt-4o-transcribe") == "heard by gpt-4o-transcribe"
+
+def test_unknown_model_opens_its_steps(stub):
+    client = stub(lambda model, params: _error(404, "model not found", code="model_not_found")
+                  if model == "gpt-4o-transcribe" else None)
+    assert transcribe_audio_bytes(b"x", prefer_model="gpt-4o-transcribe") == "heard by whisper-1"
+    assert sorted(transcription._breaker.open_keys()) == ["gpt-4o-transcribe", "gpt-4o-transcribe|language=en"]
+    client.calls.clear()
+    transcribe_audio_bytes(b"x", prefer_model="gpt-4o-transcribe")
+    assert client.calls == [("whisper-1", {"language": "en"})]
+
+def test_rejected_parameter_opens_only_that_step(stub):
+    stub(lambda model, params: _error(400, "Unsupported parameter: 'language'", param="language")
+         if "language" in params else None)
+    assert transcribe_audio_bytes(b"x", prefer_model="gpt-4o-transcribe") == "heard by gpt-4o-transcribe"
+    assert transcription._breaker.open_keys() == ["gpt-4o-transcribe|language=en"]
@@ -0,0 +1,73 @@
+# tests/test_vector_store.py
+import numpy as np
+import pytest
+
+from local_backends import NumpyVectorStore
+
+def _unit(i: int, dim: int = 8) -> list:
+    v = np.zeros(dim, dtype=np.float32)
+    v[i % dim] = 1.0
+    return v.tolist()
+
+@pytest.fixture
+def store(tmp_path) -> NumpyVectorStore:
+    s = NumpyVectorStore(tmp_path / "vectors")
+    s.upsert(["a", "b", "c"], documents=["doc a", "doc b", "doc c"],
+             metadatas=[{"title": "A", "genre_war": True}, {"title": "B"}, {"title": "C", "genre_war": True}],
+             embeddings=[_unit(0), _unit(1), _unit(2)])
+    return s
+
+def test_query_nearest_first(store):
+    out = store.query(query_embeddings=[_unit(1), [0.0] * 7 + [1.0]], n_results=2)
+    assert out["ids"][0][0] == "b" and out["documents"][0][0] == "doc b"
+    assert out["distances"][0][0] == pytest.approx(0.0, abs=1e-6)
+    assert out["distances"][1] == pytest.approx([2.0, 2.0])  # orthogonal
+    filtered = store.query(query_embeddings=[_unit(2)], n_results=5, where={"genre_war": True})
+    assert filtered["ids"] == [["c", "a"]]
+
+def test_upsert_replaces_in_place(store):
+    slot = store._slots["b"]
+    store.upsert(["b"], documents=["doc b2"], metadatas=[{"title": "B2"}], embeddings=[_unit(5)])
+    assert store.count() == 3 and store._slots["b"] == slot
+    out = store.query(query_embeddings=[_unit(5)], n_results=1)
+    assert out["ids"] == [["b"]] and out["documents"] == [["doc b2"]] and out["metadatas"] == [[{"title": "B2"}]]
+
+def test_delete_frees_the_slot_for_reuse(store):
+    slot = store._slots["b"]
+    size = (store.path / "vectors.f32").stat().st_size
+    store.delete(["b"])
+    assert store.count() == 2
+    assert store.get(ids=["b"])["ids"] == []
+    assert "b" not in store.query(query_embeddings=[_unit(1)], n_results=3)["ids"][0]
+    store.upsert(["d"], documents=["doc d"], embeddings=[_unit(3)])
+    assert store._slots["d"] == slot
+    assert (store.path / "vectors.f32").stat().st_size == size
+    assert store.query(query_embeddings=[_unit(3)], n_results=1)["ids"] == [["d"]]
+
+def test_delete_where(store):
+    store.delete(where={"genre_war": True})
+    assert store.get()["ids"] == ["b"]
+
+def test_reopen_keeps_rows_and_free_slots(store):
+    slot = store._slots["a"]
+    store.delete(["a"])
+    reopened = NumpyVectorStore(store.path)
+    assert reopened.count() == 2 and reopened.dim == 8
+    assert reopened.get(ids=["c"], include=["documents", "metadatas"]) == {
+        "ids": ["c"], "documents": ["doc c"], "metadatas": [{"title": "C", "genre_war": True}]
+    }
+    reopened.upsert(["e"], embeddings=[_unit(4)])
+    assert reopened._slots["e"] == slot
+    assert reopened.query(query_embeddings=[_unit(2)], n_results=1)["ids"] == [["c"]]
+
+def test_grows_past_the_initial_capacity(tmp_path):
+    s = NumpyVectorStore(tmp_path / "vectors")
+    ids = [f"r{i}" for i in range(100)]
+    vecs = np.random.default_rng(0).normal(size=(100, 16)).astype(np.float32)
+    s.upsert(ids, embeddings=vecs)
+    assert s.count() == 100 and s._matrix.shape[0] == 128
+    assert s.query(query_embeddings=[vecs[77]], n_results=1)["ids"] == [["r77"]]
+
+def test_dimension_mismatch(store):
+    with pytest.raises(ValueError):
+        store.upsert(["x"], embeddings=[[1.0, 0.0]])
@@ -0,0 +1,62 @@
+# tests/test_voice.py
+# Speculation on partial transcripts is debounced and capped: a long utterance streamed word by
+# word must not start moderation/retrieval once per partial.
+import io
+import threading
+import wave
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import config
+import voice
+
+UTTERANCE = ("I would like a long fantasy novel about a young girl who travels across the sea "
+             "to find her lost brother again.")
+
+def _wav(seconds: float = 1.0, rate: int = 16000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buf.getvalue()
+
+def _listen(fake_openai, monkeypatch, per_word_ms: float, debounce_ms: float):
+    monkeypatch.setattr(fake_openai, "transcript", UTTERANCE)
+    monkeypatch.setattr(config, "VOICE_STREAMING", True)
+    monkeypatch.setattr(config, "VOICE_SPECULATE_DEBOUNCE_MS", debounce_ms)
+    fake_openai.latency_ms["transcriptions"] = per_word_ms * len(UTTERANCE.split())
+    calls, lock = Counter(), threading.Lock()
+
+    def counting(name):
+        def fn(text):
+            with lock:
+                calls[name] += 1
+            return text
+        return fn
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        heard = voice.listen(_wav(), {"moderation": counting("moderation"), "retrieval": counting("retrieval")}, executor)
+        results = {name: f.result() for name, f in heard["futures"].items()}
+    return heard, results, calls
+
+def test_fast_speech_speculates_once_on_the_finished_sentence(fake_openai, monkeypatch):
+    heard, results, calls = _listen(fake_openai, monkeypatch, per_word_ms=15, debounce_ms=300)
+    assert heard["text"] == UTTERANCE
+    assert results == {"moderation": UTTERANCE, "retrieval": UTTERANCE}
+    # 20 partials, no pause: the only run starts on the final "." and is confirmed by the final text
+    assert calls == {"moderation": 1, "retrieval": 1}
+    assert heard["speculation"] == {"moderation": "confirmed", "retrieval": "confirmed"}
+
+@pytest.mark.parametrize("max_runs", [1, 2])
+def test_pauses_never_exceed_the_run_cap(fake_openai, monkeypatch, max_runs):
+    monkeypatch.setattr(config, "VOICE_SPECULATE_MAX_RUNS", max_runs)
+    # every word arrives after a "pause" longer than the debounce
+    heard, results, calls = _listen(fake_openai, monkeypatch, per_word_ms=60, debounce_ms=20)
+    assert results["retrieval"] == UTTERANCE
+    # at most max_runs speculative runs plus one recompute on the final text
+    assert 1 <= calls["moderation"] <= max_runs + 1
+    assert 1 <= calls["retrieval"] <= max_runs + 1
@@ -0,0 +1,25 @@
+# textnorm.py
+# Shared text normalization (local moderation rules, cache keys)
+import re
+import unicodedata
+
+LEET_MAP = str.maketrans({"@":"a","$":"s","0":"o","1":"i","!":"i","3":"e","7":"t","4":"a","5":"s","8":"b"})
+
+def strip_diacritics(text: str) -> str:
+    nfkd = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in nfkd if not unicodedata.combining(ch))
+
+def normalize(text: str) -> str:
+    """Lowercase, strip diacritics, undo common leetspeak, collapse whitespace."""
+    t = text.lower()
+    t = strip_diacritics(t)
+    t = t.translate(LEET_MAP)
+    t = re.sub(r"\s+", " ", t).strip()
+    return t
+
+def query_key(text: str) -> str:
+    """Lowercase, strip diacritics and punctuation, collapse whitespace (no leetspeak mapping):
+    requests that differ only in case/punctuation share a key."""
+    t = strip_diacritics(text.lower())
+    t = re.sub(r"[^\w\s]", "", t)
+    return re.sub(r"\s+", " ", t).strip()
@@ -0,0 +1,107 @@
+# title_index.py
+# Fuzzy title resolver: maps noisy titles ("the hobit", "HARRY POTTER", "Dune: Book One")
+# to catalog entries. Built once per catalog version from the summary store:
+# normalized-key map for exact hits + character-trigram postings for everything else.
+import heapq
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from tools import title_key
+
+_ARTICLES = re.compile(r"^(the|a|an)\s+")
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SUBTITLE = re.compile(r"\s*(?::|\(|\s[-–—]\s)")
+# longest title (in words) considered when scanning free text for a mention
+MAX_TITLE_WORDS = 8
+# trigrams found in more titles than this are not used to generate fuzzy candidates
+RARE_GRAM_MAX_DF = 2000
+SHORTLIST = 32
+
+def title_norm(title: str) -> str:
+    """title_key + punctuation dropped + leading article dropped: 'The Hobbit!' -> 'hobbit'."""
+    t = _NON_WORD.sub(" ", title_key(title))
+    t = " ".join(t.split())
+    return _ARTICLES.sub("", t)
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TitleIndex:
+    def __init__(self, titles: Iterable[str]):
+        self.titles: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for title in titles:
+            idx = len(self.titles)
+            self.titles.append(title)
+            key = title_norm(title)
+            self._exact.setdefault(key, idx)
+            # "Dune: Book One" is also reachable as "dune"
+            main = title_norm(_SUBTITLE.split(title, maxsplit=1)[0])
+            if main:
+                self._exact.setdefault(main, idx)
+            for g in _trigrams(key):
+                self._postings[g].append(idx)
+        self._postings = dict(self._postings)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def resolve(self, title: str, candidates: Optional[Iterable[str]] = None, min_score: float = 0.6) -> Optional[str]:
+        """
+        Best catalog title for a noisy one, or None below `min_score`.
+        With `candidates` (e.g. the retrieved books) only those titles are considered.
+        """
+        key = title_norm(title)
+        if not key:
+            return None
+        pool: Optional[Set[int]] = None
+        if candidates is not None:
+            pool = {self._exact[k] for k in (title_norm(c) for c in candidates) if k in self._exact}
+            if not pool:
+                return None
+
+        idx = self._exact.get(key)
+        if idx is not None and (pool is None or idx in pool):
+            return self.titles[idx]
+
+        q = _trigrams(key)
+        if pool is not None:
+            shortlist = list(pool)
+        else:
+            # candidate generation from the rarer trigrams only (common ones match half the
+            # catalog and barely discriminate), then exact scoring of a short list
+            grams = sorted((self._postings.get(g, ()) for g in q), key=len)
+            rare = [p for p in grams if p and len(p) <= RARE_GRAM_MAX_DF] or [p for p in grams[:3] if p]
+            hits: Dict[int, int] = defaultdict(int)
+            for postings in rare:
+                for i in postings:
+                    hits[i] += 1
+            shortlist = heapq.nlargest(SHORTLIST, hits, key=hits.__getitem__)
+
+        # score = mean of Dice and overlap coefficients over character trigrams;
+        # the overlap term lets a short mention ("harry potter") match a long title
+        best, best_score = None, 0.0
+        for i in shortlist:
+            t = _trigrams(title_norm(self.titles[i]))
+            n = len(q & t)
+            if not n:
+                continue
+            score = 0.5 * (2 * n / (len(q) + len(t))) + 0.5 * (n / min(len(q), len(t)))
+            if score > best_score:
+                best, best_score = i, score
+        if best is None or best_score < min_score:
+            return None
+        return self.titles[best]
+
+    def find_in_text(self, text: str) -> Optional[str]:
+        """Exact (normalized) title mentioned anywhere in free text; the longest mention wins."""
+        words = title_norm(text).split()
+        for size in range(min(MAX_TITLE_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                idx = self._exact.get(" ".join(words[start:start + size]))
+                if idx is not None:
+                    return self.titles[idx]
+        return None
@@ -0,0 +1,315 @@
+# tracing.py
+# Lightweight per-turn tracing
+# ----------------------------
+# - begin()/finish() wrap one chat turn in a Trace with a short trace id (held in a contextvar,
+#   so spans opened anywhere below — rag, recommender, moderation — attach to the current turn)
+# - span("stage") times a block; spans are also aggregated into Prometheus-style histograms
+# - record_usage(response) adds the token usage of a chat response to the trace and the counters
+# - count(name, **labels) bumps a labelled counter (the OpenAI gateway's requests/retries/throttling)
+# - register_gauges(name, fn) publishes a component's stats() dict (caches, moderation tiers) as
+#   gauges, read when /metrics or the debug panel asks for them
+# - finished traces go to an in-memory ring (for the debug panel) and, if config.TRACE_LOG is set,
+#   to a JSONL file; metrics_text() renders the Prometheus text format (optionally served on
+#   config.METRICS_PORT)
+# Worker threads do not inherit contextvars: submit work through bind_context(fn).
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+import config
+
+# upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Trace:
+    def __init__(self, name: str, **attrs: Any):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs: Dict[str, Any] = dict(attrs)
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.usage: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._token: Optional[contextvars.Token] = None
+
+    def add_span(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(record)
+
+    def add_usage(self, prompt: int, completion: int) -> None:
+        with self._lock:
+            self.usage["prompt_tokens"] = self.usage.get("prompt_tokens", 0) + prompt
+            self.usage["completion_tokens"] = self.usage.get("completion_tokens", 0) + completion
+
+    def breakdown(self) -> List[Tuple[str, float]]:
+        """Total milliseconds per stage name, in first-seen order."""
+        totals: Dict[str, float] = {}
+        for s in sorted(self.spans, key=lambda s: s["start_ms"]):
+            totals[s["name"]] = totals.get(s["name"], 0.0) + s["duration_ms"]
+        return list(totals.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "attrs": self.attrs,
+            "usage": dict(self.usage),
+            "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+        }
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_recent: "deque[Trace]" = deque(maxlen=50)
+_log_lock = threading.Lock()
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+def begin(name: str = "turn", **attrs: Any) -> Trace:
+    """Start a trace and make it current for this context."""
+    trace = Trace(name, **attrs)
+    trace._token = _current.set(trace)
+    return trace
+
+def finish(trace: Trace, **attrs: Any) -> Trace:
+    """Close the trace: record its duration, export it, and restore the previous context."""
+    trace.attrs.update(attrs)
+    trace.duration_ms = (time.perf_counter() - trace._t0) * 1000
+    try:
+        _current.reset(trace._token)
+    except (ValueError, TypeError):
+        # finished from another context than the one that began it
+        _current.set(None)
+    _metrics.observe(trace.name, trace.duration_ms / 1000, metric="trace")
+    _recent.append(trace)
+    if config.TRACE_LOG:
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with _log_lock:
+            with Path(config.TRACE_LOG).open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    return trace
+
+@contextmanager
+def trace(name: str = "turn", **attrs: Any) -> Iterator[Trace]:
+    t = begin(name, **attrs)
+    try:
+        yield t
+    finally:
+        finish(t)
+
+class _Span:
+    """Handle yielded by span(); set() attaches attributes (e.g. cache tier, result size)."""
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.name = name
+        self.attrs = attrs
+        self.t0 = time.perf_counter()
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[_Span]:
+    handle = _Span(name, dict(attrs))
+    active = _current.get()
+    t0 = handle.t0
+    error = None
+    try:
+        yield handle
+    except GeneratorExit:
+        raise  # a generator closed early by its consumer (e.g. a cut-off stream) is not a failure
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        _metrics.observe(name, elapsed, error=error is not None)
+        if active is not None:
+            record = {
+                "name": name,
+                "start_ms": round((t0 - active._t0) * 1000, 3),
+                "duration_ms": round(elapsed * 1000, 3),
+                "thread": threading.current_thread().name,
+            }
+            if handle.attrs:
+                record["attrs"] = handle.attrs
+            if error:
+                record["error"] = error
+            active.add_span(record)
+
+def record_usage(response: Any, model: Optional[str] = None) -> None:
+    """Token usage of a chat completion (or the final chunk of a stream with include_usage)."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    prompt = int(getattr(usage, "prompt_tokens", 0) or 0)
+    completion = int(getattr(usage, "completion_tokens", 0) or 0)
+    model = model or getattr(response, "model", None) or "unknown"
+    _metrics.count_tokens(model, prompt, completion)
+    active = _current.get()
+    if active is not None:
+        active.add_usage(prompt, completion)
+
+def bind_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Run `fn` (e.g. in a worker thread) inside a copy of the caller's context, so its spans join the trace."""
+    ctx = contextvars.copy_context()
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        return ctx.run(fn, *args, **kwargs)
+
+    return run
+
+def recent_traces() -> List[Trace]:
+    return list(_recent)
+
+def last_trace() -> Optional[Trace]:
+    return _recent[-1] if _recent else None
+
+# -------------------------
+# Prometheus-style metrics
+# -------------------------
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (metric, name) -> [bucket counts..., +Inf count], sum
+        self._hist: Dict[Tuple[str, str], Tuple[List[int], List[float]]] = {}
+        self._errors: Dict[str, int] = {}
+        self._tokens: Dict[Tuple[str, str], int] = {}
+        # (name, ((label, value), ...)) -> total
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def observe(self, name: str, seconds: float, metric: str = "stage", error: bool = False) -> None:
+        with self._lock:
+            counts, total = self._hist.setdefault((metric, name), ([0] * (len(BUCKETS) + 1), [0.0]))
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            total[0] += seconds
+            if error:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    def count_tokens(self, model: str, prompt: int, completion: int) -> None:
+        with self._lock:
+            for kind, n in (("prompt", prompt), ("completion", completion)):
+                self._tokens[(model, kind)] = self._tokens.get((model, kind), 0) + n
+
+    def count(self, name: str, value: float, labels: Dict[str, str]) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for metric, label in (("stage", "stage"), ("trace", "name")):
+                family = f"librarian_{metric}_seconds"
+                rows = [(name, v) for (m, name), v in sorted(self._hist.items()) if m == metric]
+                if not rows:
+                    continue
+                lines.append(f"# TYPE {family} histogram")
+                for name, (counts, total) in rows:
+                    for bound, n in zip(BUCKETS, counts):
+                        lines.append(f'{family}_bucket{{{label}="{name}",le="{bound}"}} {n}')
+                    lines.append(f'{family}_bucket{{{label}="{name}",le="+Inf"}} {counts[-1]}')
+                    lines.append(f'{family}_sum{{{label}="{name}"}} {total[0]:.6f}')
+                    lines.append(f'{family}_count{{{label}="{name}"}} {counts[-1]}')
+            if self._errors:
+                lines.append("# TYPE librarian_stage_errors_total counter")
+                lines.extend(f'librarian_stage_errors_total{{stage="{n}"}} {c}' for n, c in sorted(self._errors.items()))
+            if self._tokens:
+                lines.append("# TYPE librarian_tokens_total counter")
+                lines.extend(
+                    f'librarian_tokens_total{{model="{m}",kind="{k}"}} {c}' for (m, k), c in sorted(self._tokens.items())
+                )
+            family = None
+            for (name, labels), value in sorted(self._counters.items()):
+                if name != family:
+                    family = name
+                    lines.append(f"# TYPE librarian_{name}_total counter")
+                rendered = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"librarian_{name}_total{{{rendered}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+_metrics = Metrics()
+_gauges: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def count(name: str, value: float = 1.0, **labels: str) -> None:
+    """Add `value` to the counter librarian_<name>_total{labels} (e.g. per-endpoint request outcomes)."""
+    _metrics.count(name, value, labels)
+
+def register_gauges(name: str, fn: Callable[[], Dict[str, Any]]) -> None:
+    """Publish fn() — {stat: number} or {group: {stat: number}} — as librarian_<name>{[group,]stat} gauges."""
+    _gauges[name] = fn
+
+def gauges() -> Dict[str, Dict[str, Any]]:
+    """Current value of every registered stats provider (providers that fail are skipped)."""
+    out = {}
+    for name, fn in list(_gauges.items()):
+        try:
+            out[name] = fn()
+        except Exception:
+            continue
+    return out
+
+def _render_gauges() -> List[str]:
+    lines: List[str] = []
+    for name, stats in sorted(gauges().items()):
+        rows = []
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                rows += [(f'group="{key}",stat="{k}"', v) for k, v in value.items()]
+            else:
+                rows.append((f'stat="{key}"', value))
+        rows = [(labels, v) for labels, v in rows if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        if rows:
+            lines.append(f"# TYPE librarian_{name} gauge")
+            lines += [f"librarian_{name}{{{labels}}} {v:g}" for labels, v in rows]
+    return lines
+
+def metrics_text() -> str:
+    text = _metrics.render()
+    extra = _render_gauges()
+    return text + "\n".join(extra) + "\n" if extra else text
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> None:
+    """Expose GET /metrics on a background thread (once per process)."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
@@ -0,0 +1,269 @@
+# transcription.py
+# Voice transcription (OpenAI) — English only
+# -------------------------------------------
+# - audio is uploaded from memory (no temp file), downsampled to 16 kHz mono 16-bit PCM first
+#   (speech models work at 16 kHz; a 48 kHz stereo recording shrinks ~6x)
+# - the model ladder (preferred model with/without the language hint, then whisper-1) is guarded by
+#   a per-attempt circuit breaker: a combination that fails is skipped until its TTL expires, so later
+#   utterances go straight to the one that works instead of paying for the failed round trips again
+# - every attempt is timed (tracing span + transcription_stats())
+# - stream_transcription() yields the transcript as it grows (stream=True on the gpt-4o transcribe
+#   models) and falls back to the ladder when streaming is unavailable
+import io
+import threading
+import time
+import wave
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from resources import get_openai_client
+from tracing import span
+
+TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# error codes meaning "this model / parameter is not available", not "this recording is bad"
+UNSUPPORTED_CODES = {"model_not_found", "unsupported_model", "unsupported_parameter", "unsupported_value"}
+NON_STREAMING_MODELS = {"whisper-1"}
+
+def ladder(prefer_model: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """(model, extra params) in the order they are tried; duplicates dropped if prefer_model is whisper-1."""
+    steps: List[Tuple[str, Dict[str, Any]]] = []
+    for model in dict.fromkeys([prefer_model, "whisper-1"]):
+        steps += [(model, {"language": "en"}), (model, {})]
+    return steps
+
+# -------------------------
+# Audio preprocessing
+# -------------------------
+def downsample_wav(audio_bytes: bytes, rate: int = 16000) -> bytes:
+    """
+    16-bit mono WAV at `rate` (never upsampled). Non-WAV or unsupported input is returned unchanged,
+    so the API still gets something it can decode.
+    """
+    try:
+        with wave.open(io.BytesIO(audio_bytes)) as w:
+            channels, width, src_rate, frames = w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getnframes()
+            raw = w.readframes(frames)
+    except (wave.Error, EOFError):
+        return audio_bytes
+    if width not in (1, 2, 4) or not frames:
+        return audio_bytes
+    if channels == 1 and width == 2 and src_rate <= rate:
+        return audio_bytes
+
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[width]
+    samples = np.frombuffer(raw[:len(raw) - len(raw) % (width * channels)], dtype=dtype).astype(np.float32)
+    if width == 1:
+        samples = (samples - 128.0) * 256.0
+    elif width == 4:
+        samples /= 65536.0
+    mono = samples.reshape(-1, channels).mean(axis=1)
+
+    if src_rate > rate:
+        factor = src_rate / rate
+        if factor.is_integer():
+            # box filter over each group of samples: cheap anti-aliasing for 32/48 kHz -> 16 kHz
+            n = int(factor)
+            mono = mono[:len(mono) - len(mono) % n].reshape(-1, n).mean(axis=1)
+        else:
+            out_len = int(len(mono) / factor)
+            mono = np.interp(np.arange(out_len) * factor, np.arange(len(mono)), mono)
+        out_rate = rate
+    else:
+        out_rate = src_rate
+
+    pcm = np.clip(np.round(mono), -32768, 32767).astype("<i2").tobytes()
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(out_rate)
+        w.writeframes(pcm)
+    return buf.getvalue()
+
+# -------------------------
+# Circuit breaker over ladder steps
+# -------------------------
+class CircuitBreaker:
+    """
+    Per-key failure memory. An "unsupported" error (unknown model, rejected parameter) opens the
+    circuit at once; transient errors (timeouts, 429, 5xx) only after `transient_threshold` in a row.
+    An open circuit is skipped until `ttl_seconds` pass, then the key is tried again (half-open).
+    Errors about the request itself (a clip too short, a corrupt file) are never recorded here.
+    """
+
+    def __init__(self, ttl_seconds: float = 600.0, transient_threshold: int = 3):
+        self.ttl_seconds = ttl_seconds
+        self.transient_threshold = transient_threshold
+        self._failures: Dict[str, int] = {}
+        self._open_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        with self._lock:
+            until = self._open_until.get(key)
+            if until is None:
+                return True
+            if until <= time.monotonic():
+                del self._open_until[key]  # half-open: one more try
+                self._failures[key] = self.transient_threshold - 1
+                return True
+            return False
+
+    def success(self, key: str) -> None:
+        with self._lock:
+            self._failures.pop(key, None)
+            self._open_until.pop(key, None)
+
+    def failure(self, key: str, transient: bool) -> None:
+        with self._lock:
+            count = self._failures.get(key, 0) + 1
+            self._failures[key] = count
+            if not transient or count >= self.transient_threshold:
+                self._open_until[key] = time.monotonic() + self.ttl_seconds
+
+    def open_keys(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [k for k, until in self._open_until.items() if until > now]
+
+_breaker = CircuitBreaker(config.TRANSCRIPTION_BREAKER_TTL_SECONDS)
+_stats_lock = threading.Lock()
+_attempts: Dict[str, Dict[str, Any]] = {}
+
+def _key(model: str, params: Dict[str, Any]) -> str:
+    return model + "".join(f"|{k}={v}" for k, v in sorted(params.items()))
+
+def _failure_kind(exc: Exception, params: Dict[str, Any]) -> str:
+    """
+    "transient" (timeouts, 429, 5xx), "unsupported" (404 / unknown model, or a 400 naming the model or
+    one of this step's parameters) or "request" (any other 4xx: the input itself was refused).
+    """
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None:
+        if any(s in type(exc).__name__ for s in ("Timeout", "Connection", "RateLimit")):
+            return "transient"
+        return "unsupported"  # e.g. an SDK without the `stream` parameter (TypeError)
+    if status in TRANSIENT_STATUS:
+        return "transient"
+    param = getattr(exc, "param", None)
+    if status == 404 or getattr(exc, "code", None) in UNSUPPORTED_CODES or (param and (param == "model" or param in params)):
+        return "unsupported"
+    return "request"
+
+def _record(key: str, ok: bool, seconds: float) -> None:
+    with _stats_lock:
+        s = _attempts.setdefault(key, {"ok": 0, "failed": 0, "seconds": 0.0})
+        s["ok" if ok else "failed"] += 1
+        s["seconds"] += seconds
+
+def transcription_stats() -> Dict[str, Any]:
+    """Per ladder step: successes, failures, average attempt latency (ms); plus the open circuits."""
+    with _stats_lock:
+        steps = {
+            k: {**v, "avg_ms": 1000 * v["seconds"] / (v["ok"] + v["failed"]) if v["ok"] + v["failed"] else 0.0}
+            for k, v in _attempts.items()
+        }
+    return {"steps": steps, "open": _breaker.open_keys()}
+
+# -------------------------
+# Entry points
+# -------------------------
+def _prepare(audio_bytes: bytes) -> bytes:
+    with span("transcription.prepare", bytes_in=len(audio_bytes)) as s:
+        rate = config.TRANSCRIBE_SAMPLE_RATE
+        payload = downsample_wav(audio_bytes, rate) if rate > 0 else audio_bytes
+        s.set(bytes_out=len(payload))
+    return payload
+
+def _transcribe(payload: bytes, prefer_model: str) -> str:
+    client = get_openai_client()
+    steps = ladder(prefer_model)
+    runnable = [step for step in steps if _breaker.allow(_key(*step))] or steps[-1:]
+    last_error: Optional[Exception] = None
+    for model, params in runnable:
+        key = _key(model, params)
+        t0 = time.perf_counter()
+        try:
+            with span("transcription.attempt", model=model, **params):
+                r = client.audio.transcriptions.create(
+                    model=model, file=("speech.wav", payload, "audio/wav"), **params
+                )
+        except Exception as e:
+            _record(key, False, time.perf_counter() - t0)
+            kind = _failure_kind(e, params)
+            if kind == "request":
+                raise  # this recording would fail on every step; other users' requests are unaffected
+            _breaker.failure(key, transient=kind == "transient")
+            last_error = e
+            continue
+        _record(key, True, time.perf_counter() - t0)
+        _breaker.success(key)
+        return (getattr(r, "text", "") or "").strip()
+    raise last_error if last_error else RuntimeError("no transcription model available")
+
+def transcribe_audio_bytes(audio_bytes: bytes, prefer_model: Optional[str] = None) -> str:
+    """
+    Transcribe a recording (WAV bytes) from memory. Prefers config.TRANSCRIBE_MODEL with an English
+    language hint and walks down the ladder on errors, skipping steps whose circuit is open. An error
+    about the recording itself (4xx other than an unsupported model/parameter) is raised at once.
+    """
+    if not audio_bytes:
+        return ""
+    return _transcribe(_prepare(audio_bytes), prefer_model or config.TRANSCRIBE_MODEL)
+
+def stream_transcription(audio_bytes: bytes, prefer_model: Optional[str] = None) -> Iterator[Tuple[str, bool]]:
+    """
+    Yield (transcript so far, is_final) as deltas arrive; the last item is always final. Closing the
+    generator early (e.g. the speech is not English) closes the HTTP stream too. Models without a
+    streaming mode, or a stream that fails, fall back to transcribe_audio_bytes() — in that case the
+    final text may differ from earlier partials.
+    """
+    if not audio_bytes:
+        yield "", True
+        return
+    payload = _prepare(audio_bytes)
+    model = prefer_model or config.TRANSCRIBE_MODEL
+    params = {"language": "en", "stream": True}
+    key = _key(model, params)
+    if config.VOICE_STREAMING and model not in NON_STREAMING_MODELS and _breaker.allow(key):
+        t0 = time.perf_counter()
+        stream = None
+        try:
+            with span("transcription.stream", model=model) as s:
+                stream = get_openai_client().audio.transcriptions.create(
+                    model=model, file=("speech.wav", payload, "audio/wav"), **params
+                )
+                text, deltas = "", 0
+                for event in stream:
+                    kind = getattr(event, "type", "")
+                    if kind == "transcript.text.delta":
+                        if not deltas:
+                            s.set(first_delta_ms=round(s.elapsed_ms(), 1))
+                        deltas += 1
+                        text += getattr(event, "delta", "") or ""
+                        yield text, False
+                    elif kind == "transcript.text.done":
+                        text = getattr(event, "text", None) or text
+                        break
+                s.set(deltas=deltas)
+        except GeneratorExit:
+            _record(key, True, time.perf_counter() - t0)
+            raise
+        except Exception as e:
+            _record(key, False, time.perf_counter() - t0)
+            kind = _failure_kind(e, params)
+            if kind == "request":
+                raise
+            _breaker.failure(key, transient=kind == "transient")
+        else:
+            _record(key, True, time.perf_counter() - t0)
+            _breaker.success(key)
+            yield text.strip(), True
+            return
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+    yield _transcribe(payload, model), True
@@ -0,0 +1,180 @@
+# voice.py
+# Streaming voice turn (English only)
+# -----------------------------------
+# - the transcript streams in (transcription.stream_transcription) and is checked as it grows:
+#   Romanian diacritics or too many non A–Z letters stop the transcription early
+# - once a partial transcript has a few words and is stable (a pause of VOICE_SPECULATE_DEBOUNCE_MS,
+#   or the end of a sentence), moderation and retrieval start speculatively on it — at most
+#   VOICE_SPECULATE_MAX_RUNS times per utterance; when the final text arrives a speculation is
+#   confirmed (same text up to case/punctuation) or recomputed on the final text
+import threading
+from concurrent.futures import Executor, Future
+from typing import Dict, Any, Callable, Optional
+
+import config
+from intent import has_foreign_words, letter_counts
+from textnorm import query_key
+from tracing import bind_context, span
+from transcription import stream_transcription
+
+SENTENCE_END = (".", "?", "!", "…")
+
+class EnglishGate:
+    """
+    Incremental form of the English-only heuristic: feed() the transcript as it grows. Rejects at once
+    on Romanian diacritics, and otherwise once `min_letters` letters are in and fewer than `threshold`
+    of them are A–Z. The function-word check only runs on the complete text (accepts()).
+    """
+
+    def __init__(self, threshold: float = 0.9, min_letters: int = 12):
+        self.threshold = threshold
+        self.min_letters = min_letters
+        self.letters = 0
+        self.ascii_letters = 0
+        self.diacritics = False
+        self._text = ""
+
+    def feed(self, text: str) -> bool:
+        """Account for the part of `text` not seen yet; returns False once the text is rejected."""
+        if not text.startswith(self._text):
+            # the final text is not an extension of the partials (e.g. fallback transcription): start over
+            self.letters = self.ascii_letters = 0
+            self.diacritics = False
+            self._text = ""
+        letters, ascii_letters, diacritics = letter_counts(text[len(self._text):])
+        self.letters += letters
+        self.ascii_letters += ascii_letters
+        self.diacritics = self.diacritics or diacritics
+        self._text = text
+        return not self.rejected
+
+    @property
+    def rejected(self) -> bool:
+        if self.diacritics:
+            return True
+        return self.letters >= self.min_letters and self.ascii_letters < self.threshold * self.letters
+
+    def accepts(self) -> bool:
+        """Verdict on the complete text (same rule as is_english_text)."""
+        return (not self.diacritics and self.letters > 0 and self.ascii_letters >= self.threshold * self.letters
+                and not has_foreign_words(self._text))
+
+class Speculation:
+    """
+    Runs `fn(text)` on the executor for a partial transcript once it has been stable for `debounce_ms`
+    (a pause: no newer partial) or ends a sentence — at most `max_runs` times per utterance, since a
+    started run cannot be recalled. A newer run supersedes older ones (cancelled if not started).
+    finalize() returns a future for the final text — the newest speculative run if it had the same
+    words, else a fresh run.
+    """
+
+    def __init__(self, name: str, fn: Callable[[str], Any], executor: Executor,
+                 debounce_ms: float = 300.0, max_runs: int = 2):
+        self.name = name
+        self.fn = bind_context(fn)  # timers fire on their own thread; keep the caller's trace
+        self.executor = executor
+        self.debounce_ms = debounce_ms
+        self.max_runs = max_runs
+        self.status = "none"  # none | confirmed | recomputed
+        self.runs = 0
+        self._text: Optional[str] = None
+        self._future: Optional[Future] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def offer(self, partial: str) -> None:
+        key = query_key(partial)
+        with self._lock:
+            self._cancel_timer()
+            if key == self._text or self.runs >= self.max_runs:
+                return
+            if self.debounce_ms <= 0 or partial.rstrip().endswith(SENTENCE_END):
+                self._submit(key, partial)
+                return
+            timer = threading.Timer(self.debounce_ms / 1000, self._fire, (key, partial))
+            timer.daemon = True
+            self._timer = timer
+            timer.start()
+
+    def _fire(self, key: str, partial: str) -> None:
+        with self._lock:
+            if self._timer is None or self._timer is not threading.current_thread():
+                return  # superseded by a newer partial (or finalized) while waiting for the lock
+            self._timer = None
+            if self.runs < self.max_runs:
+                self._submit(key, partial)
+
+    def _submit(self, key: str, text: str) -> None:
+        if self._future is not None:
+            self._future.cancel()
+        self._text = key
+        self.runs += 1
+        self._future = self.executor.submit(self.fn, text)
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def finalize(self, text: str) -> Future:
+        with self._lock:
+            self._cancel_timer()
+            if self._future is not None and self._text == query_key(text):
+                self.status = "confirmed"
+                return self._future
+            if self._future is not None:
+                self._future.cancel()
+                self._future = None
+            self.status = "recomputed" if self.runs else "none"
+            return self.executor.submit(self.fn, text)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancel_timer()
+            if self._future is not None:
+                self._future.cancel()
+                self._future = None
+
+def listen(
+    audio_bytes: bytes,
+    speculate: Dict[str, Callable[[str], Any]],
+    executor: Executor,
+    on_partial: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Transcribe `audio_bytes` while speculating. Returns {text, rejected, futures: {name: Future for
+    the final text}, speculation: {name: status}}; `text` is None and `futures` empty when the speech
+    was rejected or empty.
+    """
+    gate = EnglishGate(min_letters=config.VOICE_GATE_MIN_LETTERS)
+    specs = {
+        name: Speculation(name, fn, executor, config.VOICE_SPECULATE_DEBOUNCE_MS, config.VOICE_SPECULATE_MAX_RUNS)
+        for name, fn in speculate.items()
+    }
+    text, rejected = "", False
+    with span("transcription", bytes=len(audio_bytes)) as s:
+        stream = stream_transcription(audio_bytes)
+        try:
+            for text, final in stream:
+                if not gate.feed(text):
+                    rejected = True
+                    s.set(cut_off=not final, at_chars=len(text))
+                    break
+                if final:
+                    break
+                if on_partial is not None:
+                    on_partial(text)
+                if len(text.split()) >= config.VOICE_SPECULATE_MIN_WORDS:
+                    for spec in specs.values():
+                        spec.offer(text)
+        finally:
+            stream.close()
+
+    text = text.strip()
+    if rejected or not text or not gate.accepts():
+        for spec in specs.values():
+            spec.cancel()
+        return {"text": None, "rejected": bool(text) or rejected, "futures": {}, "speculation": {}}
+    futures = {name: spec.finalize(text) for name, spec in specs.items()}
+    return {"text": text, "rejected": False, "futures": futures,
+            "speculation": {name: spec.status for name, spec in specs.items()}}
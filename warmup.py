@@ -0,0 +1,119 @@
+# warmup.py
+# Offline warm-up of the precomputed answer table (precomputed.py)
+# ----------------------------------------------------------------
+# Collects queries from text files (one per line, '#' comments) and/or JSONL logs (a "query" field,
+# top-level or in "attrs" — e.g. the app's or the service's TRACE_LOG), always adds the sidebar
+# examples, keeps the most frequent ones, and runs them through the full pipeline in parallel.
+# Answers are stored under the current catalog version; queries already warmed for that version are
+# skipped unless --force. Blocked queries and failures are reported, never stored.
+#
+# Usage: python -m warmup [--queries popular.txt] [--log traces.jsonl] [--top 200] [--min-count 1]
+#                         [--workers 8] [--force] [--prune]
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List
+
+import tracing
+from precomputed import EXAMPLE_QUERIES, get_precomputed_table
+from recommender import recommend
+from resources import ensure_index, index_version
+from textnorm import query_key
+
+def read_queries(path: Path) -> Iterator[str]:
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+def read_log(path: Path) -> Iterator[str]:
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict):
+                continue
+            query = entry.get("query") or (entry.get("attrs") or {}).get("query")
+            if isinstance(query, str) and query.strip():
+                yield query.strip()
+
+def select(queries: Iterable[str], top: int, min_count: int) -> List[str]:
+    """Most frequent distinct requests (by query_key), each in its most common spelling; examples first."""
+    counts: Counter = Counter()
+    spellings: Dict[str, Counter] = {}
+    for q in queries:
+        key = query_key(q)
+        if key:
+            counts[key] += 1
+            spellings.setdefault(key, Counter())[q] += 1
+    chosen = [key for key, n in counts.most_common() if n >= min_count][:top]
+    examples = {query_key(q): q for q in EXAMPLE_QUERIES}
+    picked = dict(examples)
+    for key in chosen:
+        picked.setdefault(key, spellings[key].most_common(1)[0][0])
+    return list(picked.values())
+
+def _run_one(query: str) -> Dict[str, Any]:
+    with tracing.trace("warmup", query=query):
+        return recommend(query, use_precomputed=False)
+
+def warm(queries: List[str], workers: int = 8, force: bool = False) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    books = ensure_index()
+    version = index_version()
+    table = get_precomputed_table()
+    known = set() if force else set(table.keys(version))
+    todo = [q for q in queries if query_key(q) not in known]
+    stats: Dict[str, Any] = {"version": version, "books": books, "queries": len(queries),
+                             "skipped": len(queries) - len(todo), "stored": 0, "blocked": [], "failed": {}}
+    answers = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="warmup") as pool:
+        futures = {pool.submit(_run_one, q): q for q in todo}
+        for done, future in enumerate(as_completed(futures), 1):
+            query = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                stats["failed"][query] = f"{type(e).__name__}: {e}"
+                continue
+            if result["blocked"]:
+                stats["blocked"].append(query)
+            elif result.get("title") and result.get("final_text"):
+                answers.append({"query": query, **result})
+            print(f"\r{done}/{len(todo)} warmed", end="", file=sys.stderr, flush=True)
+    if todo:
+        print(file=sys.stderr)
+    stats["stored"] = table.put_many(version, answers)
+    stats["seconds"] = round(time.perf_counter() - t0, 2)
+    return stats
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--queries", type=Path, action="append", default=[], help="text file, one query per line")
+    ap.add_argument("--log", type=Path, action="append", default=[], help="JSONL log with a 'query' field")
+    ap.add_argument("--top", type=int, default=200, help="warm at most this many distinct queries (+ the examples)")
+    ap.add_argument("--min-count", type=int, default=1, help="ignore queries seen fewer times than this")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--force", action="store_true", help="recompute queries already in the table")
+    ap.add_argument("--prune", action="store_true", help="drop answers of other catalog versions")
+    args = ap.parse_args()
+
+    collected: List[str] = []
+    for path in args.queries:
+        collected.extend(read_queries(path))
+    for path in args.log:
+        collected.extend(read_log(path))
+    stats = warm(select(collected, args.top, args.min_count), args.workers, args.force)
+    if args.prune:
+        stats["pruned"] = get_precomputed_table().prune(stats["version"])
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()